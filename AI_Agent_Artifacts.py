@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog is in requirements.txt; without it, fall back to fast polling
+    FileSystemEventHandler = object
+    Observer = None
+
+
+class _ArtifactEventHandler(FileSystemEventHandler):
+    def __init__(self, path, event):
+        super().__init__()
+        self.path = os.path.normcase(os.path.abspath(path))
+        self.event = event
+
+    def on_any_event(self, event):
+        for changed in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+            if changed and os.path.normcase(os.path.abspath(changed)) == self.path:
+                self.event.set()
+
+
+class ArtifactWatcher:
+    """Wait for an output file that was produced by the current attempt and is fully written"""
+
+    def __init__(self, poll_interval=0.1, stable_period=0.2, use_notifications=True):
+        self.poll_interval = poll_interval
+        self.stable_period = stable_period
+        self.use_notifications = use_notifications and Observer is not None
+
+    def snapshot(self, path):
+        """Record the artifact's current state so a stale copy is never mistaken for fresh output"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def is_fresh(self, path, baseline):
+        current = self.snapshot(path)
+        return current is not None and current != baseline
+
+    def is_complete(self, path):
+        """A write is considered complete once size and mtime stop changing"""
+        before = self.snapshot(path)
+        if before is None or before[1] == 0:
+            return False
+        time.sleep(self.stable_period)
+        return self.snapshot(path) == before
+
+    def is_ready(self, path, baseline):
+        return self.is_fresh(path, baseline) and self.is_complete(path)
+
+    def wait_for(self, path, baseline=None, timeout=10):
+        """Block until path is fresh and complete; returns False on timeout"""
+        if self.is_ready(path, baseline):
+            return True
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if self.use_notifications and os.path.isdir(directory):
+            return self._wait_with_notifications(path, baseline, timeout, directory)
+        return self._wait_with_polling(path, baseline, timeout)
+
+    def _wait_with_notifications(self, path, baseline, timeout, directory):
+        changed = threading.Event()
+        observer = Observer()
+        observer.schedule(_ArtifactEventHandler(path, changed), directory, recursive=False)
+        observer.start()
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                # Re-check after subscribing so an event fired in between is not lost
+                if self.is_ready(path, baseline):
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                changed.wait(remaining)
+                changed.clear()
+        finally:
+            observer.stop()
+            observer.join()
+
+    def _wait_with_polling(self, path, baseline, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.is_ready(path, baseline):
+                return True
+            time.sleep(self.poll_interval)
+        return False
@@ -0,0 +1,212 @@
+import asyncio
+import random
+import time
+import weakref
+
+from huggingface_hub import AsyncInferenceClient
+from transformers.agents.agents import AgentError, AgentMaxIterationsError
+from transformers.agents.llm_engine import get_clean_message_list, llama_role_conversions
+
+from AI_Agent_Tracing import get_tracer
+
+# The stop sequences ReactCodeAgent.step passes to its llm_engine
+REACT_CODE_STOP_SEQUENCES = ["<end_action>", "Observation:"]
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _status_of(error):
+    """HTTP status from aiohttp or huggingface_hub errors, None for anything else"""
+    status = getattr(error, 'status', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None) or getattr(response, 'status', None)
+    return status
+
+
+def _retry_after(error):
+    headers = getattr(error, 'headers', None) or getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncHfApiEngine:
+    """HfApiEngine-compatible chat completion over AsyncInferenceClient.
+
+    With a limiter (the registry's RequestLimiter) each request takes one of its slots, so
+    async and synchronous agents share one process-wide cap; without one, at most
+    max_concurrent requests are in flight per event loop. A 429 pauses every request to this
+    engine until the server's Retry-After (or an exponential backoff) has passed.
+    """
+
+    def __init__(self, model, token=None, max_tokens=1500, timeout=120, max_concurrent=8,
+                 max_retries=5, base_delay=1.0, max_delay=60.0, limiter=None):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = limiter
+        self.client = AsyncInferenceClient(model=model, token=token, timeout=timeout)
+        self.last_input_token_count = None
+        self.last_output_token_count = None
+        self.rate_limited = 0
+        self._cooldown_until = 0.0
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _slot(self):
+        if self.limiter is not None:
+            return self.limiter.async_slot()
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphores[loop]
+
+    async def _wait_for_cooldown(self):
+        delay = self._cooldown_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def generate(self, messages, stop_sequences=None, grammar=None):
+        """Return (text, prompt_tokens, completion_tokens); safe to call concurrently"""
+        stop_sequences = list(stop_sequences or [])
+        messages = get_clean_message_list(messages, role_conversions=llama_role_conversions)
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_cooldown()
+            try:
+                async with self._slot():
+                    response = await self.client.chat_completion(
+                        messages, stop=stop_sequences, max_tokens=self.max_tokens, response_format=grammar
+                    )
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                status = _status_of(e)
+                if status not in RETRYABLE_STATUSES or attempt == self.max_retries:
+                    raise
+                delay = _retry_after(e) or min(self.max_delay, self.base_delay * 2 ** attempt)
+                delay += random.uniform(0, delay / 2)
+                if status == 429:
+                    self.rate_limited += 1
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                print(f"LLM request returned {status}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        text = response.choices[0].message.content
+        for stop_sequence in stop_sequences:
+            if text.endswith(stop_sequence):
+                text = text[:-len(stop_sequence)]
+        usage = getattr(response, 'usage', None)
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        self.last_input_token_count = prompt_tokens
+        self.last_output_token_count = completion_tokens
+        return text, prompt_tokens, completion_tokens
+
+    async def __call__(self, messages, stop_sequences=None, grammar=None):
+        text, _, _ = await self.generate(messages, stop_sequences, grammar)
+        return text
+
+
+class ThreadedAsyncEngine:
+    """Async facade over a synchronous engine (replay or local backends) for run_agent_async"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.rate_limited = 0
+
+    async def generate(self, messages, stop_sequences=None, grammar=None):
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(
+            None, lambda: self.engine(messages, stop_sequences=stop_sequences, grammar=grammar)
+        )
+        return (text, getattr(self.engine, 'last_input_token_count', 0) or 0,
+                getattr(self.engine, 'last_output_token_count', 0) or 0)
+
+    async def __call__(self, messages, stop_sequences=None, grammar=None):
+        text, _, _ = await self.generate(messages, stop_sequences, grammar)
+        return text
+
+
+def _run_step(agent, log_entry, parent):
+    with get_tracer().attached(parent):
+        agent.step(log_entry)
+
+
+async def run_agent_async(agent, task, async_engine, reset=True, executor=None, parent=None):
+    """Asynchronous equivalent of ReactCodeAgent.run(task, reset=reset).
+
+    Each iteration awaits the LLM completion on the event loop and primes the agent's
+    CachedEngine with it, then runs agent.step (parsing and code execution) in an executor.
+    If the prompt somehow differs from what step builds, step just calls the synchronous
+    engine, so priming never changes results. Cancelling the task stops before the next
+    iteration; a step already running in the executor is allowed to finish.
+    """
+    loop = asyncio.get_running_loop()
+    tracer = get_tracer()
+    if parent is None:
+        parent = tracer.current_span()
+
+    agent.task = task
+    agent.state = {}
+    if reset:
+        agent.initialize_for_run()
+    else:
+        agent.logs.append({"task": task})
+
+    final_answer = None
+    iteration = 0
+    while final_answer is None and iteration < agent.max_iterations:
+        step_start_time = time.time()
+        log_entry = {"iteration": iteration, "start_time": step_start_time}
+        try:
+            if getattr(agent, 'planning_interval', None) is not None and iteration % agent.planning_interval == 0:
+                await loop.run_in_executor(
+                    executor, lambda: agent.planning_step(task, is_first_step=(iteration == 0), iteration=iteration)
+                )
+            memory = agent.write_inner_memory_from_logs()
+            await agent.llm_engine.aprime(
+                async_engine, memory, stop_sequences=REACT_CODE_STOP_SEQUENCES,
+                grammar=getattr(agent, 'grammar', None), parent=parent
+            )
+            await loop.run_in_executor(executor, _run_step, agent, log_entry, parent)
+            if "final_answer" in log_entry:
+                final_answer = log_entry["final_answer"]
+        except AgentError as e:
+            agent.logger.error(e, exc_info=1)
+            log_entry["error"] = e
+        finally:
+            step_end_time = time.time()
+            log_entry["step_end_time"] = step_end_time
+            log_entry["step_duration"] = step_end_time - step_start_time
+            agent.logs.append(log_entry)
+            for callback in getattr(agent, 'step_callbacks', []):
+                callback(log_entry)
+            iteration += 1
+
+    if final_answer is None and iteration == agent.max_iterations:
+        error_message = "Reached max iterations."
+        final_step_log = {"error": AgentMaxIterationsError(error_message)}
+        agent.logs.append(final_step_log)
+        agent.logger.error(error_message, exc_info=1)
+        final_answer = await loop.run_in_executor(executor, agent.provide_final_answer, task)
+        final_step_log["final_answer"] = final_answer
+        final_step_log["step_duration"] = 0
+        for callback in getattr(agent, 'step_callbacks', []):
+            callback(final_step_log)
+    return final_answer
+
+
+async def run_in_executor(function, *args, executor=None, parent=None):
+    """Run blocking work (native engines, script replay) off the event loop, keeping trace nesting"""
+    loop = asyncio.get_running_loop()
+    if parent is None:
+        parent = get_tracer().current_span()
+
+    def call():
+        with get_tracer().attached(parent):
+            return function(*args)
+    return await loop.run_in_executor(executor, call)
@@ -0,0 +1,177 @@
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from AI_Agent_Cache import get_default_cache
+from AI_Agent_Registry import get_registry
+from AI_Agent_Storage import set_state_root, write_frame
+from AI_agent_workflow import MLWorkflowCoordinator, PHASE_REPORT_NAMES
+
+
+def load_manifest(path):
+    """Datasets to process: a JSON list (or {'datasets': [...]}) or a CSV with name/source/output_dir columns"""
+    if os.path.splitext(path)[1].lower() == '.csv':
+        with open(path, 'r', newline='') as f:
+            entries = [row for row in csv.DictReader(f)]
+    else:
+        with open(path, 'r') as f:
+            entries = json.load(f)
+        if isinstance(entries, dict):
+            entries = entries.get('datasets', [])
+
+    datasets = []
+    seen = set()
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {'source': entry}
+        source = entry.get('source')
+        if not source:
+            raise ValueError(f"Manifest entry without a source: {entry}")
+        name = entry.get('name') or os.path.splitext(os.path.basename(source.rstrip('/\\')))[0]
+        if name in seen:
+            raise ValueError(f"Dataset name '{name}' appears twice in the manifest")
+        seen.add(name)
+        datasets.append({'name': name, 'source': source, 'output_dir': entry.get('output_dir') or None})
+    return datasets
+
+
+class BatchRunner:
+    """Run one coordinator pipeline per dataset on a bounded worker pool"""
+
+    def __init__(self, datasets, output_root, max_workers=4, max_llm_requests=8):
+        self.datasets = datasets
+        self.output_root = output_root
+        self.max_workers = max_workers
+        # Shared by every worker: cache misses wait for a slot instead of flooding the endpoint
+        self.max_llm_requests = max_llm_requests
+        # Split the machine's cores between concurrent datasets instead of letting each claim them all
+        self.compute_workers = max(1, (os.cpu_count() or 2) // max(1, max_workers))
+        self.history_path = os.path.join(output_root, "workflow_history.sqlite")
+        self.summary_file = os.path.join(output_root, "batch_summary.json")
+        self.summary_table = os.path.join(output_root, "batch_summary.csv")
+        os.makedirs(output_root, exist_ok=True)
+        # LLM responses, preprocessed features and captured scripts live with the batch output
+        set_state_root(output_root)
+
+    def _run_dataset(self, dataset):
+        output_dir = dataset['output_dir'] or os.path.join(self.output_root, dataset['name'])
+        start = time.monotonic()
+        result = {
+            'name': dataset['name'],
+            'source': dataset['source'],
+            'output_dir': output_dir,
+            'status': 'failed',
+            'run_id': None,
+            'duration_seconds': None,
+            'error': None
+        }
+        try:
+            coordinator = MLWorkflowCoordinator(
+                output_dir=output_dir,
+                source_path=dataset['source'],
+                history_path=self.history_path,
+                serve_dashboard=False
+            )
+            coordinator.compute_workers = self.compute_workers
+            succeeded = coordinator.run_full_workflow()
+            result['status'] = 'success' if succeeded else 'failed'
+            result['run_id'] = coordinator.run_id
+            report = coordinator.last_report or {}
+            for report_name, phase in report.get('phases', {}).items():
+                result[f"{report_name}_status"] = phase['status']
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = f"{type(e).__name__}: {str(e)}"
+        result['duration_seconds'] = round(time.monotonic() - start, 3)
+        return result
+
+    def run(self):
+        get_registry().set_max_concurrent_requests(self.max_llm_requests)
+        print(f"Processing {len(self.datasets)} datasets with {self.max_workers} workers "
+              f"(at most {self.max_llm_requests} LLM requests in flight, "
+              f"{self.compute_workers} CPU workers per dataset)")
+
+        start = time.monotonic()
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='batch') as executor:
+            futures = {executor.submit(self._run_dataset, dataset): dataset for dataset in self.datasets}
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"[{len(results)}/{len(self.datasets)}] {result['name']}: {result['status']} "
+                      f"in {result['duration_seconds']}s")
+        wall_seconds = time.monotonic() - start
+
+        summary = self._summarize(results, wall_seconds)
+        self._save_summary(summary)
+        return summary
+
+    def _summarize(self, results, wall_seconds):
+        results = sorted(results, key=lambda r: r['name'])
+        busy_seconds = sum(r['duration_seconds'] or 0 for r in results)
+        phase_statuses = {}
+        for report_name in PHASE_REPORT_NAMES.values():
+            counts = {}
+            for result in results:
+                status = result.get(f"{report_name}_status", 'not_run')
+                counts[status] = counts.get(status, 0) + 1
+            phase_statuses[report_name] = counts
+
+        return {
+            'datasets': len(results),
+            'succeeded': sum(r['status'] == 'success' for r in results),
+            'failed': sum(r['status'] != 'success' for r in results),
+            'workers': self.max_workers,
+            'compute_workers_per_dataset': self.compute_workers,
+            'max_llm_requests': self.max_llm_requests,
+            'wall_seconds': round(wall_seconds, 3),
+            'sum_run_seconds': round(busy_seconds, 3),
+            'effective_concurrency': round(busy_seconds / wall_seconds, 2) if wall_seconds else None,
+            'datasets_per_hour': round(len(results) * 3600 / wall_seconds, 2) if wall_seconds else None,
+            'phase_statuses': phase_statuses,
+            'llm_requests': get_registry().stats()['requests'],
+            'llm_cache': get_default_cache().stats(),
+            'history': self.history_path,
+            'timestamp': str(datetime.now()),
+            'runs': results
+        }
+
+    def _save_summary(self, summary):
+        with open(self.summary_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+        write_frame(pd.DataFrame(summary['runs']), self.summary_table)
+
+        print("\n=== Batch Summary ===")
+        print(f"Datasets: {summary['datasets']} ({summary['succeeded']} succeeded, {summary['failed']} failed)")
+        print(f"Wall time: {summary['wall_seconds']}s, {summary['datasets_per_hour']} datasets/hour")
+        print(f"Effective concurrency: {summary['effective_concurrency']}x over {summary['workers']} workers")
+        print(f"LLM requests: {summary['llm_requests']['requests']} "
+              f"(peak {summary['llm_requests']['peak_in_flight']} in flight, "
+              f"{summary['llm_requests']['wait_seconds']}s waiting for a slot)")
+        print(f"LLM cache hit rate: {summary['llm_cache']['hit_rate']:.0%}")
+        for report_name, counts in summary['phase_statuses'].items():
+            print(f"  {report_name}: {', '.join(f'{k} {v}' for k, v in sorted(counts.items()))}")
+        print(f"\nSummary written to {self.summary_file} and {self.summary_table}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ML workflow for every dataset in a manifest")
+    parser.add_argument("manifest", help="JSON or CSV list of datasets (name, source, optional output_dir)")
+    parser.add_argument("--output-root", default="batch_runs")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-llm-requests", type=int, default=8)
+    args = parser.parse_args()
+
+    runner = BatchRunner(load_manifest(args.manifest), args.output_root, args.workers, args.max_llm_requests)
+    summary = runner.run()
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
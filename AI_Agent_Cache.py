@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from AI_Agent_Storage import state_dir
+from AI_Agent_Tracing import get_tracer
+
+
+def _normalize_message(message):
+    """Turn a chat message into a plain dict so it hashes the same across runs"""
+    role = message.get('role')
+    role = getattr(role, 'value', role)
+    content = message.get('content')
+    if isinstance(content, list):
+        content = [
+            part.get('text', part) if isinstance(part, dict) else part
+            for part in content
+        ]
+    return {'role': str(role), 'content': content}
+
+
+class LLMResponseCache:
+    """On-disk, content-addressed store of LLM completions with size/TTL eviction.
+
+    An entry's age is measured from its last use (the file's mtime, refreshed on every
+    hit), both when reading it and when evicting: entries unused for ttl_seconds expire.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=5000,
+                 max_bytes=512 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        self.cache_dir = cache_dir or state_dir(".llm_cache")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._puts_since_evict = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._evict()
+
+    def make_key(self, model_name, messages, authorized_imports=None, tool_names=None,
+                 stop_sequences=None, grammar=None):
+        payload = {
+            'model': model_name,
+            'messages': [_normalize_message(m) for m in messages],
+            'authorized_imports': sorted(set(authorized_imports or [])),
+            'tools': sorted(tool_names or []),
+            'stop_sequences': list(stop_sequences or []),
+            'grammar': grammar
+        }
+        blob = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(blob).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        path = self._entry_path(key)
+        try:
+            last_used = os.path.getmtime(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if self.ttl_seconds and time.time() - last_used > self.ttl_seconds:
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+                self.evictions += 1
+            return None
+
+        # Touch the entry so eviction drops least-recently-used responses first
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry['response']
+
+    def put(self, key, response, model_name=None):
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {'model': model_name, 'response': response, 'created': time.time()}
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._puts_since_evict += 1
+            run_eviction = self._puts_since_evict >= 50
+            if run_eviction:
+                self._puts_since_evict = 0
+        if run_eviction:
+            self._evict()
+
+    def delete(self, key):
+        self._remove(self._entry_path(key))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        now = time.time()
+        removed = 0
+
+        if self.ttl_seconds:
+            fresh = []
+            for mtime, size, path in entries:
+                if now - mtime > self.ttl_seconds:
+                    self._remove(path)
+                    removed += 1
+                else:
+                    fresh.append((mtime, size, path))
+            entries = fresh
+
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total_bytes -= size
+            removed += 1
+
+        with self._lock:
+            self.evictions += removed
+
+    def clear(self):
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    def stats(self):
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries)
+        }
+
+
+_default_caches = {}
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Return the process-wide cache shared by every agent class (one per state root)"""
+    cache_dir = state_dir(".llm_cache")
+    with _default_cache_lock:
+        if cache_dir not in _default_caches:
+            _default_caches[cache_dir] = LLMResponseCache(cache_dir)
+        return _default_caches[cache_dir]
+
+
+class CachedEngine:
+    """Drop-in llm_engine for ReactCodeAgent that replays identical prompts from disk.
+
+    Completions stored since the last commit() belong to an attempt whose outcome is not
+    known yet; discard() deletes them after a failed attempt so a retry (or the next run)
+    asks the LLM again instead of replaying the failing trajectory. With read_cache off,
+    cached completions are not served at all (new ones are still stored).
+    """
+
+    def __init__(self, engine, model_name, authorized_imports=None, tool_names=None, cache=None):
+        self.engine = engine
+        self.model_name = model_name
+        self.authorized_imports = list(authorized_imports or [])
+        self.tool_names = list(tool_names or [])
+        self.cache = cache if cache is not None else get_default_cache()
+        self.last_input_token_count = None
+        self.last_output_token_count = None
+        self.read_cache = True
+        self._uncommitted = set()
+        # Completions fetched ahead of time by the async driver, consumed by the next identical call
+        self._primed = {}
+        self._primed_lock = threading.Lock()
+
+    def _key(self, messages, stop_sequences, grammar):
+        return self.cache.make_key(
+            self.model_name, messages, self.authorized_imports, self.tool_names,
+            stop_sequences, grammar
+        )
+
+    def _get(self, key):
+        return self.cache.get(key) if self.read_cache else None
+
+    def _put(self, key, response):
+        self.cache.put(key, response, self.model_name)
+        with self._primed_lock:
+            self._uncommitted.add(key)
+
+    def commit(self):
+        """Keep the completions of an attempt that succeeded"""
+        with self._primed_lock:
+            self._uncommitted.clear()
+
+    def discard(self):
+        """Delete the completions stored by a failed attempt; returns how many"""
+        with self._primed_lock:
+            keys, self._uncommitted = self._uncommitted, set()
+        for key in keys:
+            self.cache.delete(key)
+        return len(keys)
+
+    async def aprime(self, async_engine, messages, stop_sequences=None, grammar=None, parent=None):
+        """Fetch a completion without blocking a thread and hand it to the next identical __call__"""
+        key = self._key(messages, stop_sequences, grammar)
+        with get_tracer().span('llm_call', 'llm', parent=parent, detached=True, model=self.model_name,
+                               messages=len(messages), mode='async') as span:
+            response = self._get(key)
+            span.attributes['cache_hit'] = response is not None
+            prompt_tokens = completion_tokens = 0
+            if response is None:
+                response, prompt_tokens, completion_tokens = await async_engine.generate(
+                    messages, stop_sequences=stop_sequences, grammar=grammar
+                )
+                span.attributes['prompt_tokens'] = prompt_tokens
+                span.attributes['completion_tokens'] = completion_tokens
+                self._put(key, response)
+        with self._primed_lock:
+            self._primed[key] = (response, prompt_tokens, completion_tokens)
+        return response
+
+    def __call__(self, messages, stop_sequences=None, grammar=None):
+        key = self._key(messages, stop_sequences, grammar)
+        with self._primed_lock:
+            primed = self._primed.pop(key, None)
+        if primed is not None:
+            response, self.last_input_token_count, self.last_output_token_count = primed
+            return response
+
+        with get_tracer().span('llm_call', 'llm', model=self.model_name, messages=len(messages)) as span:
+            response = self._get(key)
+            span.attributes['cache_hit'] = response is not None
+            if response is not None:
+                self.last_input_token_count = 0
+                self.last_output_token_count = 0
+                return response
+
+            response = self.engine(messages, stop_sequences=stop_sequences, grammar=grammar)
+            self.last_input_token_count = getattr(self.engine, 'last_input_token_count', None)
+            self.last_output_token_count = getattr(self.engine, 'last_output_token_count', None)
+            span.attributes['prompt_tokens'] = self.last_input_token_count
+            span.attributes['completion_tokens'] = self.last_output_token_count
+            self._put(key, response)
+            return response
+
+    def __getattr__(self, name):
+        # Only reached for attributes not set in __init__; forward to the wrapped engine
+        if name == 'engine':
+            raise AttributeError(name)
+        return getattr(self.engine, name)
@@ -0,0 +1,198 @@
+import re
+import textwrap
+import threading
+
+CODE_BLOCK = re.compile(r"(```(?:py|python)?[ \t]*\n)(.*?)(```)", re.DOTALL)
+STEP_OUTPUT = re.compile(r"^(\[OUTPUT OF STEP \d+\] -> (?:Observation|Error):\n)", re.DOTALL)
+ELIDED = "[Earlier step elided to stay within the context budget]"
+# Code shorter than this is cheaper to resend than to reference
+MIN_DEDUPE_CHARS = 80
+
+
+class TokenBudgetExceeded(RuntimeError):
+    """An agent run used up its prompt-token budget"""
+
+
+def _role(message):
+    role = message.get('role')
+    return str(getattr(role, 'value', role))
+
+
+def estimate_tokens(messages):
+    """Rough token count (~4 characters per token) so budgets work without a tokenizer"""
+    return sum(len(str(message.get('content') or '')) for message in messages) // 4 + 4 * len(messages)
+
+
+def truncate_text(text, max_chars):
+    """Keep the head and tail of long output, where shapes, errors and final values usually are"""
+    if len(text) <= max_chars:
+        return text
+    head = max_chars * 2 // 3
+    tail = max_chars - head
+    return f"{text[:head]}\n... [{len(text) - max_chars} characters truncated] ...\n{text[-tail:]}"
+
+
+def _dedent_task(content, prefix):
+    body = content[len(prefix):]
+    first, _, rest = body.partition('\n')
+    return prefix + first + ('\n' + textwrap.dedent(rest).strip('\n') if rest else '')
+
+
+class ContextBudget:
+    """Shrink a ReactCodeAgent's memory before each LLM call and meter its prompt tokens.
+
+    Wraps agent.write_inner_memory_from_logs, so the synchronous step and the async driver
+    both send the managed prompt. Messages are shortened but never removed, keeping the
+    conversation's turn structure (which transcript replay keys on). Old observations are
+    cut harder than recent ones, code blocks repeated verbatim are kept only at their
+    latest occurrence, and if the prompt is still over max_prompt_tokens the oldest steps
+    are elided. Once an agent run (a fresh run or a resume) has sent more than
+    max_run_tokens, the next step raises TokenBudgetExceeded.
+    """
+
+    def __init__(self, max_observation_chars=4000, old_observation_chars=500, keep_recent_steps=3,
+                 max_prompt_tokens=24000, max_run_tokens=600000, dedupe_code=True):
+        self.max_observation_chars = max_observation_chars
+        self.old_observation_chars = old_observation_chars
+        self.keep_recent_steps = keep_recent_steps
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_run_tokens = max_run_tokens
+        self.dedupe_code = dedupe_code
+        self.iterations = []
+        self.runs = 0
+        self.run_tokens = 0
+        self._counted = set()
+        self._run_entry = None
+        self._run_start = 0
+        self._lock = threading.Lock()
+
+    def attach(self, agent):
+        if getattr(agent, '_context_budget', None) is not None:
+            return agent
+        original_memory = agent.write_inner_memory_from_logs
+
+        def managed_memory(summary_mode=False):
+            memory = original_memory(summary_mode=summary_mode)
+            if summary_mode:
+                # Planning summaries are short already and not sent as the step prompt
+                return memory
+            return self.compress(memory, agent.logs)
+
+        agent.write_inner_memory_from_logs = managed_memory
+        agent._context_budget = self
+        return agent
+
+    def _shorten_observations(self, messages, counts):
+        outputs = [i for i, m in enumerate(messages) if i > 1 and _role(m) == 'tool-response']
+        recent = set(outputs[-self.keep_recent_steps:]) if self.keep_recent_steps else set()
+        for index in outputs:
+            content = messages[index]['content']
+            header = STEP_OUTPUT.match(content)
+            header = header.group(1) if header else ''
+            limit = self.max_observation_chars if index in recent else self.old_observation_chars
+            body = truncate_text(content[len(header):], limit)
+            if len(header) + len(body) < len(content):
+                messages[index]['content'] = header + body
+                counts['truncated'] += 1
+
+    def _dedupe_code(self, messages, counts):
+        later = set()
+        for index in range(len(messages) - 1, 1, -1):
+            message = messages[index]
+            if _role(message) != 'assistant':
+                continue
+
+            def replace(match):
+                code = match.group(2).strip()
+                if len(code) < MIN_DEDUPE_CHARS:
+                    return match.group(0)
+                if code in later:
+                    counts['deduped'] += 1
+                    return f"{match.group(1)}# Same code as a later step (shown there)\n{match.group(3)}"
+                later.add(code)
+                return match.group(0)
+            message['content'] = CODE_BLOCK.sub(replace, message['content'])
+
+    def _repeated_tasks(self, messages, counts):
+        """A resumed run appends 'New task: <the same task>'; refer back instead of resending it"""
+        task = ' '.join(messages[1]['content'][len("Task: "):].split()) if len(messages) > 1 else None
+        for message in messages[2:]:
+            content = message['content']
+            if (_role(message) == 'user' and content.startswith("New task:")
+                    and ' '.join(content[len("New task:"):].split()) == task):
+                message['content'] = "New task:\nContinue the same task as above from where you left off."
+                counts['deduped'] += 1
+
+    def _enforce_prompt_budget(self, messages, counts):
+        # The system prompt, the task and the latest steps are always sent in full
+        protected = 2 * max(self.keep_recent_steps, 1)
+        index = 2
+        while estimate_tokens(messages) > self.max_prompt_tokens and index < len(messages) - protected:
+            if messages[index]['content'] != ELIDED:
+                messages[index]['content'] = ELIDED
+                counts['elided'] += 1
+            index += 1
+
+    def compress(self, memory, logs=None):
+        raw_tokens = estimate_tokens(memory)
+        messages = [dict(message) for message in memory]
+        counts = {'truncated': 0, 'deduped': 0, 'elided': 0}
+        if len(messages) > 1 and str(messages[1].get('content', '')).startswith("Task: "):
+            messages[1]['content'] = _dedent_task(messages[1]['content'], "Task: ")
+        self._repeated_tasks(messages, counts)
+        self._shorten_observations(messages, counts)
+        if self.dedupe_code:
+            self._dedupe_code(messages, counts)
+        self._enforce_prompt_budget(messages, counts)
+        self._meter(logs, raw_tokens, estimate_tokens(messages), len(messages), counts)
+        return messages
+
+    def _meter(self, logs, raw_tokens, tokens, message_count, counts):
+        logs = logs or []
+        with self._lock:
+            # A new or resumed run starts right after a 'task' entry
+            if logs and 'task' in logs[-1] and logs[-1] is not self._run_entry:
+                self._run_entry = logs[-1]
+                self._run_start = len(logs) - 1
+                self.runs += 1
+                self.run_tokens = 0
+            position = (self.runs, len(logs))
+            # The async driver builds the same prompt as the step it primes; count it once
+            if position in self._counted:
+                return
+            self._counted.add(position)
+            self.run_tokens += tokens
+            self.iterations.append({
+                'run': self.runs,
+                'iteration': len(logs) - 1 - self._run_start,
+                'messages': message_count,
+                'raw_tokens': raw_tokens,
+                'prompt_tokens': tokens,
+                **counts
+            })
+            over_budget = self.run_tokens > self.max_run_tokens
+            run_tokens = self.run_tokens
+        if over_budget:
+            raise TokenBudgetExceeded(
+                f"Agent run sent ~{run_tokens} prompt tokens, over its budget of {self.max_run_tokens}"
+            )
+
+    def report(self):
+        with self._lock:
+            iterations = list(self.iterations)
+        if not iterations:
+            return {}
+        raw = sum(entry['raw_tokens'] for entry in iterations)
+        sent = sum(entry['prompt_tokens'] for entry in iterations)
+        return {
+            'llm_prompts': len(iterations),
+            'runs': self.runs,
+            'raw_prompt_tokens': raw,
+            'sent_prompt_tokens': sent,
+            'saved_fraction': round(1 - sent / raw, 4) if raw else 0.0,
+            'max_prompt_tokens': max(entry['prompt_tokens'] for entry in iterations),
+            'truncated_outputs': sum(entry['truncated'] for entry in iterations),
+            'deduped': sum(entry['deduped'] for entry in iterations),
+            'elided': sum(entry['elided'] for entry in iterations),
+            'per_iteration': iterations
+        }
@@ -0,0 +1,153 @@
+import json
+import multiprocessing
+import socket
+import threading
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8050
+
+
+def read_live_status(path):
+    """Phase statuses written by a running coordinator; empty when no run has started"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_app(history_path, live_status_path, refresh_ms=5000, trend_runs=100, recent_runs=20):
+    """Dash app whose figures are rebuilt server-side from the history store on every interval"""
+    # Dash/plotly are only needed in the dashboard process
+    from dash import Dash, dcc, html, Input, Output
+    import plotly.express as px
+    from AI_Agent_History import RunHistoryStore
+
+    history = RunHistoryStore(history_path)
+    app = Dash(__name__)
+    app.layout = html.Div([
+        html.H1("ML Workflow Metrics Dashboard"),
+        dcc.Interval(id='refresh', interval=refresh_ms, n_intervals=0),
+
+        html.H3("Current Run"),
+        html.Div(id='live-status'),
+
+        dcc.Graph(id='duration-trend'),
+        dcc.Graph(id='phase-stats'),
+
+        html.H3("Recent Runs"),
+        html.Div(id='recent-runs')
+    ])
+
+    def table(rows, columns):
+        return html.Table(
+            [html.Tr([html.Th(column) for column in columns])] +
+            [html.Tr([html.Td(str(row.get(column, ''))) for column in columns]) for row in rows]
+        )
+
+    @app.callback(
+        [Output('live-status', 'children'), Output('duration-trend', 'figure'),
+         Output('phase-stats', 'figure'), Output('recent-runs', 'children')],
+        Input('refresh', 'n_intervals')
+    )
+    def refresh(_):
+        live = read_live_status(live_status_path)
+        live_rows = [{'phase': name, **phase} for name, phase in live.get('phases', {}).items()]
+        live_view = html.Div([
+            html.P(f"Run {live.get('run_id', '-')} started {live.get('started_at', '-')}, "
+                   f"updated {live.get('updated_at', '-')}"),
+            table(live_rows, ['phase', 'status', 'attempts', 'failures', 'elapsed_seconds'])
+        ]) if live else html.P("No run in progress")
+
+        trend = history.phase_trend(limit=trend_runs)
+        duration_trend = px.line(
+            trend, x='recorded_at', y='duration_seconds', color='phase', markers=True,
+            hover_data=['run_id', 'status', 'model_name'],
+            title=f'Phase Durations (last {trend_runs} runs)',
+            labels={'duration_seconds': 'Duration (Seconds)', 'recorded_at': 'Run'}
+        ) if trend else px.line(title='Phase Durations (no runs recorded yet)')
+
+        stats = history.phase_stats()
+        phase_stats = px.bar(
+            stats, x='phase', y=['failed_attempts', 'attempts'], barmode='group',
+            hover_data=['runs', 'mean_seconds', 'run_failure_rate'],
+            title='Attempts and Failures per Phase (all runs)',
+            labels={'value': 'Number of Attempts', 'variable': 'Attempt Type'},
+            color_discrete_map={'attempts': '#2ecc71', 'failed_attempts': '#e74c3c'}
+        ) if stats else px.bar(title='Attempts per Phase (no runs recorded yet)')
+
+        runs = table(history.recent_runs(limit=recent_runs),
+                     ['run_id', 'recorded_at', 'status', 'total_seconds', 'parallel_speedup',
+                      'llm_cache_hit_rate'])
+        return live_view, duration_trend, phase_stats, runs
+
+    return app
+
+
+def serve(history_path, live_status_path, host=DEFAULT_HOST, port=DEFAULT_PORT, refresh_ms=5000):
+    app = build_app(history_path, live_status_path, refresh_ms)
+    app.run(host=host, port=port, debug=False, use_reloader=False)
+
+
+def port_in_use(host, port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.5)
+        return sock.connect_ex((host, port)) == 0
+
+
+class DashboardServer:
+    """Serve the dashboard from a background process so the workflow never blocks on it"""
+
+    def __init__(self, history_path, live_status_path, host=DEFAULT_HOST, port=DEFAULT_PORT, refresh_ms=5000):
+        self.history_path = history_path
+        self.live_status_path = live_status_path
+        self.host = host
+        self.port = port
+        self.refresh_ms = refresh_ms
+        self.process = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    def is_running(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        """Start the server once; later calls (or a server left by another run) are reused"""
+        with self._lock:
+            if self.is_running():
+                return self.url
+            if port_in_use(self.host, self.port):
+                print(f"Dashboard already being served at {self.url}")
+                return self.url
+            context = multiprocessing.get_context('spawn')
+            self.process = context.Process(
+                target=serve,
+                args=(self.history_path, self.live_status_path, self.host, self.port, self.refresh_ms),
+                name='workflow-dashboard',
+                daemon=False
+            )
+            self.process.start()
+            return self.url
+
+    def stop(self, timeout=5):
+        with self._lock:
+            if self.process is None:
+                return
+            self.process.terminate()
+            self.process.join(timeout)
+            self.process = None
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def get_dashboard_server(history_path, live_status_path, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """One server per port per process, shared by every coordinator"""
+    with _servers_lock:
+        if port not in _servers:
+            _servers[port] = DashboardServer(history_path, live_status_path, host, port)
+        return _servers[port]
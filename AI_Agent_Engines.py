@@ -0,0 +1,194 @@
+import json
+import os
+import re
+import threading
+import time
+
+from transformers import HfApiEngine
+from transformers.agents.llm_engine import get_clean_message_list, llama_role_conversions
+
+# Only the LLM call is swapped out; parsing, code execution and the workflow run for real
+
+MISSING_STEP_RESPONSE = (
+    "Thought: No recorded step for this prompt.\n"
+    "Code:\n```py\nfinal_answer(\"No recorded transcript step\")\n```<end_code>"
+)
+
+
+def _message_text(message):
+    content = message.get('content')
+    if isinstance(content, list):
+        content = "\n".join(part.get('text', '') if isinstance(part, dict) else str(part) for part in content)
+    return str(content or '')
+
+
+def _role(message):
+    role = message.get('role')
+    return str(getattr(role, 'value', role))
+
+
+def apply_path_map(text, path_map):
+    """Rewrite recorded paths (e.g. the desktop folder) to the paths of the current run"""
+    for recorded, current in (path_map or {}).items():
+        text = text.replace(recorded, current)
+        # Prompts sometimes carry the Windows form of the same path
+        text = text.replace(recorded.replace('/', '\\'), current)
+    return text
+
+
+def normalize_task(text):
+    return re.sub(r'\s+', ' ', re.sub(r'^\s*Task:\s*', '', text)).strip()
+
+
+def conversation_position(messages):
+    """(task, turn) identifying where in which ReAct run a prompt sits.
+
+    Observations contain timestamps and memory addresses that differ run to run, so
+    replay is keyed on the task text and how many assistant turns came before it.
+    """
+    task = ''
+    for message in messages:
+        if _role(message) == 'user':
+            task = _message_text(message)
+            break
+    turn = sum(_role(message) == 'assistant' for message in messages)
+    return normalize_task(task), turn
+
+
+class TranscriptRecorder:
+    """Wrap a live engine and append every exchange to a JSONL transcript for later replay"""
+
+    def __init__(self, engine, transcript_path):
+        self.engine = engine
+        self.transcript_path = transcript_path
+        self._lock = threading.Lock()
+        self.last_input_token_count = None
+        self.last_output_token_count = None
+        os.makedirs(os.path.dirname(os.path.abspath(transcript_path)), exist_ok=True)
+
+    def __call__(self, messages, stop_sequences=None, grammar=None):
+        start = time.perf_counter()
+        response = self.engine(messages, stop_sequences=stop_sequences, grammar=grammar)
+        latency = time.perf_counter() - start
+        self.last_input_token_count = getattr(self.engine, 'last_input_token_count', None)
+        self.last_output_token_count = getattr(self.engine, 'last_output_token_count', None)
+        task, turn = conversation_position(messages)
+        entry = {
+            'task': task,
+            'turn': turn,
+            'response': response,
+            'latency_seconds': round(latency, 3),
+            'prompt_tokens': self.last_input_token_count,
+            'completion_tokens': self.last_output_token_count
+        }
+        with self._lock:
+            with open(self.transcript_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+        return response
+
+
+class TranscriptReplayEngine:
+    """Offline engine answering each ReAct turn from a recorded transcript.
+
+    path_map rewrites the recorded run's paths to the current run's in both prompts
+    and responses. latency_scale replays the recorded LLM latency (0 replays instantly).
+    """
+
+    def __init__(self, transcript_path=None, path_map=None, latency_scale=0.0, strict=False):
+        self.transcript_path = transcript_path
+        self.path_map = dict(path_map or {})
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self.recorded = []
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.last_input_token_count = 0
+        self.last_output_token_count = 0
+        self._lock = threading.Lock()
+        if transcript_path:
+            self.load(transcript_path)
+
+    def load(self, transcript_path):
+        if not os.path.exists(transcript_path):
+            print(f"Transcript {transcript_path} not found; only scripted steps will be answered")
+            return
+        with open(transcript_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    self.add(json.loads(line))
+
+    def _index(self, entry):
+        task = normalize_task(apply_path_map(entry['task'], self.path_map))
+        self.entries[(task, entry['turn'])] = entry
+
+    def add(self, entry):
+        """Later recordings of the same turn replace earlier ones"""
+        with self._lock:
+            self.recorded.append(entry)
+            self._index(entry)
+
+    def set_path_map(self, path_map):
+        """Point the recorded paths at a new run's directory and re-key the transcript"""
+        with self._lock:
+            self.path_map = dict(path_map or {})
+            self.entries = {}
+            for entry in self.recorded:
+                self._index(entry)
+
+    def has_step(self, task_text, turn):
+        return (normalize_task(task_text), turn) in self.entries
+
+    def add_step(self, task_text, turn, response, latency_seconds=0.0):
+        """Script a turn directly, e.g. a canned cleaning step for benchmarks"""
+        self.add({'task': normalize_task(task_text), 'turn': turn, 'response': response,
+                  'latency_seconds': latency_seconds})
+
+    def __call__(self, messages, stop_sequences=None, grammar=None):
+        key = conversation_position(messages)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            if self.strict:
+                raise LookupError(f"No transcript entry for turn {key[1]} of task '{key[0][:60]}...'")
+            return MISSING_STEP_RESPONSE
+
+        self.hits += 1
+        if self.latency_scale:
+            time.sleep(entry.get('latency_seconds', 0) * self.latency_scale)
+        self.last_input_token_count = entry.get('prompt_tokens') or 0
+        self.last_output_token_count = entry.get('completion_tokens') or 0
+        response = apply_path_map(entry['response'], self.path_map)
+        for stop_sequence in stop_sequences or []:
+            if response.endswith(stop_sequence):
+                response = response[:-len(stop_sequence)]
+        return response
+
+
+class SampledHfApiEngine(HfApiEngine):
+    """HfApiEngine with explicit sampling parameters, so parallel attempts explore different answers"""
+
+    def __init__(self, model, token=None, temperature=None, seed=None, top_p=None, max_tokens=1500, timeout=120):
+        super().__init__(model=model, token=token, max_tokens=max_tokens, timeout=timeout)
+        self.sampling = {'temperature': temperature, 'seed': seed, 'top_p': top_p}
+
+    def generate(self, messages, stop_sequences=None, grammar=None):
+        messages = get_clean_message_list(messages, role_conversions=llama_role_conversions)
+        sampling = {name: value for name, value in self.sampling.items() if value is not None}
+        if grammar is not None:
+            sampling['response_format'] = grammar
+        response = self.client.chat_completion(messages, stop=stop_sequences, max_tokens=self.max_tokens, **sampling)
+        return response.choices[0].message.content
+
+
+def create_local_engine(model_name, max_new_tokens=1500, device_map='auto'):
+    """Small local model through transformers' own TransformersEngine (needs torch)"""
+    try:
+        from transformers import pipeline
+        from transformers.agents.llm_engine import TransformersEngine
+    except ImportError as e:
+        raise ImportError("The local backend needs torch and a transformers build with pipelines") from e
+    print(f"Loading local model {model_name}")
+    generator = pipeline("text-generation", model=model_name, device_map=device_map,
+                         max_new_tokens=max_new_tokens)
+    return TransformersEngine(generator, model_id=model_name)
@@ -0,0 +1,287 @@
+import json
+import sqlite3
+import statistics
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    recorded_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total_seconds REAL,
+    wall_seconds REAL,
+    parallel_speedup REAL,
+    llm_cache_hit_rate REAL,
+    report_json TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_recorded_at ON runs (recorded_at);
+
+CREATE TABLE IF NOT EXISTS phases (
+    run_id TEXT NOT NULL REFERENCES runs (run_id),
+    phase TEXT NOT NULL,
+    status TEXT NOT NULL,
+    model_name TEXT,
+    attempts INTEGER,
+    failures INTEGER,
+    duration_seconds REAL,
+    start_offset_seconds REAL,
+    end_offset_seconds REAL,
+    llm_seconds REAL,
+    code_seconds REAL,
+    llm_calls INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    PRIMARY KEY (run_id, phase)
+);
+CREATE INDEX IF NOT EXISTS idx_phases_phase ON phases (phase, run_id);
+
+CREATE TABLE IF NOT EXISTS attempts (
+    run_id TEXT NOT NULL REFERENCES runs (run_id),
+    phase TEXT NOT NULL,
+    attempt INTEGER NOT NULL,
+    duration_seconds REAL,
+    succeeded INTEGER,
+    error TEXT,
+    failure_class TEXT,
+    resumed INTEGER,
+    PRIMARY KEY (run_id, phase, attempt)
+);
+
+-- Running totals maintained on insert so dashboards never scan the full history
+CREATE TABLE IF NOT EXISTS phase_stats (
+    phase TEXT PRIMARY KEY,
+    runs INTEGER NOT NULL,
+    failed_runs INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    failed_attempts INTEGER NOT NULL,
+    total_seconds REAL NOT NULL,
+    last_seconds REAL,
+    last_status TEXT,
+    last_recorded_at TEXT
+);
+"""
+
+UPSERT_PHASE_STATS = """
+INSERT INTO phase_stats VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (phase) DO UPDATE SET
+    runs = runs + 1,
+    failed_runs = failed_runs + excluded.failed_runs,
+    attempts = attempts + excluded.attempts,
+    failed_attempts = failed_attempts + excluded.failed_attempts,
+    total_seconds = total_seconds + excluded.total_seconds,
+    last_seconds = excluded.last_seconds,
+    last_status = excluded.last_status,
+    last_recorded_at = excluded.last_recorded_at
+"""
+
+
+def duration_seconds(value):
+    """Parse str(timedelta) values such as '0:06:09.968116' or '1 day, 0:00:01'"""
+    if value in (None, '', 'None'):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    days = 0
+    if 'day' in value:
+        day_part, value = value.split(',', 1)
+        days = int(day_part.split()[0])
+    hours, minutes, seconds = value.strip().split(':')
+    return days * 86400 + int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _percentile(values, percentile):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * percentile / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class RunHistoryStore:
+    """Append-only SQLite history: one row per run, per phase and per attempt"""
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self._connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def record_run(self, run_id, report):
+        phases = report.get('phases', {})
+        breakdown = report.get('time_breakdown', {})
+        schedule = report.get('schedule') or {}
+        statuses = [phase['status'] for phase in phases.values()]
+        status = 'success' if statuses and all(s in ('success', 'cached') for s in statuses) else 'failed'
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, report.get('timestamp'), status,
+                 duration_seconds(report.get('total_duration')),
+                 schedule.get('wall_seconds'), schedule.get('parallel_speedup'),
+                 (report.get('llm_cache') or {}).get('hit_rate'),
+                 json.dumps(report, default=str))
+            )
+            for phase_name, phase in phases.items():
+                phase_breakdown = breakdown.get(phase.get('phase_key', phase_name), {})
+                seconds = duration_seconds(phase.get('total_duration'))
+                connection.execute(
+                    "INSERT INTO phases VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, phase_name, phase['status'], phase.get('model_name'),
+                     phase.get('total_attempts'), phase.get('failed_attempts'),
+                     seconds,
+                     phase.get('start_offset_seconds'), phase.get('end_offset_seconds'),
+                     phase_breakdown.get('llm_seconds'), phase_breakdown.get('code_seconds'),
+                     phase_breakdown.get('llm_calls'), phase_breakdown.get('prompt_tokens'),
+                     phase_breakdown.get('completion_tokens'))
+                )
+                connection.execute(
+                    UPSERT_PHASE_STATS,
+                    (phase_name, int(phase['status'] == 'failed'), phase.get('total_attempts') or 0,
+                     phase.get('failed_attempts') or 0, seconds or 0.0, seconds, phase['status'],
+                     report.get('timestamp'))
+                )
+                for attempt in phase.get('attempts', []):
+                    connection.execute(
+                        "INSERT INTO attempts (run_id, phase, attempt, duration_seconds, succeeded, error, "
+                        "failure_class, resumed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (run_id, phase_name, attempt['attempt'], attempt.get('seconds'),
+                         int(bool(attempt.get('succeeded'))), attempt.get('error'),
+                         attempt.get('failure_class'), int(bool(attempt.get('resumed'))))
+                    )
+
+    def recent_runs(self, limit=20):
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT run_id, recorded_at, status, total_seconds, wall_seconds, parallel_speedup, "
+                "llm_cache_hit_rate FROM runs ORDER BY recorded_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def phase_stats(self):
+        """Pre-aggregated per-phase totals: O(phases) regardless of history length"""
+        with closing(self._connect()) as connection:
+            rows = connection.execute("SELECT * FROM phase_stats ORDER BY phase").fetchall()
+        stats = []
+        for row in rows:
+            entry = dict(row)
+            entry['mean_seconds'] = round(entry['total_seconds'] / entry['runs'], 3) if entry['runs'] else None
+            entry['run_failure_rate'] = round(entry['failed_runs'] / entry['runs'], 4) if entry['runs'] else 0.0
+            stats.append(entry)
+        return stats
+
+    def phase_trend(self, limit=100):
+        """Per-phase durations of the last `limit` runs, oldest first, for trend charts"""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT r.run_id, r.recorded_at, p.phase, p.status, p.duration_seconds, p.model_name "
+                "FROM (SELECT run_id, recorded_at FROM runs ORDER BY recorded_at DESC LIMIT ?) r "
+                "JOIN phases p ON p.run_id = r.run_id ORDER BY r.recorded_at, p.phase", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _phase_durations(self, phase=None, last_n=None, status=None):
+        query = ("SELECT p.phase, p.duration_seconds, p.model_name, r.recorded_at FROM phases p "
+                 "JOIN runs r ON r.run_id = p.run_id WHERE p.duration_seconds IS NOT NULL")
+        params = []
+        if phase:
+            query += " AND p.phase = ?"
+            params.append(phase)
+        if status:
+            query += " AND p.status = ?"
+            params.append(status)
+        query += " ORDER BY r.recorded_at DESC"
+        with closing(self._connect()) as connection:
+            rows = connection.execute(query, params).fetchall()
+
+        durations = {}
+        for row in rows:
+            series = durations.setdefault(row['phase'], [])
+            if last_n is None or len(series) < last_n:
+                series.append((row['duration_seconds'], row['model_name'], row['recorded_at']))
+        return durations
+
+    def phase_latency_percentiles(self, phase=None, percentiles=(50, 90, 99), last_n=None):
+        """{phase: {'count', 'p50', 'p90', ...}} over successful runs (cached runs excluded)"""
+        result = {}
+        for phase_name, series in self._phase_durations(phase, last_n, status='success').items():
+            values = [duration for duration, _, _ in series]
+            result[phase_name] = {'count': len(values)}
+            for percentile in percentiles:
+                result[phase_name][f"p{percentile}"] = round(_percentile(values, percentile), 3)
+        return result
+
+    def failure_rates(self, last_n=None):
+        query = ("SELECT p.phase, p.status, p.attempts, p.failures FROM phases p "
+                 "JOIN runs r ON r.run_id = p.run_id ORDER BY r.recorded_at DESC")
+        with closing(self._connect()) as connection:
+            rows = connection.execute(query).fetchall()
+
+        totals = {}
+        for row in rows:
+            entry = totals.setdefault(row['phase'], {'runs': 0, 'failed_runs': 0, 'attempts': 0, 'failed_attempts': 0})
+            if last_n is not None and entry['runs'] >= last_n:
+                continue
+            entry['runs'] += 1
+            entry['failed_runs'] += int(row['status'] == 'failed')
+            entry['attempts'] += row['attempts'] or 0
+            entry['failed_attempts'] += row['failures'] or 0
+        for entry in totals.values():
+            entry['run_failure_rate'] = round(entry['failed_runs'] / entry['runs'], 4) if entry['runs'] else 0.0
+            entry['attempt_failure_rate'] = (
+                round(entry['failed_attempts'] / entry['attempts'], 4) if entry['attempts'] else 0.0
+            )
+        return totals
+
+    def retry_outcomes(self, last_n_runs=None):
+        """{phase: {failure_class: {'failures', 'recovered', 'wasted_seconds'}}} across runs"""
+        query = ("SELECT a.run_id, a.phase, a.attempt, a.failure_class, a.duration_seconds, a.succeeded "
+                 "FROM attempts a JOIN runs r ON r.run_id = a.run_id")
+        params = []
+        if last_n_runs is not None:
+            query += " WHERE r.run_id IN (SELECT run_id FROM runs ORDER BY recorded_at DESC LIMIT ?)"
+            params.append(last_n_runs)
+        query += " ORDER BY a.run_id, a.phase, a.attempt"
+        with closing(self._connect()) as connection:
+            rows = connection.execute(query, params).fetchall()
+
+        succeeded = {(row['run_id'], row['phase']) for row in rows if row['succeeded']}
+        outcomes = {}
+        for row in rows:
+            if row['succeeded'] or not row['failure_class']:
+                continue
+            entry = outcomes.setdefault(row['phase'], {}).setdefault(
+                row['failure_class'], {'failures': 0, 'recovered': 0, 'wasted_seconds': 0.0}
+            )
+            entry['failures'] += 1
+            entry['recovered'] += int((row['run_id'], row['phase']) in succeeded)
+            entry['wasted_seconds'] = round(entry['wasted_seconds'] + (row['duration_seconds'] or 0), 3)
+        return outcomes
+
+    def detect_regressions(self, recent_runs=5, baseline_runs=20, threshold=1.5, min_baseline=3):
+        """Phases whose recent median latency is threshold x slower than the preceding baseline"""
+        regressions = []
+        durations = self._phase_durations(last_n=recent_runs + baseline_runs, status='success')
+        for phase_name, series in durations.items():
+            recent, baseline = series[:recent_runs], series[recent_runs:]
+            if not recent or len(baseline) < min_baseline:
+                continue
+            recent_median = statistics.median(d for d, _, _ in recent)
+            baseline_median = statistics.median(d for d, _, _ in baseline)
+            if baseline_median and recent_median / baseline_median >= threshold:
+                regressions.append({
+                    'phase': phase_name,
+                    'recent_median_seconds': round(recent_median, 3),
+                    'baseline_median_seconds': round(baseline_median, 3),
+                    'slowdown': round(recent_median / baseline_median, 2),
+                    'recent_models': sorted({m for _, m, _ in recent if m}),
+                    'baseline_models': sorted({m for _, m, _ in baseline if m})
+                })
+        return regressions
@@ -1,47 +1,244 @@
-from transformers import ReactCodeAgent, HfApiEngine
+import ast
+import hashlib
+import re
+import threading
+
+from AI_Agent_Registry import get_registry
+
+MODULE_NAME = re.compile(r'^[A-Za-z_]\w*(\.[A-Za-z_]\w*)*$')
+
+# Whole tasks the workflow runs -> their complete imports; a match needs no other lookup
+TASK_RULES = [
+    (r'automated supervised ml modeling', [
+        'pandas', 'pyarrow', 'openpyxl', 'numpy', 'sklearn.model_selection', 'sklearn.preprocessing',
+        'sklearn.compose', 'sklearn.impute', 'sklearn.pipeline', 'sklearn.linear_model', 'sklearn.ensemble',
+        'sklearn.tree', 'sklearn.metrics', 'xgboost', 'joblib', 'datetime', 'json', 'warnings']),
+    (r'automated unsupervised ml analysis', [
+        'pandas', 'pyarrow', 'openpyxl', 'numpy', 'scipy.sparse', 'sklearn.cluster', 'sklearn.decomposition',
+        'sklearn.ensemble', 'sklearn.manifold', 'sklearn.neighbors', 'sklearn.metrics',
+        'mlxtend.frequent_patterns', 'umap', 'seaborn', 'matplotlib', 'joblib', 'datetime', 'json']),
+]
+
+# Known task patterns -> imports. The rules answer alone only when no LIBRARY_TERMS match is left over
+IMPORT_RULES = [
+    (r'\bexcel\b|\.xlsx?\b|read_excel', ['pandas', 'openpyxl']),
+    (r'\bparquet\b', ['pandas', 'pyarrow']),
+    (r'\bcsv\b|\bdataframe\b|\bpandas\b|load (the )?data', ['pandas']),
+    (r'\bnumpy\b|\barrays?\b|mixed types|missing values', ['numpy']),
+    (r'\bxgboost\b|\bxgb\b', ['xgboost']),
+    (r'\blightgbm\b', ['lightgbm']),
+    (r'classifier|classification|regress|random forest|logistic|decision tree|train[ /-]?test|'
+     r'cross.?validat|hyperparameter', ['sklearn', 'sklearn.model_selection']),
+    (r'logistic|linear regression|\bridge\b|\blasso\b|\bsgd\b', ['sklearn.linear_model']),
+    (r'random forest|isolation forest|gradient boost\w*|extra trees|\bensemble\b', ['sklearn.ensemble']),
+    (r'decision tree', ['sklearn.tree']),
+    (r'nearest neighbou?rs?|\bk-?nn\b|local outlier factor|\blof\b', ['sklearn.neighbors']),
+    (r'\bt-?sne\b|\bmanifold\b|\bisomap\b', ['sklearn.manifold']),
+    (r'\bumap\b', ['umap']),
+    (r'\bapriori\b|fp-?growth|association rules?|frequent itemsets?', ['mlxtend.frequent_patterns']),
+    (r'\bscipy\b|\bsparse\b', ['scipy', 'scipy.sparse']),
+    (r'scal(e|ing|er)\b|normali[sz]|one.?hot|encod|imput', ['sklearn.preprocessing']),
+    (r'metrics?\b|accuracy|precision|recall|f1|roc|auc|confusion|classification report|'
+     r'mean squared error|\bmse\b', ['sklearn.metrics']),
+    (r'cluster|k-?means|dbscan|silhouette|hierarchical|agglomerative|spectral', ['sklearn.cluster', 'sklearn.metrics']),
+    (r'\bpca\b|dimensionality reduction', ['sklearn.decomposition']),
+    (r'plot|chart|visuali[sz]|graph|heatmap|histogram|roc curve', ['matplotlib', 'matplotlib.pyplot']),
+    (r'\bseaborn\b|heatmap', ['seaborn']),
+    (r'\bplotly\b', ['plotly']),
+    (r'\bjoblib\b|save (the )?model|persist (the )?model', ['joblib']),
+    (r'\bdates?\b|timestamp|\bdatetime\b', ['datetime']),
+    (r'\bjson\b', ['json']),
+]
+
+# Libraries and techniques that need imports of their own; one no rule matched sends the task to the LLM
+LIBRARY_TERMS = re.compile(
+    r'\b(tensorflow|keras|pytorch|torch|neural net\w*|deep learning|lstm|transformers?|statsmodels|arima|'
+    r'prophet|time series|forecast\w*|catboost|nltk|spacy|tf-?idf|word2vec|gensim|embeddings?|sentiment|'
+    r'svm|support vector|naive bayes|gaussian mixture|optuna|shap|smote|imbalanced|networkx|opencv|'
+    r'bokeh|altair|dask|polars|pyspark|sql\w*)\b',
+    re.IGNORECASE
+)
+
+ANALYSIS_PROMPT = """Analyze this ML task and list ONLY required Python imports:
+{task_prompt}
+
+Consider these aspects:
+1. Data loading (pandas? openpyxl? numpy?)
+2. Model types (sklearn? xgboost? tensorflow?)
+3. Preprocessing (StandardScaler? OneHotEncoder?)
+4. Metrics (classification_report? mean_squared_error?)
+5. Visualization (matplotlib? seaborn?)
+6. Utilities (joblib? datetime?)
+
+Return ONLY a Python list of import strings, example:
+['pandas', 'sklearn.preprocessing.StandardScaler', 'xgboost']
+"""
+
+
+def normalize_prompt(task_prompt):
+    return re.sub(r'\s+', ' ', task_prompt).strip().lower()
+
+
+def prompt_key(task_prompt):
+    return hashlib.sha256(normalize_prompt(task_prompt).encode('utf-8')).hexdigest()
+
+
+def parse_import_list(text):
+    """Parse the model's answer with ast.literal_eval, keeping only valid module paths.
+
+    Raises ValueError when the answer holds no Python list of strings.
+    """
+    text = re.sub(r'```(?:py|python)?', '', text or '')
+    match = re.search(r'\[.*?\]', text, re.DOTALL)
+    if match is None:
+        raise ValueError(f"No import list in model answer: {text[:200]!r}")
+    try:
+        value = ast.literal_eval(match.group(0))
+    except (ValueError, SyntaxError) as e:
+        raise ValueError(f"Model answer is not a Python literal list: {match.group(0)[:200]!r}") from e
+    if not isinstance(value, (list, tuple)):
+        raise ValueError(f"Expected a list of imports, got {type(value).__name__}")
+
+    imports = []
+    for item in value:
+        if not isinstance(item, str):
+            continue
+        # Accept "import x", "from x import y" as well as bare module paths
+        item = re.sub(r'^\s*(from\s+(\S+)\s+import\s+\S+|import\s+(\S+)).*$', r'\2\3', item).strip()
+        if MODULE_NAME.match(item) and item not in imports:
+            imports.append(item)
+    return imports
+
 
 class ImportRecommenderAgent:
-    def __init__(self, hf_token):
-        self.engine = HfApiEngine(
-            model="Qwen/Qwen2.5-Coder-32B-Instruct",
-            token=hf_token
-        )
-    
+    """Recommend additional_authorized_imports for a task, offline first.
+
+    Tasks matching a TASK_RULES pattern get that rule's imports. Otherwise IMPORT_RULES are
+    used alone only when they cover the task: something matched and no LIBRARY_TERMS mention
+    is left unmatched. Anything else goes to the LLM through the shared registry engine (so
+    answers also land in the LLM response cache) and its answer is merged with the rule hits.
+    Results are memoized per prompt hash for the life of the recommender.
+    """
+
+    def __init__(self, hf_token="", model_name="Qwen/Qwen2.5-Coder-32B-Instruct", rules=None, task_rules=None):
+        self.hf_token = hf_token
+        self.model_name = model_name
+        self.rules = [(re.compile(pattern, re.IGNORECASE), imports) for pattern, imports in (rules or IMPORT_RULES)]
+        self.task_rules = [(re.compile(pattern, re.IGNORECASE), imports)
+                           for pattern, imports in (TASK_RULES if task_rules is None else task_rules)]
+        self._memo = {}
+        self._lock = threading.Lock()
+        self.rule_hits = 0
+        self.llm_calls = 0
+        self.memo_hits = 0
+        # Built on the first rule miss, so rule-only use never touches the network
+        self._engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = get_registry().get_agent_engine(self.model_name, self.hf_token, [])
+        return self._engine
+
+    def add_rule(self, pattern, imports):
+        with self._lock:
+            self.rules.append((re.compile(pattern, re.IGNORECASE), list(imports)))
+            # Earlier answers may not reflect the new rule
+            self._memo = {}
+
+    def match_task_rules(self, task_prompt):
+        """Imports of the first whole-task rule matching the prompt, or None"""
+        normalized = normalize_prompt(task_prompt)
+        for pattern, rule_imports in self.task_rules:
+            if pattern.search(normalized):
+                return list(rule_imports)
+        return None
+
+    def match_rules(self, task_prompt):
+        imports = []
+        for pattern, rule_imports in self.rules:
+            if pattern.search(task_prompt):
+                imports.extend(name for name in rule_imports if name not in imports)
+        return imports
+
+    def uncovered_terms(self, task_prompt):
+        """LIBRARY_TERMS mentions in the prompt that no rule match overlaps"""
+        spans = [match.span() for pattern, _ in self.rules for match in pattern.finditer(task_prompt)]
+        terms = []
+        for match in LIBRARY_TERMS.finditer(task_prompt):
+            start, end = match.span()
+            if not any(start < span_end and span_start < end for span_start, span_end in spans):
+                term = match.group(0).lower()
+                if term not in terms:
+                    terms.append(term)
+        return terms
+
+    def _ask_llm(self, task_prompt):
+        answer = self.engine([{'role': 'user', 'content': ANALYSIS_PROMPT.format(task_prompt=task_prompt)}])
+        return parse_import_list(answer)
+
     def get_required_imports(self, task_prompt):
-        analysis_prompt = f"""Analyze this ML task and list ONLY required Python imports:
-        {task_prompt}
-
-        Consider these aspects:
-        1. Data loading (pandas? openpyxl? numpy?)
-        2. Model types (sklearn? xgboost? tensorflow?)
-        3. Preprocessing (StandardScaler? OneHotEncoder?)
-        4. Metrics (classification_report? mean_squared_error?)
-        5. Visualization (matplotlib? seaborn?)
-        6. Utilities (joblib? datetime?)
-
-        Return ONLY a Python list of import strings, example:
-        ['pandas', 'sklearn.preprocessing.StandardScaler', 'xgboost']
-        """
-        
-        return eval(self.engine(analysis_prompt))
-
-# Initialize agents
-hf_token = ""
-import_advisor = ImportRecommenderAgent(hf_token)
-task = """
-1. Load Excel data with mixed types
-2. Build XGBoost classifier with feature scaling
-3. Generate classification metrics and ROC curve
-"""
+        key = prompt_key(task_prompt)
+        with self._lock:
+            if key in self._memo:
+                self.memo_hits += 1
+                return list(self._memo[key])
 
-required_imports = import_advisor.get_required_imports(task)
-print("Detected required imports:", required_imports)
+        imports = self.match_task_rules(task_prompt)
+        if imports is not None:
+            self.rule_hits += 1
+        else:
+            imports = self.match_rules(task_prompt)
+            if imports and not self.uncovered_terms(task_prompt):
+                self.rule_hits += 1
+            else:
+                self.llm_calls += 1
+                try:
+                    llm_imports = self._ask_llm(task_prompt)
+                except ValueError as e:
+                    # Not memoized, so a later call gets another chance
+                    print(f"Import recommendation failed: {str(e)}")
+                    return list(imports)
+                imports.extend(name for name in llm_imports if name not in imports)
 
-ml_agent = ReactCodeAgent(
-    llm_engine=HfApiEngine(model="Qwen/Qwen2.5-Coder-32B-Instruct", token=hf_token),
-    additional_authorized_imports=required_imports,
-    add_base_tools=True,
-    max_iterations=15
-)
+        with self._lock:
+            self._memo[key] = imports
+        return list(imports)
+
+    def stats(self):
+        return {'rule_hits': self.rule_hits, 'llm_calls': self.llm_calls, 'memo_hits': self.memo_hits}
+
+
+_recommender = None
+_recommender_lock = threading.Lock()
+
+
+def get_import_recommender():
+    global _recommender
+    with _recommender_lock:
+        if _recommender is None:
+            _recommender = ImportRecommenderAgent()
+        return _recommender
+
+
+if __name__ == "__main__":
+    from transformers import ReactCodeAgent
+
+    import_advisor = get_import_recommender()
+    task = """
+    1. Load Excel data with mixed types
+    2. Build XGBoost classifier with feature scaling
+    3. Generate classification metrics and ROC curve
+    """
+
+    required_imports = import_advisor.get_required_imports(task)
+    print("Detected required imports:", required_imports)
+
+    ml_agent = ReactCodeAgent(
+        llm_engine=get_registry().get_agent_engine(import_advisor.model_name, import_advisor.hf_token, required_imports),
+        additional_authorized_imports=required_imports,
+        add_base_tools=True,
+        max_iterations=15
+    )
 
-generated_code = ml_agent.run(task)
\ No newline at end of file
+    generated_code = ml_agent.run(task)
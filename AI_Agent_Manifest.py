@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """sha256 of a file's contents (or of every file in a partitioned dataset), None if missing"""
+    if not path or not os.path.exists(path):
+        return None
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+        )
+    else:
+        files = [path]
+
+    digest = hashlib.sha256()
+    for file_path in files:
+        digest.update(os.path.relpath(file_path, path).encode('utf-8'))
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_value(value):
+    blob = json.dumps(value, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(blob).hexdigest()
+
+
+class BuildManifest:
+    """Records what each phase was built from so unchanged phases can be skipped"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f).get('phases', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'phases': self.entries}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def fingerprint(self, inputs, agent=None):
+        """Hash every input that can change what a phase produces"""
+        fingerprint = {'inputs': {path: hash_file(path) for path in inputs}}
+        if agent is not None:
+            fingerprint['prompt'] = hash_value(getattr(agent, 'task', None))
+            fingerprint['authorized_imports'] = hash_value(sorted(getattr(agent, 'authorized_imports', [])))
+            fingerprint['model_name'] = getattr(agent, 'model_name', None)
+        return fingerprint
+
+    def is_up_to_date(self, phase_name, fingerprint, outputs):
+        entry = self.entries.get(phase_name)
+        if not entry or entry.get('fingerprint') != fingerprint:
+            return False
+        if any(value is None for value in fingerprint['inputs'].values()):
+            return False
+        recorded_outputs = entry.get('outputs', {})
+        for path in outputs:
+            current = hash_file(path)
+            if current is None or recorded_outputs.get(path) != current:
+                return False
+        return True
+
+    def record(self, phase_name, fingerprint, outputs):
+        with self._lock:
+            self.entries[phase_name] = {
+                'fingerprint': fingerprint,
+                'outputs': {path: hash_file(path) for path in outputs},
+                'built_at': str(datetime.now())
+            }
+            self._save()
+
+    def invalidate(self, phase_name):
+        with self._lock:
+            if self.entries.pop(phase_name, None) is not None:
+                self._save()
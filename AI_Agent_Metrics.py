@@ -1,20 +1,231 @@
-from transformers import ReactCodeAgent, HfApiEngine
-from huggingface_hub import login
+from transformers import ReactCodeAgent
+import json
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from AI_Agent_Async import run_agent_async, run_in_executor
+from AI_Agent_Context import ContextBudget
+from AI_Agent_Manifest import hash_value
+from AI_Agent_Registry import get_registry
+from AI_Agent_Retry import prepare_resume, run_agent
+from AI_Agent_Sandbox import get_sandbox_pool
+from AI_Agent_Storage import DEFAULT_OUTPUT_DIR, read_frame
+from AI_Agent_Tracing import get_tracer
+
+# Bump to redraw every cached chart after changing how charts are drawn
+RENDERER_VERSION = 1
+CHART_INDEX = ".chart_index.json"
+DURATION = re.compile(r"(?:(\d+) days?, )?(\d+):(\d+):(\d+(?:\.\d+)?)")
+REPORT_STATISTICS = ('precision', 'recall', 'f1-score')
+
+
+def duration_minutes(text):
+    """Minutes in a str(timedelta) such as '0:01:30.5' or '1 day, 2:00:00'; None if unparseable"""
+    match = DURATION.fullmatch(str(text).strip())
+    if not match:
+        return None
+    days, hours, minutes, seconds = match.groups()
+    return int(days or 0) * 1440 + int(hours) * 60 + int(minutes) + float(seconds) / 60
+
+
+def _label(name):
+    return str(name).replace('_', ' ').title()
+
+
+def workflow_charts(report):
+    """Chart specs for workflow_metrics.json: phase durations, status counts, attempts vs failures"""
+    phases = report.get('phases') or {}
+    charts = []
+    durations = {_label(name): duration_minutes(phase.get('total_duration'))
+                 for name, phase in phases.items() if phase.get('total_duration') is not None}
+    durations = {name: minutes for name, minutes in durations.items() if minutes is not None}
+    if durations:
+        charts.append({'name': 'workflow_durations', 'kind': 'bar', 'title': 'Phase durations',
+                       'ylabel': 'minutes', 'labels': list(durations), 'values': list(durations.values())})
+    statuses = Counter(str(phase['status']) for phase in phases.values() if phase.get('status'))
+    if statuses:
+        charts.append({'name': 'workflow_status', 'kind': 'pie', 'title': 'Phase status',
+                       'labels': list(statuses), 'values': list(statuses.values())})
+    attempts = {_label(name): phase for name, phase in phases.items() if 'total_attempts' in phase}
+    if attempts:
+        charts.append({'name': 'workflow_attempts', 'kind': 'grouped', 'title': 'Attempts vs failed attempts',
+                       'ylabel': 'count', 'labels': list(attempts),
+                       'series': {'attempts': [p['total_attempts'] or 0 for p in attempts.values()],
+                                  'failed_attempts': [p.get('failed_attempts') or 0 for p in attempts.values()]}})
+    return charts
+
+
+def _metric_numbers(values):
+    """(series name -> number) comparable across models, or None if values can't be plotted"""
+    if isinstance(values, str):
+        try:
+            values = json.loads(values)
+        except ValueError:
+            return None
+    if isinstance(values, bool):
+        return None
+    # A null or non-numeric cell only drops this row, not the whole chart
+    try:
+        if isinstance(values, (int, float)):
+            return {'value': float(values)}
+        if isinstance(values, list) and values and all(isinstance(row, list) for row in values):
+            total = sum(sum(row) for row in values)
+            correct = sum(row[i] for i, row in enumerate(values) if i < len(row))
+            return {'accuracy': correct / total} if total else None
+        if isinstance(values, dict) and isinstance(values.get('weighted avg'), dict):
+            return {f"weighted {statistic}": float(values['weighted avg'][statistic])
+                    for statistic in REPORT_STATISTICS if statistic in values['weighted avg']}
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def metric_charts(frame):
+    """One chart spec per Metric Type in confusion.csv, comparing models"""
+    charts = []
+    if frame.empty or not {'Model Name', 'Metric Type', 'Metric Values'} <= set(frame.columns):
+        return charts
+    for metric, rows in frame.groupby('Metric Type', sort=False):
+        numbers = {}
+        for model, values in zip(rows['Model Name'], rows['Metric Values']):
+            parsed = _metric_numbers(values)
+            if parsed:
+                numbers[str(model)] = parsed
+        series_names = [name for name in next(iter(numbers.values()), {})
+                        if all(name in parsed for parsed in numbers.values())]
+        if not series_names:
+            continue
+        name = f"metric_{str(metric).lower().replace(' ', '_')}"
+        labels = list(numbers)
+        if series_names == ['value']:
+            charts.append({'name': name, 'kind': 'bar', 'title': str(metric), 'ylabel': str(metric),
+                           'labels': labels, 'values': [numbers[m]['value'] for m in labels]})
+        else:
+            charts.append({'name': name, 'kind': 'grouped', 'title': str(metric), 'ylabel': 'score',
+                           'labels': labels,
+                           'series': {s: [numbers[m][s] for m in labels] for s in series_names}})
+    return charts
+
+
+class MetricsRenderer:
+    """Draw chart specs straight to PNG on matplotlib's Agg canvas: headless and without pyplot.
+
+    Every chart gets its own Figure, so charts render in parallel threads. A chart is only
+    redrawn when the hash of its spec differs from the one in the output directory's chart
+    index (or its PNG is gone); unchanged charts are reused as they are.
+    """
+
+    def __init__(self, output_dir, max_workers=None):
+        self.output_dir = output_dir
+        self.index_path = os.path.join(output_dir, CHART_INDEX)
+        self.max_workers = max_workers or min(8, os.cpu_count() or 2)
+        self.last_render = {}
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def path_for(self, spec):
+        return os.path.join(self.output_dir, f"{spec['name']}.png")
+
+    def _draw(self, spec):
+        figure = Figure(figsize=(8, 5))
+        FigureCanvasAgg(figure)
+        axes = figure.add_subplot()
+        labels = spec['labels']
+        if spec['kind'] == 'pie':
+            axes.pie(spec['values'], labels=labels, autopct='%1.0f%%')
+            axes.axis('equal')
+        elif spec['kind'] == 'bar':
+            axes.bar(labels, spec['values'])
+        else:
+            width = 0.8 / len(spec['series'])
+            for i, (series, values) in enumerate(spec['series'].items()):
+                axes.bar([x - 0.4 + width * (i + 0.5) for x in range(len(labels))], values, width, label=series)
+            axes.set_xticks(range(len(labels)), labels)
+            axes.legend()
+        if spec['kind'] != 'pie':
+            axes.set_ylabel(spec.get('ylabel', ''))
+            axes.tick_params(axis='x', labelrotation=20)
+        axes.set_title(spec['title'])
+        figure.tight_layout()
+
+        path = self.path_for(spec)
+        tmp_path = f"{path}.tmp"
+        figure.savefig(tmp_path, format='png', dpi=100)
+        os.replace(tmp_path, path)
+        return path
+
+    def _draw_safely(self, spec):
+        try:
+            return self._draw(spec)
+        except Exception as e:
+            print(f"Failed to plot {spec['name']}: {str(e)}")
+            return None
+
+    def render(self, specs):
+        """Paths of the PNGs for specs, drawing only charts whose data changed"""
+        start = time.perf_counter()
+        os.makedirs(self.output_dir, exist_ok=True)
+        index = self._load_index()
+        keys = {spec['name']: hash_value([RENDERER_VERSION, spec]) for spec in specs}
+        stale = [spec for spec in specs
+                 if index.get(spec['name']) != keys[spec['name']] or not os.path.exists(self.path_for(spec))]
+
+        drawn = []
+        if stale:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(stale)),
+                                    thread_name_prefix='charts') as executor:
+                drawn = list(executor.map(self._draw_safely, stale))
+        failed = [spec['name'] for spec, path in zip(stale, drawn) if path is None]
+        for spec, path in zip(stale, drawn):
+            if path is not None:
+                index[spec['name']] = keys[spec['name']]
+            else:
+                index.pop(spec['name'], None)
+        self._save_index(index)
+        if specs and len(failed) == len(specs):
+            raise RuntimeError(f"Could not draw any of {len(specs)} charts")
+
+        self.last_render = {
+            'charts': len(specs),
+            'rendered': len(stale) - len(failed),
+            'reused': len(specs) - len(stale),
+            'failed': failed,
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+        print(f"Charts: {self.last_render['rendered']} drawn, {self.last_render['reused']} unchanged, "
+              f"{len(failed)} failed in {self.last_render['seconds']}s")
+        return [self.path_for(spec) for spec in specs if spec['name'] not in failed]
+
 
 class MetricsVisualizer:
-    def __init__(self):
+    def __init__(self, workflow_file=None, confusion_file=None, output_dir=None, workflow_charts=True):
         self.hf_token = ""
         self.model_name = "Qwen/Qwen2.5-Coder-32B-Instruct"
-        self.workflow_file = "C:/Users/suman/OneDrive/Desktop/AI Agents/workflow_metrics.json"
-        self.confusion_file = "C:/Users/suman/OneDrive/Desktop/AI Agents/confusion.csv"
-        self.task = f"""
-        
-        1. Use 'read_file_as_string' tool to get JSON string from '{self.workflow_file}', then parse with json.loads()
-
-        2. Load CSV data from '{self.confusion_file}' using pandas.read_csv():
-           - Try to read it into a DataFrame
-           - If reading fails (file missing or invalid CSV), set data to an empty DataFrame and print a warning
-        3. Create visualizations with error handling:
+        self.output_dir = output_dir or DEFAULT_OUTPUT_DIR
+        self.workflow_file = workflow_file or f"{self.output_dir}/workflow_metrics.json"
+        self.confusion_file = confusion_file or f"{self.output_dir}/confusion.csv"
+        # The coordinator turns this off and draws the workflow charts from its in-memory report,
+        # since workflow_metrics.json is only written after every phase (this one included) ends
+        self.workflow_charts = workflow_charts
+        workflow_load = f"""
+        - Use 'read_file_as_string' tool to get JSON string from '{self.workflow_file}', then parse with json.loads()
+""" if workflow_charts else ""
+        workflow_plots = """
            - For workflow_metrics.json (if data is not empty):
              * Bar plot of total_duration for each phase:
                - Extract durations from 'phases' key, convert to minutes (assume timedelta strings like '0:00:00')
@@ -25,39 +236,123 @@ class MetricsVisualizer:
                - Skip if no status data
              * Bar plot of attempts vs failed_attempts:
                - Extract from 'phases', compare totals
-               - Skip if no attempt data
+               - Skip if no attempt data""" if workflow_charts else ""
+        workflow_names = """
+           - Name workflow plots as 'workflow_[plot_type].png' (e.g., 'workflow_durations.png')""" if workflow_charts else ""
+        self.task = f"""
+        1. Load inputs:{workflow_load}
+        - Load CSV data from '{self.confusion_file}' using pandas.read_csv():
+           - Try to read it into a DataFrame
+           - If reading fails (file missing or invalid CSV), set data to an empty DataFrame and print a warning
+        2. Create visualizations with error handling:{workflow_plots}
            - For confusion.csv (if DataFrame is not empty):
              * Verify 'Metric Type', 'Model Name', and 'Metric Values' columns exist
              * For each unique value in 'Metric Type' (if column exists):
                - Create a bar plot comparing that metric across models
                - Use 'Model Name' for x-axis, 'Metric Values' for y-axis
                - Skip if data insufficient or columns missing
-        4. Save all plots in 'C:/Users/suman/OneDrive/Desktop/AI Agents/':
-           - Name workflow plots as 'workflow_[plot_type].png' (e.g., 'workflow_durations.png')
+        3. Save all plots in '{self.output_dir}/':{workflow_names}
            - Name metric plots as 'metric_[metric_name].png' (lowercase, replace spaces with '_')
            - If saving fails, print a warning and continue
-        5. Print status messages for each step (e.g., 'Loaded JSON', 'Failed to plot durations', etc.)
+        4. Print status messages for each step (e.g., 'Loaded CSV', 'Failed to plot rmse', etc.)
         """
         self.authorized_imports = ['io','pandas', 'matplotlib', 'matplotlib.pyplot', 'json','plotly','os','openpyxl']
-        self.initialize_environment()
+        # The built-in renderer draws the fixed charts above; the agent is the fallback
+        self.use_native_renderer = True
+        self.renderer = MetricsRenderer(self.output_dir)
+        self.charts = []
+        # Engine and agent are built on first use, not at construction
+        self._code_agent = None
 
     def initialize_environment(self):
         """Initialize the Hugging Face environment and code agent"""
-        self.llm_engine = HfApiEngine(
-            model=self.model_name,
-            token=self.hf_token
+        self.llm_engine = get_registry().get_agent_engine(
+            self.model_name, self.hf_token, self.authorized_imports
         )
-        self.code_agent = ReactCodeAgent(
+        self._code_agent = ReactCodeAgent(
             llm_engine=self.llm_engine,
             tools=[],
             add_base_tools=True,
             max_iterations=50,
             additional_authorized_imports=self.authorized_imports
         )
+        self.llm_engine.tool_names = sorted(self._code_agent.toolbox.tools)
+        # Per-agent prompt shaping and token metering; the report shows prompt size per iteration
+        self.context_budget = ContextBudget()
+        self.context_budget.attach(self._code_agent)
+        sandbox = get_sandbox_pool()
+        sandbox.attach(self._code_agent, self.authorized_imports)
+        sandbox.prefetch(self.confusion_file, 'read_csv')
+        get_tracer().instrument_agent(self._code_agent)
+
+    @property
+    def code_agent(self):
+        if self._code_agent is None:
+            self.initialize_environment()
+        return self._code_agent
+
+    def chart_specs(self):
+        """Specs for every chart the task asks for, skipping inputs that are missing or unreadable"""
+        specs = []
+        if self.workflow_charts:
+            try:
+                with open(self.workflow_file) as f:
+                    specs.extend(workflow_charts(json.load(f)))
+                print(f"Loaded {os.path.basename(self.workflow_file)}")
+            except (OSError, ValueError) as e:
+                print(f"Warning: skipping workflow charts ({str(e)})")
+        try:
+            specs.extend(metric_charts(read_frame(self.confusion_file)))
+            print(f"Loaded {os.path.basename(self.confusion_file)}")
+        except Exception as e:
+            print(f"Warning: skipping metric charts ({str(e)})")
+        return specs
+
+    def metric_chart_paths(self):
+        """PNG files the renderer draws from confusion.csv; empty if it can't be read"""
+        try:
+            return [self.renderer.path_for(spec) for spec in metric_charts(read_frame(self.confusion_file))]
+        except Exception:
+            return []
+
+    def render_workflow_charts(self, report):
+        """Draw the workflow charts from an in-memory workflow_metrics.json report; returns their paths"""
+        with get_tracer().span('native_charts', 'compute', charts='workflow'):
+            return self.renderer.render(workflow_charts(report))
+
+    def _run_native(self):
+        with get_tracer().span('native_charts', 'compute'):
+            self.charts = self.renderer.render(self.chart_specs())
+        return self.charts
+
+    def execute_visualization(self, resume=False):
+        """Draw the charts, or generate and return visualization code when the renderer fails"""
+        # Charts from an earlier call must not be reported again when the agent draws this time
+        self.charts = []
+        # A retry after the agent already ran continues the agent; the renderer already failed
+        if self.use_native_renderer and not (resume and self._code_agent is not None):
+            try:
+                return self._run_native()
+            except Exception as e:
+                print(f"Built-in renderer could not draw the metrics ({str(e)}); using the LLM agent")
+
+        generated_code = run_agent(self.code_agent, self.task, resume)
+        print("Generated Visualization Code:\n", generated_code)
+        return generated_code
+
+    async def execute_visualization_async(self, executor=None, resume=False):
+        """execute_visualization that awaits the LLM instead of holding a thread while it generates"""
+        self.charts = []
+        if self.use_native_renderer and not (resume and self._code_agent is not None):
+            try:
+                return await run_in_executor(self._run_native, executor=executor)
+            except Exception as e:
+                print(f"Built-in renderer could not draw the metrics ({str(e)}); using the LLM agent")
 
-    def execute_visualization(self):
-        """Generate and return visualization code"""
-        generated_code = self.code_agent.run(self.task)
+        async_engine = get_registry().get_async_engine(self.model_name, self.hf_token)
+        reset = not (resume and prepare_resume(self.code_agent))
+        generated_code = await run_agent_async(self.code_agent, self.task, async_engine, reset=reset,
+                                               executor=executor)
         print("Generated Visualization Code:\n", generated_code)
         return generated_code
 
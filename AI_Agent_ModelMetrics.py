@@ -0,0 +1,254 @@
+import json
+import math
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+from AI_Agent_Storage import read_frame, write_frame
+
+RESULT_COLUMNS = ['Model Name', 'Metric Type', 'Metric Values', 'Timestamp']
+# Prefix of the statistic of a confusion matrix cell; the class_label is the actual class
+PREDICTED = 'predicted:'
+# classification_report statistics that are counts, restored as integers on export
+COUNT_STATISTICS = ('support',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS model_metrics (
+    run_id TEXT NOT NULL,
+    dataset TEXT,
+    model TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    class_label TEXT,
+    statistic TEXT NOT NULL,
+    value REAL,
+    ordinal INTEGER NOT NULL,
+    recorded_at TEXT,
+    PRIMARY KEY (run_id, model, metric, ordinal)
+);
+CREATE INDEX IF NOT EXISTS idx_model_metrics_model ON model_metrics (model, metric);
+CREATE INDEX IF NOT EXISTS idx_model_metrics_metric ON model_metrics (metric, statistic, class_label);
+CREATE INDEX IF NOT EXISTS idx_model_metrics_recorded_at ON model_metrics (recorded_at);
+"""
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _parse_values(values):
+    if isinstance(values, str):
+        try:
+            return json.loads(values)
+        except ValueError:
+            return values
+    return values
+
+
+def normalize_metric(metric, values, class_names=None):
+    """Flatten one confusion.csv value into (class_label, statistic, value) records, in order.
+
+    Matrices become one record per cell, dicts one record per (class, statistic) (top-level
+    scalars such as 'accuracy' have no class) and scalars a single 'value' record.
+    """
+    values = _parse_values(values)
+    if isinstance(values, list) and values and all(isinstance(row, list) for row in values):
+        names = class_names if class_names and len(class_names) == len(values) else [str(i) for i in range(len(values))]
+        return [(names[i], f"{PREDICTED}{names[j] if j < len(names) else j}", _number(cell))
+                for i, row in enumerate(values) for j, cell in enumerate(row)]
+    if isinstance(values, dict):
+        records = []
+        for key, value in values.items():
+            if isinstance(value, dict):
+                records.extend((str(key), str(statistic), _number(number)) for statistic, number in value.items())
+            else:
+                records.append((None, str(key), _number(value)))
+        return records
+    return [(None, 'value', _number(values))]
+
+
+def _report_classes(report):
+    report = _parse_values(report)
+    if not isinstance(report, dict):
+        return None
+    return [str(key) for key, value in report.items()
+            if isinstance(value, dict) and key not in ('macro avg', 'weighted avg', 'micro avg', 'samples avg')]
+
+
+def _denormalize_matrix(records):
+    """Rebuild a (possibly non-square) matrix from its actual/predicted cell records.
+
+    Rows follow the first appearance of each class_label and columns of each predicted
+    label. Cells stored as NULL (NaN or infinite in the original) come back as NaN, and
+    values are integers only when every cell is integral.
+    """
+    rows, columns, cells = [], [], {}
+    for record in records:
+        row, column = record['class_label'], record['statistic'][len(PREDICTED):]
+        if row not in rows:
+            rows.append(row)
+        if column not in columns:
+            columns.append(column)
+        cells[(row, column)] = record['value']
+    numbers = [value for value in cells.values() if value is not None]
+    integral = all(float(value).is_integer() for value in numbers)
+    matrix = []
+    for row in rows:
+        values = []
+        for column in columns:
+            value = cells.get((row, column))
+            if value is None:
+                values.append(math.nan)
+            else:
+                values.append(int(value) if integral else float(value))
+        matrix.append(values)
+    return matrix
+
+
+def denormalize_metric(records):
+    """Inverse of normalize_metric for records ordered by ordinal"""
+    if len(records) == 1 and records[0]['class_label'] is None and records[0]['statistic'] == 'value':
+        return records[0]['value']
+    if records and all(r['statistic'].startswith(PREDICTED) for r in records):
+        return _denormalize_matrix(records)
+    values = {}
+    for record in records:
+        value = record['value']
+        if value is not None and record['statistic'] in COUNT_STATISTICS:
+            value = int(value)
+        if record['class_label'] is None:
+            values[record['statistic']] = value
+        else:
+            values.setdefault(record['class_label'], {})[record['statistic']] = value
+    return values
+
+
+class ModelMetricsStore:
+    """SQLite store of model metrics: one typed row per run, model, metric, class and statistic.
+
+    Replaces re-parsing the JSON 'Metric Values' column of confusion.csv; export_results
+    still writes that file for the visualizer and other existing consumers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self._connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def record_results(self, run_id, rows, dataset=None):
+        """Store confusion.csv-style rows (model, metric type, values, timestamp), replacing the run's metrics"""
+        rows = [tuple(row[c] for c in RESULT_COLUMNS) if isinstance(row, dict) else tuple(row) for row in rows]
+        class_names = {model: _report_classes(values) for model, metric, values, _ in rows
+                       if metric == 'classification_report'}
+        records = []
+        for model, metric, values, timestamp in rows:
+            recorded_at = str(timestamp) if timestamp is not None else datetime.now().isoformat()
+            for ordinal, (class_label, statistic, value) in enumerate(
+                    normalize_metric(metric, values, class_names.get(model))):
+                records.append((run_id, dataset, str(model), str(metric), class_label, statistic, value,
+                                ordinal, recorded_at))
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM model_metrics WHERE run_id = ?", (run_id,))
+            connection.executemany("INSERT INTO model_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+        return len(records)
+
+    def import_results_file(self, run_id, results_path, dataset=None):
+        """Ingest a confusion.csv written by the agent"""
+        frame = read_frame(results_path)
+        missing = [c for c in RESULT_COLUMNS if c not in frame.columns]
+        if missing:
+            raise ValueError(f"{results_path} is missing columns {missing}")
+        rows = frame[RESULT_COLUMNS].where(frame[RESULT_COLUMNS].notna(), None).itertuples(index=False, name=None)
+        return self.record_results(run_id, rows, dataset)
+
+    def has_run(self, run_id):
+        with closing(self._connect()) as connection:
+            return connection.execute(
+                "SELECT 1 FROM model_metrics WHERE run_id = ? LIMIT 1", (run_id,)
+            ).fetchone() is not None
+
+    def latest_run_id(self, dataset=None):
+        query = "SELECT run_id FROM model_metrics"
+        params = []
+        if dataset is not None:
+            query += " WHERE dataset = ?"
+            params.append(dataset)
+        query += " ORDER BY recorded_at DESC LIMIT 1"
+        with closing(self._connect()) as connection:
+            row = connection.execute(query, params).fetchone()
+        return row['run_id'] if row else None
+
+    def query(self, model=None, metric=None, statistic=None, class_label=None, run_id=None,
+              dataset=None, since=None):
+        """Matching rows as a DataFrame (columns run_id ... recorded_at); filters accept a value or a list"""
+        clauses = []
+        params = []
+        for column, value in (('model', model), ('metric', metric), ('statistic', statistic),
+                              ('class_label', class_label), ('run_id', run_id), ('dataset', dataset)):
+            if value is None:
+                continue
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if since is not None:
+            clauses.append("recorded_at >= ?")
+            params.append(str(since))
+        query = "SELECT * FROM model_metrics"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY recorded_at, run_id, model, metric, ordinal"
+        with closing(self._connect()) as connection:
+            return pd.read_sql_query(query, connection, params=params)
+
+    def compare_models(self, metric='classification_report', statistic='f1-score',
+                       class_label='weighted avg', dataset=None):
+        """Per-model mean/min/max/latest of one statistic across every recorded run, best first"""
+        query = ("SELECT model, COUNT(DISTINCT run_id) AS runs, AVG(value) AS mean, MIN(value) AS min, "
+                 "MAX(value) AS max, MAX(recorded_at) AS last_recorded_at FROM model_metrics "
+                 "WHERE metric = ? AND statistic = ? AND class_label IS ?")
+        params = [metric, statistic, class_label]
+        if dataset is not None:
+            query += " AND dataset = ?"
+            params.append(dataset)
+        query += " GROUP BY model ORDER BY mean DESC"
+        with closing(self._connect()) as connection:
+            return pd.read_sql_query(query, connection, params=params)
+
+    def results_rows(self, run_id):
+        """The run's metrics in confusion.csv form: [(model, metric type, JSON values, timestamp)]"""
+        with closing(self._connect()) as connection:
+            records = connection.execute(
+                "SELECT * FROM model_metrics WHERE run_id = ? ORDER BY rowid", (run_id,)
+            ).fetchall()
+        grouped = {}
+        for record in records:
+            grouped.setdefault((record['model'], record['metric']), []).append(record)
+        rows = []
+        for (model, metric), metric_records in grouped.items():
+            metric_records.sort(key=lambda r: r['ordinal'])
+            rows.append((model, metric, json.dumps(denormalize_metric(metric_records)),
+                         metric_records[0]['recorded_at']))
+        return rows
+
+    def export_results(self, run_id, results_path):
+        """Write today's confusion.csv (JSON 'Metric Values') for run_id"""
+        rows = self.results_rows(run_id)
+        write_frame(pd.DataFrame(rows, columns=RESULT_COLUMNS), results_path)
+        return results_path
+
+    def export_table(self, path, **filters):
+        """Normalized rows (optionally filtered as in query) to Parquet/CSV for bulk analysis"""
+        write_frame(self.query(**filters), path)
+        return path
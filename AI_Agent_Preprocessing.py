@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from AI_Agent_Manifest import hash_file, hash_value
+from AI_Agent_Storage import read_frame, state_dir
+
+
+# Bump when split_features/build_preprocessor change so old artifacts are not reused
+PREPROCESSING_VERSION = 1
+
+
+def split_features(X):
+    """Numerical vs categorical columns, with pandas NA turned into np.nan for sklearn"""
+    numeric_columns = [c for c in X.columns
+                       if pd.api.types.is_numeric_dtype(X[c]) and not pd.api.types.is_bool_dtype(X[c])]
+    categorical_columns = [c for c in X.columns if c not in numeric_columns]
+    X = X.copy()
+    for column in numeric_columns:
+        X[column] = X[column].astype('float64')
+    for column in categorical_columns:
+        X[column] = X[column].astype(object).where(X[column].notna(), np.nan)
+    return X, numeric_columns, categorical_columns
+
+
+def build_preprocessor(numeric_columns, categorical_columns):
+    return ColumnTransformer([
+        ('num', Pipeline([
+            ('impute', SimpleImputer(strategy='median')),
+            ('scale', StandardScaler())
+        ]), numeric_columns),
+        ('cat', Pipeline([
+            ('impute', SimpleImputer(strategy='most_frequent')),
+            ('encode', OneHotEncoder(handle_unknown='ignore'))
+        ]), categorical_columns)
+    ])
+
+
+class PreprocessedData:
+    """Handle on a materialized feature matrix; dense matrices are memory-mapped"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), 'r') as f:
+            self.meta = json.load(f)
+        self.target_column = self.meta['target_column']
+        self.feature_names = self.meta['feature_names']
+        self.matrix_path = os.path.join(directory, self.meta['matrix_file'])
+        self._matrix = None
+        self._preprocessor = None
+
+    @property
+    def matrix(self):
+        if self._matrix is None:
+            if self.meta['format'] == 'sparse':
+                self._matrix = sparse.load_npz(self.matrix_path).tocsr()
+            else:
+                self._matrix = np.load(self.matrix_path, mmap_mode='r')
+        return self._matrix
+
+    @property
+    def preprocessor(self):
+        if self._preprocessor is None:
+            self._preprocessor = joblib.load(os.path.join(self.directory, "preprocessor.joblib"))
+        return self._preprocessor
+
+
+class PreprocessingCache:
+    """Fit the shared impute/scale/one-hot transform once per input file and reuse it across phases"""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or state_dir(".preprocessed")
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _lock_for(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def index_path_for(self, data_path):
+        """Pointer file agents read for data_path; one per input so concurrent datasets don't collide"""
+        source = hash_value(os.path.normcase(os.path.abspath(data_path)))
+        return os.path.join(self.cache_dir, f"latest-{source[:16]}.json")
+
+    def key(self, data_path, target_column=None, fit_rows=None):
+        return hash_value({
+            'data': hash_file(data_path),
+            'target_column': target_column,
+            'fit_rows': hashlib.sha256(np.asarray(fit_rows, dtype='int64').tobytes()).hexdigest()
+                        if fit_rows is not None else None,
+            'version': PREPROCESSING_VERSION
+        })
+
+    def materialize(self, data_path, target_column=None, fit_rows=None):
+        """Return PreprocessedData for data_path, building it only on the first request.
+
+        The transform is fit on fit_rows (row positions) when given, e.g. a supervised
+        training split, and on every row otherwise; the matrix always covers every row.
+        Only full fits are published to the latest-*.json pointer the agents read.
+        """
+        key = self.key(data_path, target_column, fit_rows)
+        directory = os.path.join(self.cache_dir, key)
+        with self._lock_for(key):
+            if os.path.exists(os.path.join(directory, "meta.json")):
+                print(f"Reusing preprocessed features {key[:12]}")
+            else:
+                self._build(data_path, target_column, directory, fit_rows)
+            data = PreprocessedData(directory)
+            if fit_rows is None:
+                self._write_index(data_path, data)
+        return data
+
+    def _build(self, data_path, target_column, directory, fit_rows=None):
+        print(f"Preprocessing {os.path.basename(data_path)}")
+        df = read_frame(data_path)
+        target = target_column or df.columns[-1]
+        X, numeric_columns, categorical_columns = split_features(df.drop(columns=[target]))
+        if not numeric_columns and not categorical_columns:
+            raise ValueError("No feature columns to preprocess")
+
+        preprocessor = build_preprocessor(numeric_columns, categorical_columns)
+        if fit_rows is None:
+            matrix = preprocessor.fit_transform(X)
+        else:
+            preprocessor.fit(X.iloc[np.sort(np.asarray(fit_rows, dtype='int64'))])
+            matrix = preprocessor.transform(X)
+
+        tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        if sparse.issparse(matrix):
+            matrix_file = "features.npz"
+            sparse.save_npz(os.path.join(tmp_dir, matrix_file), matrix.tocsr())
+        else:
+            matrix_file = "features.npy"
+            np.save(os.path.join(tmp_dir, matrix_file), np.ascontiguousarray(matrix, dtype='float64'))
+        joblib.dump(preprocessor, os.path.join(tmp_dir, "preprocessor.joblib"))
+        with open(os.path.join(tmp_dir, "meta.json"), 'w') as f:
+            json.dump({
+                'data_path': data_path,
+                'target_column': target,
+                'fit_rows': len(fit_rows) if fit_rows is not None else None,
+                'numeric_columns': numeric_columns,
+                'categorical_columns': categorical_columns,
+                'feature_names': [str(name) for name in preprocessor.get_feature_names_out()],
+                'format': 'sparse' if sparse.issparse(matrix) else 'dense',
+                'matrix_file': matrix_file,
+                'shape': list(matrix.shape)
+            }, f, indent=2)
+        os.replace(tmp_dir, directory)
+
+    def forget_latest(self, data_path):
+        """Drop the pointer so agents don't pick up a matrix built from older data"""
+        try:
+            os.remove(self.index_path_for(data_path))
+        except OSError:
+            pass
+
+    def _write_index(self, data_path, data):
+        """The latest-*.json pointer sends agents to the most recently materialized matrix for data_path"""
+        index_path = self.index_path_for(data_path)
+        tmp_path = f"{index_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'data_path': data_path,
+                'matrix_path': data.matrix_path,
+                'format': data.meta['format'],
+                'target_column': data.target_column,
+                'feature_names': data.feature_names
+            }, f, indent=2)
+        os.replace(tmp_path, index_path)
+
+
+_default_preprocessing = {}
+_default_preprocessing_lock = threading.Lock()
+
+
+def get_preprocessing_cache():
+    """Process-wide cache so concurrent phases share one build per input (one per state root)"""
+    cache_dir = state_dir(".preprocessed")
+    with _default_preprocessing_lock:
+        if cache_dir not in _default_preprocessing:
+            _default_preprocessing[cache_dir] = PreprocessingCache(cache_dir)
+        return _default_preprocessing[cache_dir]
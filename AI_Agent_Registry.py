@@ -0,0 +1,294 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import requests
+from huggingface_hub import configure_http_backend, login
+from requests.adapters import HTTPAdapter
+
+from AI_Agent_Cache import CachedEngine
+
+# hf_api: remote inference; replay: recorded transcripts, offline; local: small transformers model
+ENGINE_BACKENDS = ('hf_api', 'replay', 'local')
+
+
+def _pooled_session():
+    """requests session with a keep-alive pool large enough for parallel phases"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RequestLimiter:
+    """Process-wide cap on in-flight LLM requests, shared by every engine and coordinator"""
+
+    def __init__(self, max_in_flight=None):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self._condition = threading.Condition()
+
+    def configure(self, max_in_flight):
+        """None removes the limit"""
+        with self._condition:
+            self.max_in_flight = max_in_flight
+            self._condition.notify_all()
+
+    def acquire(self):
+        start = time.monotonic()
+        with self._condition:
+            if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+                self.waits += 1
+                self._condition.wait_for(
+                    lambda: self.max_in_flight is None or self.in_flight < self.max_in_flight
+                )
+            self.wait_seconds += time.monotonic() - start
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """slot() for coroutines; the wait happens in an executor thread so the event loop keeps running"""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(None, self.acquire)
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The executor thread may still get the slot after we stop waiting; hand it back
+            future.add_done_callback(lambda f: f.cancelled() or f.exception() or self.release())
+            raise
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'requests': self.requests,
+                'peak_in_flight': self.peak_in_flight,
+                'waits': self.waits,
+                'wait_seconds': round(self.wait_seconds, 3)
+            }
+
+
+class LazyEngine:
+    """Stands in for an HfApiEngine and only builds it on the first LLM call.
+
+    The engine is shared between threads, so the token counts of the last call are kept
+    per thread: concurrent agents never read each other's counts.
+    """
+
+    def __init__(self, factory, limiter=None):
+        self._factory = factory
+        self._engine = None
+        self._limiter = limiter
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._factory()
+        return self._engine
+
+    @property
+    def is_initialized(self):
+        return self._engine is not None
+
+    @property
+    def last_input_token_count(self):
+        return getattr(self._local, 'input_tokens', None)
+
+    @property
+    def last_output_token_count(self):
+        return getattr(self._local, 'output_tokens', None)
+
+    def __call__(self, messages, stop_sequences=None, grammar=None):
+        if self._limiter is None:
+            response = self.engine(messages, stop_sequences=stop_sequences, grammar=grammar)
+        else:
+            with self._limiter.slot():
+                response = self.engine(messages, stop_sequences=stop_sequences, grammar=grammar)
+        self._local.input_tokens = getattr(self.engine, 'last_input_token_count', None)
+        self._local.output_tokens = getattr(self.engine, 'last_output_token_count', None)
+        return response
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.engine, name)
+
+
+class EngineRegistry:
+    """Process-wide pool of engines: one authenticated, lazily created engine per model"""
+
+    def __init__(self):
+        self._engines = {}
+        self._async_engines = {}
+        self._logged_in = set()
+        self._lock = threading.RLock()
+        # Only requests that miss the response cache reach the engine and take a slot
+        self.limiter = RequestLimiter()
+        self.backend = os.environ.get('AI_AGENT_ENGINE_BACKEND', 'hf_api')
+        self.backend_options = {}
+        if os.environ.get('AI_AGENT_TRANSCRIPT'):
+            self.backend_options['transcript_path'] = os.environ['AI_AGENT_TRANSCRIPT']
+        # Set to a JSONL path to record hf_api exchanges for the replay backend
+        self.record_transcripts = os.environ.get('AI_AGENT_RECORD_TRANSCRIPT')
+        # None means the shared on-disk cache; benchmarks pass an isolated LLMResponseCache
+        self.response_cache = None
+        configure_http_backend(backend_factory=_pooled_session)
+
+    def login(self, token):
+        with self._lock:
+            if token in self._logged_in:
+                return
+            if token:
+                login(token=token)
+            self._logged_in.add(token)
+
+    def configure_backend(self, backend, **options):
+        """Switch the engine behind every agent created from now on"""
+        if backend not in ENGINE_BACKENDS:
+            raise ValueError(f"Unknown engine backend '{backend}', expected one of {ENGINE_BACKENDS}")
+        with self._lock:
+            self.backend = backend
+            self.backend_options = options
+            self._engines = {}
+            self._async_engines = {}
+
+    def _create_engine(self, model_name, token):
+        # Engines (and transformers) are imported when the first LLM call needs one
+        from transformers import HfApiEngine
+        from AI_Agent_Engines import TranscriptRecorder, TranscriptReplayEngine, create_local_engine
+
+        options = self.backend_options
+        if 'engine' in options:
+            return options['engine']
+        if self.backend == 'replay':
+            print(f"Replaying {model_name} from {options.get('transcript_path')}")
+            return TranscriptReplayEngine(
+                options['transcript_path'], path_map=options.get('path_map'),
+                latency_scale=options.get('latency_scale', 0.0), strict=options.get('strict', False)
+            )
+        if self.backend == 'local':
+            return create_local_engine(options.get('local_model', model_name))
+
+        self.login(token)
+        print(f"Initializing engine for {model_name}")
+        engine = HfApiEngine(model=model_name, token=token)
+        if self.record_transcripts:
+            engine = TranscriptRecorder(engine, self.record_transcripts)
+        return engine
+
+    def cache_namespace(self, model_name):
+        """Offline backends must not serve (or pollute) cached remote completions"""
+        return model_name if self.backend == 'hf_api' else f"{self.backend}:{model_name}"
+
+    def get_engine(self, model_name, token):
+        key = (model_name, token)
+        with self._lock:
+            if key not in self._engines:
+                self._engines[key] = LazyEngine(lambda: self._create_engine(model_name, token), self.limiter)
+            return self._engines[key]
+
+    def get_sampling_engine(self, model_name, token, sampling):
+        """Engine for model_name with fixed sampling (temperature, seed, top_p).
+
+        Only the hosted backend can sample differently; replay and local backends return
+        their regular engine.
+        """
+        if self.backend != 'hf_api' or 'engine' in self.backend_options or not sampling:
+            return self.get_engine(model_name, token)
+        key = (model_name, token, tuple(sorted(sampling.items())))
+        with self._lock:
+            if key not in self._engines:
+                def create():
+                    from AI_Agent_Engines import SampledHfApiEngine
+                    self.login(token)
+                    return SampledHfApiEngine(model_name, token, **sampling)
+                self._engines[key] = LazyEngine(create, self.limiter)
+            return self._engines[key]
+
+    def get_async_engine(self, model_name, token):
+        """Shared AsyncHfApiEngine for model_name, sized from the current request limit"""
+        # Imported here so synchronous-only processes never load the async client
+        from AI_Agent_Async import AsyncHfApiEngine, ThreadedAsyncEngine
+
+        key = (model_name, token)
+        with self._lock:
+            if key not in self._async_engines:
+                if self.backend == 'hf_api' and 'engine' not in self.backend_options:
+                    self.login(token)
+                    engine = AsyncHfApiEngine(model_name, token, limiter=self.limiter)
+                else:
+                    engine = ThreadedAsyncEngine(self.get_engine(model_name, token))
+                self._async_engines[key] = engine
+            return self._async_engines[key]
+
+    def set_max_concurrent_requests(self, max_in_flight):
+        self.limiter.configure(max_in_flight)
+        with self._lock:
+            for engine in self._async_engines.values():
+                engine.max_concurrent = max_in_flight or 8
+
+    def get_agent_engine(self, model_name, token, authorized_imports, sampling=None):
+        """Per-agent cached view over the shared engine for model_name"""
+        namespace = self.cache_namespace(model_name)
+        if sampling:
+            # Differently sampled attempts must not answer each other from the cache
+            namespace += "@" + ",".join(f"{name}={value}" for name, value in sorted(sampling.items()))
+        return CachedEngine(
+            self.get_sampling_engine(model_name, token, sampling),
+            model_name=namespace,
+            authorized_imports=authorized_imports,
+            cache=self.response_cache
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.backend,
+                'engines': len(self._engines),
+                'initialized': sum(engine.is_initialized for engine in self._engines.values()),
+                'async_engines': len(self._async_engines),
+                'rate_limited': sum(getattr(engine, 'rate_limited', 0) for engine in self._async_engines.values()),
+                'requests': self.limiter.stats()
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = EngineRegistry()
+        return _registry
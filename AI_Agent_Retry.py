@@ -0,0 +1,144 @@
+import random
+import re
+import socket
+import time
+
+from AI_Agent_Context import TokenBudgetExceeded
+
+TRANSIENT = 'transient'
+DETERMINISTIC = 'deterministic'
+MISSING_OUTPUT = 'missing_output'
+UNKNOWN = 'unknown'
+FAILURE_CLASSES = (TRANSIENT, DETERMINISTIC, MISSING_OUTPUT, UNKNOWN)
+
+TRANSIENT_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+TRANSIENT_PATTERNS = re.compile(
+    r"rate.?limit|too many requests|\b(408|425|429|500|502|503|504) (client|server) error|"
+    r"timed? ?out|timeout|temporarily unavailable|service unavailable|overloaded|bad gateway|"
+    r"connection (reset|refused|aborted|error)|remote ?disconnected|max retries exceeded|"
+    r"model .* is currently loading",
+    re.IGNORECASE
+)
+# Errors that come back identically on every retry: bad code, bad data, missing permissions
+DETERMINISTIC_ERRORS = (SyntaxError, ImportError, NameError, TypeError, KeyError, IndexError,
+                        ValueError, AttributeError, NotImplementedError, PermissionError,
+                        FileNotFoundError, ZeroDivisionError, TokenBudgetExceeded)
+
+
+def _status_of(error):
+    status = getattr(error, 'status', None) or getattr(error, 'status_code', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None) or getattr(response, 'status', None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient(error):
+    """Rate limits, 5xx responses, timeouts and dropped connections"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if _status_of(error) in TRANSIENT_STATUSES:
+            return True
+        if isinstance(error, (TimeoutError, ConnectionError, socket.timeout)):
+            return True
+        if TRANSIENT_PATTERNS.search(str(error)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def retry_after(error):
+    """Server-requested delay in seconds, if the error carries a Retry-After header"""
+    response = getattr(error, 'response', None)
+    headers = getattr(error, 'headers', None) or getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _step_errors(agent):
+    """Errors of the ReAct steps since the agent's last (re)start, in order"""
+    errors = []
+    for step in getattr(agent, 'logs', None) or []:
+        if isinstance(step, dict) and 'task' in step:
+            errors = []
+        elif isinstance(step, dict) and 'iteration' in step and step.get('error') is not None:
+            errors.append(step['error'])
+    return errors
+
+
+def prepare_resume(agent):
+    """Drop trailing failed steps; True when successful steps remain to continue from.
+
+    The caller then uses agent.run(task, reset=False), so the next attempt picks up
+    after the last step that worked instead of replaying the whole run.
+    """
+    logs = getattr(agent, 'logs', None)
+    if not logs:
+        return False
+    kept = len(logs)
+    while kept > 1 and isinstance(logs[kept - 1], dict) and logs[kept - 1].get('error') is not None:
+        kept -= 1
+    removed = len(logs) - kept
+    del logs[kept:]
+    has_progress = any(isinstance(step, dict) and 'tool_call' in step for step in logs)
+    if has_progress:
+        print(f"Resuming agent after {sum('tool_call' in s for s in logs if isinstance(s, dict))} "
+              f"successful steps ({removed} failed steps dropped)")
+    return has_progress
+
+
+def run_agent(agent, task, resume=False):
+    """agent.run(task), continuing the previous run when resume is set and it made progress"""
+    if resume and prepare_resume(agent):
+        return agent.run(task, reset=False)
+    return agent.run(task)
+
+
+class RetryPolicy:
+    """Decide whether and when to retry a failed phase attempt based on why it failed"""
+
+    def __init__(self, base_delay=2.0, max_delay=60.0, jitter=0.5, missing_output_delay=1.0,
+                 repeated_error_limit=3):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.missing_output_delay = missing_output_delay
+        # The same error this many times in a row means the agent is stuck, not unlucky
+        self.repeated_error_limit = repeated_error_limit
+
+    def classify(self, error=None, agent=None):
+        if error is not None:
+            if is_transient(error):
+                return TRANSIENT
+            if isinstance(error, DETERMINISTIC_ERRORS):
+                return DETERMINISTIC
+            return UNKNOWN
+
+        # The agent finished without the output file: look at how its steps failed
+        step_errors = _step_errors(agent)
+        if step_errors and is_transient(step_errors[-1]):
+            return TRANSIENT
+        recent = [str(e) for e in step_errors[-self.repeated_error_limit:]]
+        if len(recent) == self.repeated_error_limit and len(set(recent)) == 1:
+            return DETERMINISTIC
+        return MISSING_OUTPUT
+
+    def should_retry(self, failure_class):
+        return failure_class != DETERMINISTIC
+
+    def delay(self, failure_class, attempt, error=None):
+        """Seconds to wait before the next attempt (attempt is the 1-based number that failed)"""
+        if failure_class == TRANSIENT:
+            requested = retry_after(error) if error is not None else None
+            delay = requested or min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+            return round(delay * (1 + random.uniform(0, self.jitter)), 3)
+        if failure_class == MISSING_OUTPUT:
+            return self.missing_output_delay
+        return self.base_delay
+
+    def wait(self, seconds):
+        time.sleep(seconds)
+        return seconds
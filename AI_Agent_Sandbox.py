@@ -0,0 +1,248 @@
+import importlib
+import os
+import threading
+import time
+import types
+from collections import OrderedDict
+
+import pandas as pd
+
+# pandas readers served from the resident frame cache while agent code runs
+CACHED_READERS = ('read_csv', 'read_parquet', 'read_excel')
+# Standard-library modules are already cheap to import
+SKIP_WARM = {'io', 'os', 'json', 'datetime', 'warnings', 're', 'math', 'time', 'collections'}
+
+
+def _fingerprint(path):
+    """Changes whenever the file (or any file of a partitioned dataset) is rewritten"""
+    stat = os.stat(path)
+    if not os.path.isdir(path):
+        return (stat.st_mtime_ns, stat.st_size)
+    parts = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            file_stat = os.stat(os.path.join(root, name))
+            parts.append((os.path.relpath(os.path.join(root, name), path), file_stat.st_mtime_ns, file_stat.st_size))
+    return tuple(sorted(parts))
+
+
+class FrameCache:
+    """LRU of DataFrames read by agent code, keyed by reader, path, file fingerprint and arguments.
+
+    Callers always get a copy, so code that mutates its frame cannot change what the
+    next step or run reads.
+    """
+
+    def __init__(self, max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._frames = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def read(self, reader_name, reader, path, *args, **kwargs):
+        if not isinstance(path, (str, os.PathLike)) or not os.path.exists(path):
+            return reader(path, *args, **kwargs)
+        try:
+            key = (reader_name, os.path.abspath(path), _fingerprint(path), repr(args), repr(sorted(kwargs.items())))
+        except OSError:
+            return reader(path, *args, **kwargs)
+
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy()
+            self.misses += 1
+
+        frame = reader(path, *args, **kwargs)
+        if not isinstance(frame, pd.DataFrame):
+            return frame
+        size = int(frame.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return frame
+        with self._lock:
+            if key not in self._frames:
+                self._frames[key] = (frame, size)
+                self._bytes += size
+                self._evict()
+        return frame.copy()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._frames:
+            _, (_, size) = self._frames.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'frames': len(self._frames),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+class CachedPandas(types.ModuleType):
+    """pandas as seen by sandboxed agent code: CACHED_READERS go through the frame cache,
+    everything else is the real module"""
+
+    def __init__(self, frames):
+        super().__init__(pd.__name__, pd.__doc__)
+        for reader_name in CACHED_READERS:
+            setattr(self, reader_name, self._cached_reader(frames, reader_name, getattr(pd, reader_name)))
+
+    @staticmethod
+    def _cached_reader(frames, reader_name, original):
+        def read(path, *args, **kwargs):
+            return frames.read(reader_name, original, path, *args, **kwargs)
+        read.__name__ = reader_name
+        read.__doc__ = original.__doc__
+        return read
+
+    def __getattr__(self, name):
+        return getattr(pd, name)
+
+    def wrap(self, value):
+        """The cached counterpart of pandas or one of its readers, any other value unchanged"""
+        if value is pd:
+            return self
+        for reader_name in CACHED_READERS:
+            if value is getattr(pd, reader_name):
+                return getattr(self, reader_name)
+        return value
+
+
+class _SandboxState(dict):
+    """Interpreter state that swaps pandas (however the code imports it) for a CachedPandas"""
+
+    def __init__(self, pandas_view, state):
+        super().__init__()
+        self._pandas = pandas_view
+        for name, value in state.items():
+            self[name] = value
+
+    def __setitem__(self, name, value):
+        super().__setitem__(name, self._pandas.wrap(value))
+
+
+class SandboxPool:
+    """Process-wide warm state shared by every agent's code execution.
+
+    Heavy libraries are imported once in the background, and pandas file reads made by
+    generated code come from a resident frame cache across steps and runs. The cache is
+    reached only through the pandas bound in a sandboxed agent's interpreter state; the
+    pandas module itself is never patched, so other threads and code read files as usual.
+    Agents keep their own python_evaluator and authorized imports: pre-imported modules are
+    only in sys.modules, and generated code still has to pass the interpreter's import check.
+    """
+
+    def __init__(self, max_cache_bytes=1024 * 1024 * 1024):
+        self.frames = FrameCache(max_cache_bytes)
+        self.pandas = CachedPandas(self.frames)
+        self.enabled = True
+        self.import_seconds = {}
+        self.unavailable = set()
+        self._warming = set()
+        self._lock = threading.Lock()
+
+    def _import(self, module_name):
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module_name)
+        except Exception:
+            with self._lock:
+                self.unavailable.add(module_name)
+            return
+        with self._lock:
+            self.import_seconds[module_name] = round(time.perf_counter() - start, 3)
+
+    def warm_up(self, modules, background=True):
+        """Import modules not loaded yet; returns the background thread, if any"""
+        with self._lock:
+            pending = [m for m in modules if m not in SKIP_WARM and m not in self._warming]
+            self._warming.update(pending)
+        if not pending:
+            return None
+
+        def warm():
+            for module_name in pending:
+                self._import(module_name)
+        if not background:
+            warm()
+            return None
+        thread = threading.Thread(target=warm, name='sandbox-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def prefetch(self, path, reader_name='read_parquet'):
+        """Load a frame the next agent will read while its first LLM call is in flight"""
+        if not self.enabled or not os.path.exists(path):
+            return None
+
+        def load():
+            try:
+                self.frames.read(reader_name, getattr(pd, reader_name), path)
+            except Exception as e:
+                print(f"Prefetch of {path} failed: {str(e)}")
+        thread = threading.Thread(target=load, name='sandbox-prefetch', daemon=True)
+        thread.start()
+        return thread
+
+    def attach(self, agent, authorized_imports=()):
+        """Run agent's generated code inside the warm sandbox and start warming its imports"""
+        if not self.enabled or getattr(agent, '_sandboxed', False):
+            return agent
+        self.warm_up(authorized_imports)
+        original_evaluator = agent.python_evaluator
+
+        def sandboxed_evaluator(code, *args, state=None, **kwargs):
+            if not self.enabled:
+                return original_evaluator(code, *args, state=state, **kwargs)
+            # Evaluate against a wrapping copy and write it back, so the agent keeps its own dict
+            scoped = _SandboxState(self.pandas, state or {})
+            try:
+                return original_evaluator(code, *args, state=scoped, **kwargs)
+            finally:
+                if state is not None:
+                    state.clear()
+                    state.update(scoped)
+
+        agent.python_evaluator = sandboxed_evaluator
+        agent._sandboxed = True
+        return agent
+
+    def stats(self):
+        with self._lock:
+            warm = dict(self.import_seconds)
+            unavailable = sorted(self.unavailable)
+        return {
+            'warm_modules': len(warm),
+            'warm_import_seconds': round(sum(warm.values()), 3),
+            'unavailable_modules': unavailable,
+            'frames': self.frames.stats()
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool()
+        return _pool
@@ -0,0 +1,129 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Phase:
+    """A unit of workflow work together with the artifacts it reads and writes"""
+
+    def __init__(self, name, run, inputs=None, outputs=None):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs or [])
+        self.outputs = list(outputs or [])
+
+
+class PhaseScheduler:
+    """Run a graph of phases, starting each one as soon as its input artifacts are produced"""
+
+    def __init__(self, phases, max_workers=None):
+        self.phases = {phase.name: phase for phase in phases}
+        self.max_workers = max_workers or len(self.phases) or 1
+        self.dependencies = self._build_dependencies()
+        self.order = self._topological_order()
+        self.results = {}
+
+    def _build_dependencies(self):
+        producers = {}
+        for phase in self.phases.values():
+            for artifact in phase.outputs:
+                if artifact in producers:
+                    raise ValueError(
+                        f"Artifact {artifact} is produced by both "
+                        f"'{producers[artifact]}' and '{phase.name}'"
+                    )
+                producers[artifact] = phase.name
+
+        dependencies = {}
+        for phase in self.phases.values():
+            dependencies[phase.name] = {
+                producers[artifact] for artifact in phase.inputs
+                if artifact in producers and producers[artifact] != phase.name
+            }
+        return dependencies
+
+    def _topological_order(self):
+        remaining = {name: set(deps) for name, deps in self.dependencies.items()}
+        order = []
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if not deps)
+            if not ready:
+                raise ValueError(f"Cycle detected between phases: {sorted(remaining)}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def run(self):
+        """Execute all phases; returns {phase: {'status', 'start_offset', 'end_offset', 'duration'}}"""
+        self.results = {}
+        start = time.perf_counter()
+        pending = list(self.order)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in list(pending):
+                    deps = self.dependencies[name]
+                    if any(self.results.get(dep, {}).get('status') in ('failed', 'skipped') for dep in deps):
+                        print(f"Skipping phase '{name}': an upstream phase did not succeed")
+                        self.results[name] = {
+                            'status': 'skipped', 'start_offset': None,
+                            'end_offset': None, 'duration': 0.0
+                        }
+                        pending.remove(name)
+                    elif all(self.results.get(dep, {}).get('status') == 'success' for dep in deps):
+                        print(f"Starting phase '{name}'")
+                        offset = time.perf_counter() - start
+                        future = executor.submit(self.phases[name].run)
+                        running[future] = (name, offset)
+                        pending.remove(name)
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, offset = running.pop(future)
+                    end_offset = time.perf_counter() - start
+                    try:
+                        succeeded = bool(future.result())
+                    except Exception as e:
+                        print(f"Phase '{name}' raised an error: {str(e)}")
+                        succeeded = False
+                    self.results[name] = {
+                        'status': 'success' if succeeded else 'failed',
+                        'start_offset': round(offset, 3),
+                        'end_offset': round(end_offset, 3),
+                        'duration': round(end_offset - offset, 3)
+                    }
+
+        self.wall_time = time.perf_counter() - start
+        return self.results
+
+    def critical_path(self):
+        """Longest chain of dependent phases by measured duration"""
+        longest = {}
+        for name in self.order:
+            duration = self.results.get(name, {}).get('duration') or 0.0
+            best_dep = max(self.dependencies[name], key=lambda dep: longest[dep][0], default=None)
+            if best_dep is None:
+                longest[name] = (duration, [name])
+            else:
+                longest[name] = (longest[best_dep][0] + duration, longest[best_dep][1] + [name])
+        if not longest:
+            return 0.0, []
+        return max(longest.values(), key=lambda item: item[0])
+
+    def summary(self):
+        serial = sum(result.get('duration') or 0.0 for result in self.results.values())
+        wall = getattr(self, 'wall_time', 0.0)
+        path_duration, path = self.critical_path()
+        return {
+            'critical_path': path,
+            'critical_path_seconds': round(path_duration, 3),
+            'serial_seconds': round(serial, 3),
+            'wall_seconds': round(wall, 3),
+            'parallel_speedup': round(serial / wall, 2) if wall else None
+        }
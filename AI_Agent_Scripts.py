@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from transformers.agents.default_tools import BASE_PYTHON_TOOLS
+from transformers.agents.python_interpreter import LIST_SAFE_MODULES, evaluate_python_code
+
+from AI_Agent_Artifacts import ArtifactWatcher
+from AI_Agent_Manifest import hash_file, hash_value
+from AI_Agent_Storage import is_columnar, read_frame, read_schema, state_dir
+
+
+def input_schema(path, sample_rows=200):
+    """Column names and dtypes of a tabular input file"""
+    if is_columnar(path):
+        return read_schema(path)
+    sample = read_frame(path).head(sample_rows)
+    return [[str(column), str(dtype)] for column, dtype in sample.dtypes.items()]
+
+
+def script_imports(additional_authorized_imports):
+    """The imports a ReactCodeAgent with these additional imports allows, without building one"""
+    return sorted(set(LIST_SAFE_MODULES) | set(additional_authorized_imports))
+
+
+def extract_agent_code(agent):
+    """Concatenate the code actions from every ReAct step that ran without error"""
+    blocks = []
+    for step in getattr(agent, 'logs', []):
+        if not isinstance(step, dict) or step.get('error') is not None:
+            continue
+        tool_call = step.get('tool_call') or {}
+        code = tool_call.get('tool_arguments')
+        if isinstance(code, str) and code.strip():
+            blocks.append(code.strip())
+    return "\n\n".join(blocks)
+
+
+def run_script(code, authorized_imports, tools=None):
+    """Execute captured code under the same import restrictions the agent had"""
+    static_tools = {**BASE_PYTHON_TOOLS.copy(), **(tools or {})}
+    static_tools['final_answer'] = lambda answer: answer
+    return evaluate_python_code(
+        code,
+        static_tools=static_tools,
+        custom_tools={},
+        state={},
+        authorized_imports=authorized_imports
+    )
+
+
+class CapturedScriptStore:
+    """Versioned store of agent-written scripts, keyed by input schema and task"""
+
+    def __init__(self, name, root=None):
+        self.directory = os.path.join(root or state_dir(".captured_scripts"), name)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, schema, task, authorized_imports):
+        return hash_value({
+            'schema': schema,
+            'task': task,
+            'authorized_imports': sorted(authorized_imports)
+        })
+
+    def _index_path(self, key):
+        return os.path.join(self.directory, key, "index.json")
+
+    def _read_index(self, key):
+        try:
+            with open(self._index_path(key), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'current': None, 'versions': []}
+
+    def _write_index(self, key, index):
+        path = self._index_path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def load(self, key):
+        """Return (version, code) for the current validated script, or None"""
+        index = self._read_index(key)
+        version = index.get('current')
+        if version is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, key, f"v{version}.py"), 'r') as f:
+                return version, f.read()
+        except OSError:
+            return None
+
+    def save(self, key, code, schema):
+        with self._lock:
+            os.makedirs(os.path.join(self.directory, key), exist_ok=True)
+            index = self._read_index(key)
+            version = max((v['version'] for v in index['versions']), default=0) + 1
+            with open(os.path.join(self.directory, key, f"v{version}.py"), 'w') as f:
+                f.write(code)
+            index['versions'].append({
+                'version': version,
+                'schema': schema,
+                'created': str(datetime.now()),
+                'valid': True
+            })
+            index['current'] = version
+            self._write_index(key, index)
+        return version
+
+    def invalidate(self, key, version):
+        with self._lock:
+            index = self._read_index(key)
+            for entry in index['versions']:
+                if entry['version'] == version:
+                    entry['valid'] = False
+            valid = [v['version'] for v in index['versions'] if v['valid']]
+            index['current'] = max(valid) if valid else None
+            self._write_index(key, index)
+
+
+class ScriptReplayer:
+    """Capture an agent's successful script once, then re-run it without the LLM"""
+
+    def __init__(self, name, output_path, root=None):
+        self.store = CapturedScriptStore(name, root)
+        self.output_path = output_path
+        self.watcher = ArtifactWatcher()
+
+    def replay(self, key, authorized_imports, tools=None):
+        """Run the stored script; returns its code on success, None if the agent is needed"""
+        stored = self.store.load(key)
+        if stored is None:
+            return None
+        version, code = stored
+        baseline = self.watcher.snapshot(self.output_path)
+        try:
+            run_script(code, authorized_imports, tools)
+            if self.watcher.is_ready(self.output_path, baseline):
+                print(f"Replayed captured script v{version}")
+                return code
+            print(f"Captured script v{version} did not produce {os.path.basename(self.output_path)}")
+        except Exception as e:
+            print(f"Captured script v{version} failed: {str(e)}")
+        self.store.invalidate(key, version)
+        return None
+
+    def capture(self, key, agent, schema, authorized_imports, tools=None):
+        """Store the agent's code if re-running it reproduces the agent's output exactly"""
+        code = extract_agent_code(agent)
+        expected_hash = hash_file(self.output_path)
+        if not code or expected_hash is None:
+            return None
+
+        baseline = self.watcher.snapshot(self.output_path)
+        try:
+            run_script(code, authorized_imports, tools)
+        except Exception as e:
+            print(f"Not capturing script, validation run failed: {str(e)}")
+            return None
+        if not self.watcher.is_ready(self.output_path, baseline) or hash_file(self.output_path) != expected_hash:
+            print("Not capturing script, validation run did not reproduce the agent's output")
+            return None
+
+        version = self.store.save(key, code, schema)
+        print(f"Captured validated script as v{version}")
+        return version
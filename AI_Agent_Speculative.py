@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from AI_Agent_Tracing import get_tracer
+
+
+class SpeculationCancelled(Exception):
+    """Raised from a step callback to stop an attempt that can no longer win"""
+
+
+def attempt_path(output_path, index):
+    root, extension = os.path.splitext(output_path)
+    return f"{root}.spec{index}{extension}"
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _step_tokens(agent, log_entry):
+    """Tokens of the step's LLM call: engine counts when known (0 for cache hits), else estimates"""
+    engine = agent.llm_engine
+    prompt_tokens = getattr(engine, 'last_input_token_count', None)
+    completion_tokens = getattr(engine, 'last_output_token_count', None)
+    if prompt_tokens is None:
+        budget = getattr(agent, '_context_budget', None)
+        prompt_tokens = budget.iterations[-1]['prompt_tokens'] if budget is not None and budget.iterations else 0
+    if completion_tokens is None:
+        completion_tokens = len(str(log_entry.get('llm_output') or '')) // 4
+    return prompt_tokens, completion_tokens
+
+
+class SpeculativeRunner:
+    """Race independently sampled agent attempts; the first one whose output validates wins.
+
+    Each attempt writes to its own file and gets its own temperature and seed. The winner's
+    file is moved onto output_path and every other attempt is cancelled at its next ReAct
+    step. max_tokens caps prompt plus completion tokens across all attempts and max_seconds
+    caps the wall time. Losers still finishing their last step clean up after themselves.
+    """
+
+    def __init__(self, attempts=3, temperatures=(0.2, 0.6, 1.0), base_seed=0, max_tokens=300000,
+                 max_seconds=None):
+        self.attempts = attempts
+        self.temperatures = temperatures
+        self.base_seed = base_seed
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.winner = None
+        self.cap_hit = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._details = []
+        self._started = None
+        self._decided = None
+
+    def sampling_for(self, index):
+        return {'temperature': self.temperatures[index % len(self.temperatures)], 'seed': self.base_seed + index}
+
+    def _tokens(self):
+        return sum(d['prompt_tokens'] + d['completion_tokens'] for d in self._details)
+
+    def _step_callback(self, detail, agent):
+        def on_step(log_entry):
+            prompt_tokens, completion_tokens = _step_tokens(agent, log_entry)
+            with self._lock:
+                detail['steps'] += 1
+                detail['prompt_tokens'] += prompt_tokens
+                detail['completion_tokens'] += completion_tokens
+                if self.max_tokens and self._tokens() > self.max_tokens and self.cap_hit is None:
+                    self.cap_hit = 'tokens'
+                    self._cancel.set()
+                if self.max_seconds and time.monotonic() - self._started > self.max_seconds and self.cap_hit is None:
+                    self.cap_hit = 'seconds'
+                    self._cancel.set()
+            if self._cancel.is_set():
+                raise SpeculationCancelled(f"speculative attempt {detail['index']} cancelled")
+        return on_step
+
+    def _claim(self, detail, path, output_path):
+        """Promote path to output_path if no other attempt has won yet"""
+        with self._lock:
+            if self.winner is not None:
+                return False
+            os.replace(path, output_path)
+            self.winner = detail['index']
+            self._decided = time.monotonic()
+        self._cancel.set()
+        self._done.set()
+        return True
+
+    def _run_attempt(self, detail, make_variant, run_variant, output_path, validate, parent):
+        path = attempt_path(output_path, detail['index'])
+        start = time.monotonic()
+        _remove(path)
+        try:
+            with get_tracer().attached(parent), \
+                    get_tracer().span(f"speculative {detail['index']}", 'speculative', **detail['sampling']):
+                if self._cancel.is_set():
+                    raise SpeculationCancelled(f"speculative attempt {detail['index']} cancelled")
+                variant = make_variant(detail['index'], detail['sampling'], path)
+                variant.code_agent.step_callbacks.append(self._step_callback(detail, variant.code_agent))
+                run_variant(variant)
+            if validate(path) and self._claim(detail, path, output_path):
+                detail['status'] = 'won'
+            else:
+                detail['status'] = 'lost' if self.winner is not None else 'invalid'
+        except SpeculationCancelled:
+            detail['status'] = 'cancelled'
+        except Exception as e:
+            detail['status'] = 'failed'
+            detail['error'] = f"{type(e).__name__}: {str(e)}"
+        finally:
+            detail['seconds'] = round(time.monotonic() - start, 3)
+            if detail['status'] != 'won':
+                _remove(path)
+            with self._lock:
+                finished = all(d['status'] != 'running' for d in self._details)
+            if finished:
+                self._done.set()
+
+    def run(self, make_variant, run_variant, output_path, validate):
+        """True once a validated attempt's output is at output_path.
+
+        make_variant(index, sampling, path) builds a fresh agent component writing to path;
+        run_variant(component) runs it. Does not wait for cancelled attempts to wind down.
+        """
+        parent = get_tracer().current_span()
+        self._started = time.monotonic()
+        self._details = [
+            {'index': index, 'sampling': self.sampling_for(index), 'status': 'running', 'error': None,
+             'seconds': None, 'steps': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+            for index in range(self.attempts)
+        ]
+        print(f"Racing {self.attempts} speculative attempts for {os.path.basename(output_path)}")
+        executor = ThreadPoolExecutor(max_workers=self.attempts, thread_name_prefix='speculative')
+        for detail in self._details:
+            executor.submit(self._run_attempt, detail, make_variant, run_variant, output_path, validate, parent)
+        executor.shutdown(wait=False)
+
+        if not self._done.wait(self.max_seconds):
+            with self._lock:
+                self.cap_hit = self.cap_hit or 'seconds'
+        self._cancel.set()
+        if self.winner is not None:
+            print(f"Speculative attempt {self.winner} won after {self._decided - self._started:.1f}s")
+        else:
+            print(f"No speculative attempt produced a valid {os.path.basename(output_path)}")
+        return self.winner is not None
+
+    def report(self):
+        """Cost and outcome of the race; losers may still add their final step afterwards"""
+        with self._lock:
+            details = [dict(d) for d in self._details]
+        return {
+            'attempts': self.attempts,
+            'winner': self.winner,
+            'winner_sampling': details[self.winner]['sampling'] if self.winner is not None else None,
+            'seconds_to_winner': round(self._decided - self._started, 3) if self._decided else None,
+            'attempt_seconds': round(sum(d['seconds'] or 0 for d in details), 3),
+            'prompt_tokens': sum(d['prompt_tokens'] for d in details),
+            'completion_tokens': sum(d['completion_tokens'] for d in details),
+            'max_tokens': self.max_tokens,
+            'cap_hit': self.cap_hit,
+            'details': details
+        }
@@ -0,0 +1,139 @@
+import os
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+FEATHER_EXTENSIONS = ('.feather', '.arrow')
+
+# Where a single interactive run reads and writes its artifacts; batch runs pass their own directories
+DEFAULT_OUTPUT_DIR = "C:/Users/suman/OneDrive/Desktop/AI Agents"
+# Root of the LLM response cache, preprocessed features and captured scripts
+_state_root = os.environ.get('AI_AGENT_STATE_DIR') or DEFAULT_OUTPUT_DIR
+
+
+def set_state_root(path):
+    """Put caches and stores created from now on under path; existing ones keep their directory.
+    Returns the previous root so callers can restore it"""
+    global _state_root
+    previous, _state_root = _state_root, path
+    return previous
+
+
+def state_dir(name):
+    return os.path.join(_state_root, name)
+
+
+def is_columnar(path):
+    extension = os.path.splitext(path)[1].lower()
+    return os.path.isdir(path) or extension in PARQUET_EXTENSIONS + FEATHER_EXTENSIONS
+
+
+def read_table(path, columns=None):
+    """Read a Parquet/Feather file (or partitioned directory) as a memory-mapped Arrow table"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in FEATHER_EXTENSIONS:
+        return feather.read_table(path, columns=columns, memory_map=True)
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def read_schema(path):
+    """Column names and Arrow types without reading any row data"""
+    extension = os.path.splitext(path)[1].lower()
+    if os.path.isdir(path):
+        schema = pq.ParquetDataset(path).schema
+    elif extension in FEATHER_EXTENSIONS:
+        schema = feather.read_table(path, memory_map=True).schema
+    else:
+        schema = pq.read_schema(path)
+    return [[field.name, str(field.type)] for field in schema if not field.name.startswith('__')]
+
+
+def read_columns(path):
+    """Column names without reading any row data"""
+    if is_columnar(path):
+        return [name for name, _ in read_schema(path)]
+    if os.path.splitext(path)[1].lower() in ('.xlsx', '.xls'):
+        return list(pd.read_excel(path, nrows=0).columns)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_frame(path, columns=None):
+    """Load a DataFrame; columnar files keep nullable Int64 and category dtypes"""
+    if is_columnar(path):
+        return read_table(path, columns=columns).to_pandas()
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xls'):
+        return pd.read_excel(path, usecols=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def iter_frames(path, batch_size=100_000, columns=None):
+    """Stream a file as DataFrames of at most batch_size rows, so memory is bounded by one batch"""
+    extension = os.path.splitext(path)[1].lower()
+    if is_columnar(path):
+        if os.path.isdir(path):
+            batches = ds.dataset(path, format='parquet').to_batches(columns=columns, batch_size=batch_size)
+        elif extension in FEATHER_EXTENSIONS:
+            batches = read_table(path, columns=columns).to_batches(max_chunksize=batch_size)
+        else:
+            batches = pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size, columns=columns)
+        for batch in batches:
+            yield batch.to_pandas()
+    elif extension in ('.xlsx', '.xls'):
+        # Excel cannot be read incrementally
+        yield read_frame(path, columns)
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=batch_size)
+
+
+def estimate_memory_bytes(path):
+    """Approximate in-memory size of a file's data (uncompressed column sizes for Parquet)"""
+    if is_columnar(path) and os.path.splitext(path)[1].lower() not in FEATHER_EXTENSIONS:
+        files = ([os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+                  if not name.startswith(('.', '_'))] if os.path.isdir(path) else [path])
+        total = 0
+        for file_path in files:
+            metadata = pq.ParquetFile(file_path).metadata
+            total += sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+        return total
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    # Text formats roughly double once parsed into Python objects
+    return os.path.getsize(path) * (1 if is_columnar(path) else 2)
+
+
+def write_frame(df, path):
+    """Write a DataFrame atomically so readers never see a half-written file"""
+    extension = os.path.splitext(path)[1].lower()
+    tmp_path = f"{path}.tmp"
+    if extension in FEATHER_EXTENSIONS:
+        df.reset_index(drop=True).to_feather(tmp_path)
+    elif extension in PARQUET_EXTENSIONS:
+        df.to_parquet(tmp_path, index=False)
+    elif extension in ('.xlsx', '.xls'):
+        df.to_excel(tmp_path, index=False, engine='openpyxl')
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def import_to_columnar(source_path, target_path):
+    """Convert a legacy Excel/CSV input once; skipped while the columnar copy is newer"""
+    if not os.path.exists(source_path):
+        return False
+    if os.path.exists(target_path) and os.path.getmtime(target_path) >= os.path.getmtime(source_path):
+        return False
+    print(f"Importing {os.path.basename(source_path)} -> {os.path.basename(target_path)}")
+    write_frame(read_frame(source_path), target_path)
+    return True
+
+
+def export_frame(source_path, target_path):
+    """Export a columnar artifact to CSV or Excel for people and legacy tools"""
+    write_frame(read_frame(source_path), target_path)
+    print(f"Exported {os.path.basename(source_path)} -> {target_path}")
+    return target_path
@@ -0,0 +1,364 @@
+# Kept apart from the agent modules so spawned workers don't import transformers. Spawned
+# workers also re-run the parent's __main__ imports, so the entry points (AI_agent_workflow,
+# AI_Agent_Batch, benchmark_workflow) import agents and engines lazily
+import csv
+import importlib.util
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from AI_Agent_Preprocessing import PreprocessedData, get_preprocessing_cache
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; jobs then only get the wall-clock timeout
+    resource = None
+
+RESULT_COLUMNS = ['Technique', 'Parameters', 'Evaluation Metrics', 'Timestamp']
+
+# Above these row counts a technique runs on a random subsample (or an approximate variant)
+SUBSAMPLE_LIMITS = {
+    'Hierarchical': 10_000,
+    't-SNE': 5_000,
+    'UMAP': 50_000,
+    'Local Outlier Factor': 50_000,
+    'DBSCAN': 100_000,
+    'Apriori': 200_000,
+    'FP-Growth': 200_000
+}
+MINI_BATCH_KMEANS_ROWS = 200_000
+METRIC_SAMPLE_SIZE = 10_000
+# Workers already fill the CPU slots, so each runs single-threaded BLAS/OpenMP; these must be
+# in the environment before the child imports numpy, i.e. when it is spawned
+WORKER_THREAD_VARIABLES = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+_spawn_lock = threading.Lock()
+
+
+@contextmanager
+def _single_threaded_environment():
+    """Spawned children inherit os.environ as it is when they start"""
+    with _spawn_lock:
+        saved = {name: os.environ.get(name) for name in WORKER_THREAD_VARIABLES}
+        os.environ.update({name: '1' for name in WORKER_THREAD_VARIABLES})
+        try:
+            yield
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+def sweep_jobs(n_rows, has_categorical=True):
+    """Every technique/parameter combination in the agent prompt, as independent jobs"""
+    kmeans = 'MiniBatchKMeans' if n_rows > MINI_BATCH_KMEANS_ROWS else 'K-Means'
+    jobs = [(kmeans, {'n_clusters': k}) for k in (2, 3, 4, 5, 6)]
+    jobs += [('DBSCAN', {'eps': eps, 'min_samples': 5}) for eps in (0.5, 1.0)]
+    jobs += [('Hierarchical', {'n_clusters': k, 'linkage': 'ward'}) for k in (2, 3, 4)]
+    jobs += [('Isolation Forest', {'contamination': c}) for c in (0.05, 0.1)]
+    jobs += [('Local Outlier Factor', {'n_neighbors': 20, 'contamination': 0.1})]
+    jobs += [('PCA', {'n_components': 0.95})]
+    jobs += [('t-SNE', {'n_components': 2, 'perplexity': 30})]
+    if importlib.util.find_spec('umap') is not None:
+        jobs += [('UMAP', {'n_components': 2, 'n_neighbors': 15})]
+    if has_categorical and importlib.util.find_spec('mlxtend') is not None:
+        jobs += [('Apriori', {'min_support': 0.05, 'min_confidence': 0.5}),
+                 ('FP-Growth', {'min_support': 0.05, 'min_confidence': 0.5})]
+    return jobs
+
+
+def _subsample(n_rows, limit, seed=42):
+    if limit is None or n_rows <= limit:
+        return None
+    return np.sort(np.random.default_rng(seed).choice(n_rows, size=limit, replace=False))
+
+
+def _clustering_metrics(X, labels):
+    from sklearn.metrics import calinski_harabasz_score, silhouette_score
+
+    clustered = labels != -1
+    n_clusters = len(set(labels[clustered]))
+    metrics = {'n_clusters': n_clusters, 'noise_fraction': round(float(1 - clustered.mean()), 4)}
+    if 2 <= n_clusters < clustered.sum():
+        X_clustered = X[clustered]
+        metrics['silhouette_score'] = float(silhouette_score(
+            X_clustered, labels[clustered],
+            sample_size=min(METRIC_SAMPLE_SIZE, X_clustered.shape[0]), random_state=42
+        ))
+        metrics['calinski_harabasz_index'] = float(calinski_harabasz_score(
+            X_clustered.toarray() if hasattr(X_clustered, 'toarray') else X_clustered, labels[clustered]
+        ))
+    return metrics
+
+
+def _anomaly_metrics(predictions, scores):
+    quantiles = np.percentile(scores, [1, 5, 50, 95, 99])
+    return {
+        'anomaly_fraction': round(float((predictions == -1).mean()), 4),
+        'score_mean': float(np.mean(scores)),
+        'score_std': float(np.std(scores)),
+        'score_quantiles': dict(zip(['p1', 'p5', 'p50', 'p95', 'p99'], map(float, quantiles)))
+    }
+
+
+def _association_metrics(technique, params, data):
+    import pandas as pd
+    from mlxtend.frequent_patterns import apriori, association_rules, fpgrowth
+    from AI_Agent_Storage import read_frame
+
+    columns = data.meta['categorical_columns']
+    frame = read_frame(data.meta['data_path'], columns=columns)
+    rows = _subsample(len(frame), SUBSAMPLE_LIMITS[technique])
+    if rows is not None:
+        frame = frame.iloc[rows]
+    # Missing values are not items: get_dummies leaves NA out of category columns
+    baskets = pd.get_dummies(frame.astype('category'), prefix_sep='=').astype(bool)
+    finder = apriori if technique == 'Apriori' else fpgrowth
+    itemsets = finder(baskets, min_support=params['min_support'], use_colnames=True)
+    metrics = {'n_itemsets': int(len(itemsets)), 'rows_used': int(len(frame))}
+    if len(itemsets):
+        rules = association_rules(itemsets, metric='confidence', min_threshold=params['min_confidence'])
+        metrics['n_rules'] = int(len(rules))
+        metrics['max_support'] = float(itemsets['support'].max())
+        if len(rules):
+            metrics['mean_confidence'] = float(rules['confidence'].mean())
+            metrics['max_lift'] = float(rules['lift'].max())
+    return metrics
+
+
+def run_technique(technique, params, data):
+    """Fit one technique on the shared feature matrix and return its evaluation metrics"""
+    from sklearn import cluster, decomposition, ensemble, manifold, neighbors
+
+    if technique in ('Apriori', 'FP-Growth'):
+        return _association_metrics(technique, params, data)
+
+    X = data.matrix
+    n_rows = X.shape[0]
+    rows = _subsample(n_rows, SUBSAMPLE_LIMITS.get(technique))
+    if rows is not None:
+        X = X[rows]
+    if technique in ('Hierarchical', 't-SNE', 'PCA', 'UMAP') and hasattr(X, 'toarray'):
+        X = X.toarray()
+    metrics = {'rows_used': int(X.shape[0]), 'subsampled': rows is not None}
+
+    if technique in ('K-Means', 'MiniBatchKMeans'):
+        estimator = (cluster.KMeans(n_init=10, random_state=42, **params) if technique == 'K-Means'
+                     else cluster.MiniBatchKMeans(n_init=3, random_state=42, **params))
+        labels = estimator.fit_predict(X)
+        metrics.update(_clustering_metrics(X, labels))
+        metrics['inertia'] = float(estimator.inertia_)
+    elif technique == 'DBSCAN':
+        metrics.update(_clustering_metrics(X, cluster.DBSCAN(**params).fit_predict(X)))
+    elif technique == 'Hierarchical':
+        metrics.update(_clustering_metrics(X, cluster.AgglomerativeClustering(**params).fit_predict(X)))
+    elif technique == 'Isolation Forest':
+        estimator = ensemble.IsolationForest(random_state=42, **params)
+        predictions = estimator.fit_predict(X)
+        metrics.update(_anomaly_metrics(predictions, -estimator.score_samples(X)))
+    elif technique == 'Local Outlier Factor':
+        estimator = neighbors.LocalOutlierFactor(**params)
+        predictions = estimator.fit_predict(X)
+        metrics.update(_anomaly_metrics(predictions, -estimator.negative_outlier_factor_))
+    elif technique == 'PCA':
+        estimator = decomposition.PCA(random_state=42, **params).fit(X)
+        metrics['n_components'] = int(estimator.n_components_)
+        metrics['explained_variance_ratio'] = [float(v) for v in estimator.explained_variance_ratio_]
+        metrics['total_variance_explained'] = float(estimator.explained_variance_ratio_.sum())
+    elif technique == 't-SNE':
+        perplexity = min(params['perplexity'], max(1, X.shape[0] - 1) / 3)
+        estimator = manifold.TSNE(n_components=params['n_components'], perplexity=perplexity,
+                                  init='pca', random_state=42)
+        embedding = estimator.fit_transform(X)
+        metrics['kl_divergence'] = float(estimator.kl_divergence_)
+        metrics['trustworthiness'] = float(manifold.trustworthiness(X, embedding))
+    elif technique == 'UMAP':
+        import umap
+        embedding = umap.UMAP(random_state=42, **params).fit_transform(X)
+        metrics['trustworthiness'] = float(manifold.trustworthiness(X, embedding))
+    else:
+        raise ValueError(f"Unknown technique: {technique}")
+    return metrics
+
+
+def _set_cpu_limit(cpu_seconds):
+    """RLIMIT_CPU counts the whole process, so each job's budget starts from the CPU time used so far"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_loop(data_directory, cpu_seconds, memory_mb, connection):
+    """Child-process entry point: apply resource limits, then run jobs sent over connection
+    until it is closed, loading the feature matrix only once"""
+    if resource is not None and memory_mb:
+        # RLIMIT_DATA counts heap and anonymous mappings; RLIMIT_AS would also count the address
+        # space thread arenas and memory-mapped files reserve without using it
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    data = PreprocessedData(data_directory)
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        technique, params = job
+        if resource is not None and cpu_seconds:
+            _set_cpu_limit(cpu_seconds)
+        start = time.perf_counter()
+        try:
+            metrics = run_technique(technique, params, data)
+            metrics['status'] = 'success'
+        except MemoryError:
+            metrics = {'status': 'failed', 'error': f"exceeded {memory_mb} MB memory limit"}
+        except Exception as e:
+            metrics = {'status': 'failed', 'error': str(e)}
+        metrics['runtime_seconds'] = round(time.perf_counter() - start, 3)
+        connection.send(metrics)
+    connection.close()
+
+
+class _SweepWorker:
+    """One long-lived worker process and the job it is running, if any"""
+
+    def __init__(self, context, data_directory, cpu_seconds, memory_mb):
+        self.cpu_seconds = cpu_seconds
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_worker_loop, args=(data_directory, cpu_seconds, memory_mb, child),
+                                       daemon=True)
+        with _single_threaded_environment():
+            self.process.start()
+        child.close()
+        self.job = None
+        self.started = None
+        self.alive = True
+
+    def submit(self, job):
+        self.job = job
+        self.started = time.monotonic()
+        self.connection.send(job)
+
+    def _exit_error(self):
+        self.process.join()
+        self.alive = False
+        if resource is not None and self.process.exitcode == -signal.SIGXCPU:
+            return f"exceeded {self.cpu_seconds}s CPU limit"
+        return f"worker exited with code {self.process.exitcode}"
+
+    def poll(self, timeout):
+        """Metrics of the finished job, or None while it is still running"""
+        metrics = None
+        if self.connection.poll():
+            try:
+                metrics = self.connection.recv()
+            except EOFError:
+                metrics = {'status': 'failed', 'error': self._exit_error()}
+        elif not self.process.is_alive():
+            metrics = {'status': 'failed', 'error': self._exit_error()}
+        elif time.monotonic() - self.started > timeout:
+            self.process.terminate()
+            self.process.join()
+            self.alive = False
+            metrics = {'status': 'timeout', 'error': f"exceeded {timeout}s"}
+        if metrics is not None:
+            self.job = None
+        return metrics
+
+    def stop(self):
+        if self.alive and self.process.is_alive():
+            try:
+                self.connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.connection.close()
+        self.alive = False
+
+
+class UnsupervisedSweep:
+    """Run the unsupervised techniques on a pool of resource-limited worker processes, streaming results to CSV.
+
+    Workers live for the whole sweep, so numpy/sklearn are imported and the feature matrix
+    opened once per worker rather than once per job. A worker whose job overruns the
+    timeout (or dies) is killed and replaced.
+    """
+
+    def __init__(self, data_path, results_path, max_workers=None, timeout=600,
+                 cpu_seconds=900, memory_mb=4096):
+        self.data_path = data_path
+        self.results_path = results_path
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.preprocessing = get_preprocessing_cache()
+
+    def _append_result(self, technique, params, metrics):
+        with open(self.results_path, 'a', newline='') as f:
+            csv.writer(f).writerow([
+                technique, json.dumps(params), json.dumps(metrics), datetime.now().isoformat()
+            ])
+            f.flush()
+
+    def run(self):
+        data = self.preprocessing.materialize(self.data_path)
+        jobs = sweep_jobs(data.meta['shape'][0], bool(data.meta['categorical_columns']))
+        print(f"Running {len(jobs)} unsupervised jobs on {min(self.max_workers, len(jobs))} workers")
+
+        with open(self.results_path, 'w', newline='') as f:
+            csv.writer(f).writerow(RESULT_COLUMNS)
+
+        context = multiprocessing.get_context('spawn')
+        pending = list(jobs)
+        workers = []
+        results = []
+        try:
+            while pending or any(worker.job is not None for worker in workers):
+                for worker in workers:
+                    if worker.job is None and pending:
+                        worker.submit(pending.pop(0))
+                while pending and len(workers) < self.max_workers:
+                    worker = _SweepWorker(context, data.directory, self.cpu_seconds, self.memory_mb)
+                    worker.submit(pending.pop(0))
+                    workers.append(worker)
+
+                for worker in list(workers):
+                    if worker.job is None:
+                        continue
+                    technique, params = worker.job
+                    metrics = worker.poll(self.timeout)
+                    if metrics is None:
+                        continue
+                    if not worker.alive:
+                        worker.stop()
+                        workers.remove(worker)
+                    self._append_result(technique, params, metrics)
+                    results.append((technique, params, metrics))
+                    print(f"{technique} {params}: {metrics['status']}")
+
+                time.sleep(0.05)
+        finally:
+            for worker in workers:
+                worker.stop()
+
+        succeeded = sum(metrics['status'] == 'success' for _, _, metrics in results)
+        print(f"Unsupervised sweep finished: {succeeded}/{len(results)} jobs succeeded")
+        if not succeeded:
+            raise RuntimeError("No unsupervised technique succeeded")
+        return results
@@ -0,0 +1,269 @@
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Categories whose time is attributed to the enclosing phase in the breakdown
+BREAKDOWN_CATEGORIES = ('llm', 'code', 'tool', 'compute')
+
+
+class Span:
+    def __init__(self, span_id, parent_id, name, category, attributes):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self, origin):
+        return {
+            'id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'category': self.category,
+            'thread_id': self.thread_id,
+            'start_seconds': round(self.start - origin, 6),
+            'duration_seconds': round(self.duration, 6),
+            'attributes': self.attributes
+        }
+
+
+class Tracer:
+    """Nested timing spans for phases, ReAct iterations, LLM calls and code execution"""
+
+    def __init__(self, profile_code=False, trace_memory=False):
+        self.profile_code = profile_code
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+            self._ids = itertools.count(1)
+            self.origin = time.perf_counter()
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, category, parent=None, detached=False, **attributes):
+        """Time a block; spans opened in the same thread nest automatically.
+
+        Pass parent explicitly when the work runs on a different thread than its caller.
+        Detached spans are not pushed on the thread's stack, so they are safe to hold
+        across awaits where several coroutines share one thread.
+        """
+        stack = self._stack()
+        if parent is None and stack and not detached:
+            parent = stack[-1]
+        with self._lock:
+            span = Span(next(self._ids), parent.span_id if parent else None, name, category, attributes)
+            self.spans.append(span)
+        if not detached:
+            stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes['error'] = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            span.end = time.perf_counter()
+            if not detached:
+                stack.pop()
+
+    @contextmanager
+    def attached(self, span):
+        """Make an existing span the parent of spans opened in this thread (e.g. executor workers)"""
+        stack = self._stack()
+        if span is not None:
+            stack.append(span)
+        try:
+            yield span
+        finally:
+            if span is not None:
+                stack.pop()
+
+    def current_span(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def instrument_agent(self, agent):
+        """Wrap a ReactCodeAgent's step, code evaluator and tools with spans"""
+        if getattr(agent, '_traced', False):
+            return agent
+        tracer = self
+
+        original_step = agent.step
+
+        def traced_step(log_entry, *args, **kwargs):
+            with tracer.span(f"iteration {log_entry.get('iteration', '?')}", 'iteration'):
+                return original_step(log_entry, *args, **kwargs)
+
+        original_evaluator = agent.python_evaluator
+
+        def traced_evaluator(code, *args, **kwargs):
+            with tracer.span('code_execution', 'code', code_chars=len(code)) as span:
+                return tracer._run_profiled(span, original_evaluator, code, *args, **kwargs)
+
+        agent.step = traced_step
+        agent.python_evaluator = traced_evaluator
+        for name, tool in agent.toolbox.tools.items():
+            tool.forward = self._traced_tool(name, tool.forward)
+        agent._traced = True
+        return agent
+
+    def _traced_tool(self, name, forward):
+        def traced_forward(*args, **kwargs):
+            with self.span(name, 'tool'):
+                return forward(*args, **kwargs)
+        return traced_forward
+
+    def _run_profiled(self, span, function, *args, **kwargs):
+        """Optionally capture cProfile hot spots and tracemalloc peak for generated code"""
+        profiler = cProfile.Profile() if self.profile_code else None
+        started_tracemalloc = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+        if profiler:
+            profiler.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if profiler:
+                profiler.disable()
+                output = io.StringIO()
+                pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(15)
+                span.attributes['profile'] = output.getvalue()
+            if self.trace_memory:
+                span.attributes['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+    def _spans(self, root=None):
+        """All spans, or only root and its descendants (children are always recorded after parents)"""
+        with self._lock:
+            spans = list(self.spans)
+        if root is None:
+            return spans
+        ids = {root.span_id}
+        subtree = []
+        for span in spans:
+            if span.span_id in ids or span.parent_id in ids:
+                ids.add(span.span_id)
+                subtree.append(span)
+        return subtree
+
+    def discard(self, root):
+        """Forget a finished run's spans so long-lived processes don't accumulate them"""
+        drop = {span.span_id for span in self._spans(root)}
+        with self._lock:
+            self.spans = [span for span in self.spans if span.span_id not in drop]
+
+    def to_json(self, root=None):
+        return [span.to_dict(self.origin) for span in self._spans(root)]
+
+    def to_chrome_trace(self, root=None):
+        """Trace Event Format, loadable in chrome://tracing or Perfetto"""
+        events = []
+        pid = os.getpid()
+        for span in self._spans(root):
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': round((span.start - self.origin) * 1e6),
+                'dur': round(span.duration * 1e6),
+                'pid': pid,
+                'tid': span.thread_id,
+                'args': {k: v for k, v in span.attributes.items() if k != 'profile'}
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, json_path, chrome_path=None, root=None):
+        with open(json_path, 'w') as f:
+            json.dump(self.to_json(root), f, indent=2, default=str)
+        if chrome_path:
+            with open(chrome_path, 'w') as f:
+                json.dump(self.to_chrome_trace(root), f, default=str)
+
+    def breakdown(self, root=None):
+        """Per-phase split of time into LLM latency, code execution, tools and native compute"""
+        spans = self._spans(root)
+        by_id = {span.span_id: span for span in spans}
+
+        def phase_of(span):
+            while span is not None:
+                if span.category == 'phase':
+                    return span
+                span = by_id.get(span.parent_id)
+            return None
+
+        def nested_in(span, category):
+            parent = by_id.get(span.parent_id)
+            while parent is not None:
+                if parent.category == category:
+                    return True
+                parent = by_id.get(parent.parent_id)
+            return False
+
+        phases = {}
+        for span in spans:
+            if span.category == 'phase':
+                phases.setdefault(span.name, {
+                    'total_seconds': 0.0, 'llm_seconds': 0.0, 'llm_calls': 0, 'llm_cache_hits': 0,
+                    'prompt_tokens': 0, 'completion_tokens': 0, 'code_seconds': 0.0,
+                    'tool_seconds': 0.0, 'compute_seconds': 0.0, 'iterations': 0
+                })['total_seconds'] += span.duration
+
+        for span in spans:
+            phase = phase_of(span)
+            if phase is None or span is phase:
+                continue
+            entry = phases[phase.name]
+            if span.category == 'iteration':
+                entry['iterations'] += 1
+            elif span.category in BREAKDOWN_CATEGORIES and not nested_in(span, span.category):
+                entry[f"{span.category}_seconds"] += span.duration
+            if span.category == 'llm':
+                entry['llm_calls'] += 1
+                entry['llm_cache_hits'] += int(bool(span.attributes.get('cache_hit')))
+                entry['prompt_tokens'] += span.attributes.get('prompt_tokens') or 0
+                entry['completion_tokens'] += span.attributes.get('completion_tokens') or 0
+
+        for entry in phases.values():
+            # Tools run inside generated code, so only llm/code/compute are subtracted
+            accounted = entry['llm_seconds'] + entry['code_seconds'] + entry['compute_seconds']
+            entry['other_seconds'] = max(0.0, entry['total_seconds'] - accounted)
+            for key, value in entry.items():
+                if isinstance(value, float):
+                    entry[key] = round(value, 3)
+        return phases
+
+
+_default_tracer = None
+_default_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    global _default_tracer
+    with _default_tracer_lock:
+        if _default_tracer is None:
+            _default_tracer = Tracer()
+        return _default_tracer
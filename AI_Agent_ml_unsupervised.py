@@ -1,22 +1,37 @@
-from transformers import ReactCodeAgent, HfApiEngine
-from huggingface_hub import login
+from transformers import ReactCodeAgent
 from transformers import tool
+from AI_Agent_Async import run_agent_async, run_in_executor
+from AI_Agent_Context import ContextBudget
+from AI_Agent_Preprocessing import get_preprocessing_cache
+from AI_Agent_Registry import get_registry
+from AI_Agent_Retry import prepare_resume, run_agent
+from AI_Agent_Sandbox import get_sandbox_pool
+from AI_Agent_Storage import DEFAULT_OUTPUT_DIR
+from AI_Agent_Sweep import UnsupervisedSweep
+from AI_Agent_Tracing import get_tracer
 
 
 class UnsupervisedMLAutomation:
-    def __init__(self):
+    def __init__(self, data_path=None, results_path=None):
         self.hf_token = ""
         self.model_name = "Qwen/Qwen2.5-Coder-32B-Instruct"
-        self.task = """
-        1. Load data from 'C:/Users/suman/OneDrive/Desktop/AI Agents/temp.csv'
+        self.data_path = data_path or f"{DEFAULT_OUTPUT_DIR}/temp.parquet"
+        self.results_path = results_path or f"{DEFAULT_OUTPUT_DIR}/unsupervised_results.csv"
+        self.preprocessing = get_preprocessing_cache()
+        self.task = f"""
+        1. Load the shared preprocessed feature matrix instead of preprocessing '{self.data_path}' again:
+            - Read '{self.preprocessing.index_path_for(self.data_path)}' with pandas.read_json(path, typ='series');
+              it has 'matrix_path', 'format', 'feature_names' and 'target_column'
+            - If format is 'dense' load it with numpy.load(matrix_path, mmap_mode='r'),
+              if 'sparse' with scipy.sparse.load_npz(matrix_path)
+            - Categorical features are already one-hot encoded, numerical features scaled
+              and missing values imputed; the target column is excluded
+            - Only if that file is missing, load '{self.data_path}' with pandas.read_parquet()
+              and encode/scale/impute it yourself
 
         2. Perform automated unsupervised ML analysis:
-            a. Auto-detect feature types (categorical/numerical)
-            b. Handle preprocessing:
-                - Encode categorical features (OneHotEncoding)
-                - Scale numerical features (StandardScaler)
-                - Handle missing values
-                - Dimensionality reduction if needed (PCA, t-SNE)
+            a. Use the feature names to tell one-hot (categorical) columns from numerical ones
+            b. Dimensionality reduction if needed (PCA, t-SNE)
             
             3. Try different unsupervised techniques:
                 - Clustering (K-Means, DBSCAN, Hierarchical)
@@ -31,38 +46,89 @@ class UnsupervisedMLAutomation:
                 d. For association rules: support/confidence metrics
             
             5. Store all results in 
-                'C:/Users/suman/OneDrive/Desktop/AI Agents/unsupervised_results.csv' with columns:
+                '{self.results_path}' with columns:
                 - Technique
                 - Parameters
                 - Evaluation Metrics (JSON)
                 - Timestamp
         """
         self.authorized_imports = [
-            'pandas', 'openpyxl', 'numpy',
+            'pandas', 'pyarrow', 'openpyxl', 'numpy', 'scipy.sparse',
             'sklearn.cluster', 'sklearn.decomposition',
             'sklearn.manifold', 'sklearn.neighbors',
             'sklearn.metrics', 'mlxtend.frequent_patterns',
             'umap', 'seaborn', 'matplotlib',
             'joblib', 'datetime', 'json'
         ]
-        self.initialize_environment()
+        # The built-in sweep covers the techniques above; the agent is the fallback
+        self.use_native_engine = True
+        self.native_engine = UnsupervisedSweep(self.data_path, self.results_path)
+        # Engine and agent are built on first use, not at construction
+        self._code_agent = None
 
     def initialize_environment(self):
-        login(token=self.hf_token)
-        self.llm_engine = HfApiEngine(
-            model=self.model_name,
-            token=self.hf_token
+        self.llm_engine = get_registry().get_agent_engine(
+            self.model_name, self.hf_token, self.authorized_imports
         )
-        self.code_agent = ReactCodeAgent(
+        self._code_agent = ReactCodeAgent(
             llm_engine=self.llm_engine,
             tools=[],
             add_base_tools=True,
             max_iterations=25, 
             additional_authorized_imports=self.authorized_imports
         )
+        self.llm_engine.tool_names = sorted(self._code_agent.toolbox.tools)
+        # Per-agent prompt shaping and token metering; the report shows prompt size per iteration
+        self.context_budget = ContextBudget()
+        self.context_budget.attach(self._code_agent)
+        sandbox = get_sandbox_pool()
+        sandbox.attach(self._code_agent, self.authorized_imports)
+        sandbox.prefetch(self.data_path)
+        get_tracer().instrument_agent(self._code_agent)
 
-    def execute_task(self):
-        generated_code = self.code_agent.run(self.task)
+    @property
+    def code_agent(self):
+        if self._code_agent is None:
+            self.initialize_environment()
+        return self._code_agent
+
+    def _run_native(self):
+        with get_tracer().span('native_sweep', 'compute'):
+            return self.native_engine.run()
+
+    def _prepare_features(self):
+        try:
+            self.preprocessing.materialize(self.data_path)
+        except Exception as e:
+            print(f"Could not materialize shared features ({str(e)}); the agent will preprocess itself")
+            self.preprocessing.forget_latest(self.data_path)
+
+    def execute_task(self, resume=False):
+        # A retry after the agent already ran continues the agent; the native engine already failed
+        if self.use_native_engine and not (resume and self._code_agent is not None):
+            try:
+                return self._run_native()
+            except Exception as e:
+                print(f"Built-in unsupervised sweep failed ({str(e)}); using the LLM agent")
+
+        self._prepare_features()
+        generated_code = run_agent(self.code_agent, self.task, resume)
+        print("Generated Unsupervised Code:\n", generated_code)
+        return generated_code
+
+    async def execute_task_async(self, executor=None, resume=False):
+        """execute_task that awaits the LLM instead of holding a thread while it generates"""
+        if self.use_native_engine and not (resume and self._code_agent is not None):
+            try:
+                return await run_in_executor(self._run_native, executor=executor)
+            except Exception as e:
+                print(f"Built-in unsupervised sweep failed ({str(e)}); using the LLM agent")
+
+        await run_in_executor(self._prepare_features, executor=executor)
+        async_engine = get_registry().get_async_engine(self.model_name, self.hf_token)
+        reset = not (resume and prepare_resume(self.code_agent))
+        generated_code = await run_agent_async(self.code_agent, self.task, async_engine, reset=reset,
+                                               executor=executor)
         print("Generated Unsupervised Code:\n", generated_code)
         return generated_code
 
@@ -1,13 +1,458 @@
-from transformers import ReactCodeAgent, HfApiEngine
-from huggingface_hub import login
+from transformers import ReactCodeAgent
+from AI_Agent_Async import run_agent_async, run_in_executor
+from AI_Agent_Context import ContextBudget
+import json
+import os
+import tempfile
+from collections import Counter
+from datetime import datetime
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LinearRegression, LogisticRegression, SGDClassifier, SGDRegressor
+from sklearn.metrics import classification_report, confusion_matrix, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+from scipy import sparse
+from AI_Agent_ModelMetrics import RESULT_COLUMNS
+from AI_Agent_Preprocessing import get_preprocessing_cache, split_features
+from AI_Agent_Registry import get_registry
+from AI_Agent_Retry import prepare_resume, run_agent
+from AI_Agent_Sandbox import get_sandbox_pool
+from AI_Agent_Storage import (DEFAULT_OUTPUT_DIR, estimate_memory_bytes, iter_frames, read_columns, read_frame,
+                              write_frame)
+from AI_Agent_Tracing import get_tracer
+
+try:
+    import xgboost
+    from xgboost import XGBClassifier, XGBRegressor
+except ImportError:  # XGBoost models are skipped when xgboost is not installed
+    xgboost = XGBClassifier = XGBRegressor = None
+
+
+
+def default_streaming_threshold():
+    """A quarter of physical memory (2 GiB when it can't be determined)"""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 4
+    except (AttributeError, ValueError, OSError):
+        return 2 * 1024 ** 3
+
+
+def candidate_models(task_type, random_state=42):
+    """Model name -> unfitted estimator, matching the models the agent prompt asks for"""
+    if task_type == 'classification':
+        models = {
+            'Logistic Regression': LogisticRegression(max_iter=1000, random_state=random_state),
+            'Random Forest Classifier': RandomForestClassifier(random_state=random_state)
+        }
+        if XGBClassifier is not None:
+            models['XGBoost Classifier'] = XGBClassifier(random_state=random_state, n_jobs=1)
+    else:
+        models = {
+            'Linear Regression': LinearRegression(),
+            'Decision Tree Regressor': DecisionTreeRegressor(random_state=random_state)
+        }
+        if XGBRegressor is not None:
+            models['XGBoost Regressor'] = XGBRegressor(random_state=random_state, n_jobs=1)
+    return models
+
+
+def _fit_and_evaluate(name, model, X_train, X_test, y_train, y_test, task_type, class_names):
+    model.fit(X_train, y_train)
+    predictions = model.predict(X_test)
+
+    if task_type == 'classification':
+        labels = list(range(len(class_names)))
+        report = classification_report(
+            y_test, predictions, labels=labels, target_names=class_names,
+            output_dict=True, zero_division=0
+        )
+        return [
+            (name, 'confusion_matrix', json.dumps(confusion_matrix(y_test, predictions, labels=labels).tolist()),
+             datetime.now().isoformat()),
+            (name, 'classification_report', json.dumps(report), datetime.now().isoformat())
+        ]
+
+    rmse = float(np.sqrt(mean_squared_error(y_test, predictions)))
+    return [
+        (name, 'rmse', json.dumps(rmse), datetime.now().isoformat()),
+        (name, 'r_squared', json.dumps(float(r2_score(y_test, predictions))), datetime.now().isoformat())
+    ]
+
+
+class SupervisedAutoML:
+    """Deterministic stand-in for the supervised agent: same models, same confusion.csv schema"""
+
+    def __init__(self, data_path, results_path, target_column=None, test_size=0.2,
+                 random_state=42, n_jobs=-1, max_classes=50, metrics_store=None):
+        self.data_path = data_path
+        self.results_path = results_path
+        # With a ModelMetricsStore, metrics are stored normalized and confusion.csv is exported from it
+        self.metrics_store = metrics_store
+        self.run_id = None
+        self.dataset = None
+        self.target_column = target_column
+        self.test_size = test_size
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.max_classes = max_classes
+        self.preprocessing = get_preprocessing_cache()
+
+    def detect_task_type(self, y):
+        if (isinstance(y.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(y)
+                or pd.api.types.is_object_dtype(y) or pd.api.types.is_string_dtype(y)):
+            return 'classification'
+        if pd.api.types.is_integer_dtype(y) and y.nunique() <= 20:
+            return 'classification'
+        return 'regression'
+
+    def run(self):
+        target = self.target_column or read_columns(self.data_path)[-1]
+        y = read_frame(self.data_path, columns=[target])[target]
+        task_type = self.detect_task_type(y)
+        print(f"Target '{target}' -> {task_type}")
+
+        rows_with_target = np.flatnonzero(y.notna().to_numpy())
+        y = y.iloc[rows_with_target]
+        class_names = None
+        stratify = None
+        if task_type == 'classification':
+            encoder = LabelEncoder()
+            y = encoder.fit_transform(y.to_numpy() if pd.api.types.is_numeric_dtype(y) else y.astype(str))
+            class_names = [str(c) for c in encoder.classes_]
+            if len(class_names) > self.max_classes:
+                raise ValueError(f"{len(class_names)} classes is too many for the built-in engine")
+            if np.bincount(y).min() >= 2:
+                stratify = y
+        else:
+            y = y.astype('float64').to_numpy()
+
+        train_rows, test_rows, y_train, y_test = train_test_split(
+            rows_with_target, y, test_size=self.test_size, random_state=self.random_state, stratify=stratify
+        )
+
+        # Imputation, scaling and encoding are fit on the training rows only, so test rows can't
+        # leak into them; the cached matrix is reused by every model and by later runs
+        data = self.preprocessing.materialize(self.data_path, target, fit_rows=train_rows)
+        X_train = data.matrix[train_rows]
+        X_test = data.matrix[test_rows]
+
+        models = candidate_models(task_type, self.random_state)
+        print(f"Training {', '.join(models)}")
+        results = Parallel(n_jobs=self.n_jobs)(
+            delayed(_fit_and_evaluate)(name, model, X_train, X_test, y_train, y_test, task_type, class_names)
+            for name, model in models.items()
+        )
+
+        rows = [row for model_rows in results for row in model_rows]
+        return self._store_rows(rows, len(models))
+
+    def _store_rows(self, rows, model_count):
+        if self.metrics_store is not None:
+            run_id = self.run_id or datetime.now().strftime('%Y%m%d%H%M%S%f')
+            self.metrics_store.record_results(run_id, rows, self.dataset)
+            self.metrics_store.export_results(run_id, self.results_path)
+        else:
+            write_frame(pd.DataFrame(rows, columns=RESULT_COLUMNS), self.results_path)
+        print(f"Stored {len(rows)} metrics for {model_count} models in {self.results_path}")
+        return rows
+
+
+def report_from_confusion(matrix, class_names):
+    """classification_report(output_dict=True, zero_division=0) computed from a confusion matrix"""
+    matrix = np.asarray(matrix, dtype='float64')
+    support = matrix.sum(axis=1)
+    predicted = matrix.sum(axis=0)
+    correct = np.diag(matrix)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, correct / predicted, 0.0)
+        recall = np.where(support > 0, correct / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    total = support.sum()
+    report = {
+        name: {'precision': float(precision[i]), 'recall': float(recall[i]), 'f1-score': float(f1[i]),
+               'support': float(support[i])}
+        for i, name in enumerate(class_names)
+    }
+    report['accuracy'] = float(correct.sum() / total) if total else 0.0
+    weights = support / total if total else np.zeros_like(support)
+    for name, average in (('macro avg', np.mean), ('weighted avg', lambda v: float(np.sum(v * weights)))):
+        report[name] = {'precision': float(average(precision)), 'recall': float(average(recall)),
+                        'f1-score': float(average(f1)), 'support': float(total)}
+    return report
+
+
+class _StreamingFeatures:
+    """Preprocessing fitted one batch at a time: running scaler for numbers, capped one-hot for the rest"""
+
+    def __init__(self, numeric_columns, categorical_columns, max_categories=100):
+        self.numeric_columns = numeric_columns
+        self.categorical_columns = categorical_columns
+        self.max_categories = max_categories
+        self.scaler = StandardScaler()
+        self.counts = {column: Counter() for column in categorical_columns}
+        self.vocabularies = {}
+
+    def prepare(self, frame):
+        """Column types fixed on the first batch, so CSV chunks with odd dtypes stay consistent"""
+        X = pd.DataFrame(index=frame.index)
+        for column in self.numeric_columns:
+            X[column] = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+        for column in self.categorical_columns:
+            X[column] = frame[column].astype(object).where(frame[column].notna(), np.nan)
+        return X
+
+    def partial_fit(self, X):
+        if self.numeric_columns:
+            self.scaler.partial_fit(X[self.numeric_columns].to_numpy())
+        for column in self.categorical_columns:
+            counts = self.counts[column]
+            counts.update(X[column].value_counts(dropna=True).to_dict())
+            # Keep the counters bounded on high-cardinality columns; top categories survive
+            if len(counts) > 10 * self.max_categories:
+                self.counts[column] = Counter(dict(counts.most_common(self.max_categories)))
+
+    def finalize(self):
+        self.vocabularies = {column: [value for value, _ in counts.most_common(self.max_categories)]
+                             for column, counts in self.counts.items()}
+        self.counts = {}
+
+    @property
+    def n_features(self):
+        return len(self.numeric_columns) + sum(len(v) for v in self.vocabularies.values())
+
+    def transform(self, X):
+        blocks = []
+        if self.numeric_columns:
+            # Missing numbers become the running mean (0 once scaled)
+            numeric = np.nan_to_num(self.scaler.transform(X[self.numeric_columns].to_numpy()), nan=0.0)
+            blocks.append(sparse.csr_matrix(numeric))
+        for column in self.categorical_columns:
+            vocabulary = self.vocabularies[column]
+            codes = pd.Categorical(X[column], categories=vocabulary).codes
+            rows = np.flatnonzero(codes >= 0)
+            blocks.append(sparse.csr_matrix((np.ones(len(rows)), (rows, codes[rows])),
+                                            shape=(len(X), len(vocabulary))))
+        return sparse.hstack(blocks, format='csr')
+
+
+class StreamingAutoML(SupervisedAutoML):
+    """SupervisedAutoML for data larger than memory: every pass streams batch_size rows at a time.
+
+    Pass one fits the scaler and category vocabularies and finds the task type and classes,
+    then SGD linear models train with partial_fit for `epochs` passes and XGBoost trains from
+    an external-memory DMatrix fed by a batch iterator. The holdout is chosen by hashing each
+    row, so it is the same on every pass. Confusion matrices and regression errors are
+    accumulated per batch; predictions are never collected. Random forests and decision trees
+    need all rows at once and are not trained in this mode.
+    """
+
+    def __init__(self, data_path, results_path, target_column=None, test_size=0.2, random_state=42,
+                 max_classes=50, metrics_store=None, batch_size=100_000, epochs=3, max_categories=100,
+                 xgboost_rounds=100):
+        super().__init__(data_path, results_path, target_column, test_size, random_state,
+                         n_jobs=1, max_classes=max_classes, metrics_store=metrics_store)
+        self.batch_size = batch_size
+        self.epochs = epochs
+        self.max_categories = max_categories
+        self.xgboost_rounds = xgboost_rounds
+        self.features = None
+        self.task_type = None
+        self.class_values = None
+        self.class_names = None
+        self._y_mean = 0.0
+        self._y_scale = 1.0
+
+    def _holdout(self, frame):
+        """Deterministic test-row mask from a hash of each row's values"""
+        hashes = pd.util.hash_pandas_object(frame, index=False, hash_key=f"{self.random_state:016d}"[-16:])
+        return (hashes.to_numpy() % 10000) < self.test_size * 10000
+
+    def _encode_target(self, y):
+        if self.task_type == 'regression':
+            return (y.astype('float64').to_numpy() - self._y_mean) / self._y_scale
+        if self.class_values is not None:
+            return np.searchsorted(self.class_values, y.astype('float64').to_numpy())
+        return pd.Categorical(y.astype(str), categories=self.class_names).codes.astype('int64')
+
+    def _batches(self, test):
+        """(features, encoded target) for the train or test rows of each batch"""
+        for frame in iter_frames(self.data_path, self.batch_size):
+            frame = frame[frame[self.target_column].notna()]
+            frame = frame[self._holdout(frame) == test]
+            if len(frame):
+                X = self.features.transform(self.features.prepare(frame))
+                yield X, self._encode_target(frame[self.target_column])
+
+    def _scan(self):
+        """First pass: target, task type, classes, and the feature scaler/vocabularies"""
+        classes = set()
+        y_count = y_sum = y_squares = 0.0
+        for frame in iter_frames(self.data_path, self.batch_size):
+            if self.features is None:
+                self.target_column = self.target_column or frame.columns[-1]
+                features = frame.drop(columns=[self.target_column])
+                _, numeric_columns, categorical_columns = split_features(features.head(0))
+                if not numeric_columns and not categorical_columns:
+                    raise ValueError("No feature columns to preprocess")
+                self.features = _StreamingFeatures(numeric_columns, categorical_columns, self.max_categories)
+                y = frame[self.target_column]
+                self.task_type = ('regression' if pd.api.types.is_float_dtype(y) else
+                                  'classification' if not pd.api.types.is_integer_dtype(y) else None)
+                self.class_values = [] if pd.api.types.is_integer_dtype(y) else None
+            frame = frame[frame[self.target_column].notna()]
+            train = frame[~self._holdout(frame)]
+            if len(train):
+                self.features.partial_fit(self.features.prepare(train))
+            y = frame[self.target_column]
+            if self.task_type != 'regression':
+                classes.update(y.astype('float64').unique() if self.class_values is not None
+                               else y.astype(str).unique())
+                # Integer targets are classes only while there are few distinct values
+                if self.task_type is None and len(classes) > 20:
+                    self.task_type = 'regression'
+                elif len(classes) > max(self.max_classes, 20):
+                    raise ValueError(f"{len(classes)} classes is too many for the built-in engine")
+            if self.task_type == 'regression' or self.task_type is None:
+                values = train[self.target_column].astype('float64').to_numpy()
+                y_count += len(values)
+                y_sum += values.sum()
+                y_squares += np.square(values).sum()
+
+        if self.features is None:
+            raise ValueError(f"{self.data_path} has no rows")
+        self.features.finalize()
+        self.task_type = self.task_type or 'classification'
+        if self.task_type == 'classification':
+            if self.class_values is not None:
+                self.class_values = np.array(sorted(classes))
+                self.class_names = [str(int(v)) if float(v).is_integer() else str(v) for v in self.class_values]
+            else:
+                self.class_names = sorted(classes)
+            if len(self.class_names) > self.max_classes:
+                raise ValueError(f"{len(self.class_names)} classes is too many for the built-in engine")
+        else:
+            self.class_values = None
+            if y_count:
+                self._y_mean = y_sum / y_count
+                self._y_scale = float(np.sqrt(max(y_squares / y_count - self._y_mean ** 2, 0.0))) or 1.0
+
+    def _sgd_models(self):
+        if self.task_type == 'classification':
+            return {'Logistic Regression (SGD)': SGDClassifier(loss='log_loss', random_state=self.random_state)}
+        return {'Linear Regression (SGD)': SGDRegressor(random_state=self.random_state)}
+
+    def _train_sgd(self, models):
+        classes = np.arange(len(self.class_names)) if self.task_type == 'classification' else None
+        for epoch in range(self.epochs):
+            for X, y in self._batches(test=False):
+                for model in models.values():
+                    if classes is not None:
+                        model.partial_fit(X, y, classes=classes)
+                    else:
+                        model.partial_fit(X, y)
+        return {name: model.predict for name, model in models.items()}
+
+    def _train_xgboost(self, cache_dir):
+        """XGBoost from an external-memory DMatrix; pages are cached on disk under cache_dir"""
+        automl = self
+
+        class BatchIterator(xgboost.DataIter):
+            def __init__(self):
+                self._batches = None
+                super().__init__(cache_prefix=os.path.join(cache_dir, 'xgboost'))
+
+            def next(self, input_data):
+                if self._batches is None:
+                    self._batches = automl._batches(test=False)
+                batch = next(self._batches, None)
+                if batch is None:
+                    return 0
+                input_data(data=batch[0], label=batch[1])
+                return 1
+
+            def reset(self):
+                self._batches = None
+
+        params = {'tree_method': 'hist', 'seed': self.random_state, 'nthread': 1}
+        if self.task_type == 'classification':
+            params.update({'objective': 'multi:softmax', 'num_class': len(self.class_names)}
+                          if len(self.class_names) > 2 else {'objective': 'binary:logistic'})
+        else:
+            params['objective'] = 'reg:squarederror'
+        booster = xgboost.train(params, xgboost.DMatrix(BatchIterator()), num_boost_round=self.xgboost_rounds)
+
+        def predict(X):
+            predictions = booster.inplace_predict(X)
+            if self.task_type == 'classification' and len(self.class_names) <= 2:
+                return (predictions > 0.5).astype('int64')
+            return predictions
+        return predict
+
+    def _evaluate(self, predictors):
+        """Metrics rows from counts accumulated over the holdout batches"""
+        n_classes = len(self.class_names) if self.task_type == 'classification' else 0
+        totals = {name: np.zeros((n_classes, n_classes), dtype='int64') if n_classes else np.zeros(4)
+                  for name in predictors}
+        for X, y in self._batches(test=True):
+            for name, predict in predictors.items():
+                predictions = predict(X)
+                if n_classes:
+                    cells = y * n_classes + np.clip(np.asarray(predictions, dtype='int64'), 0, n_classes - 1)
+                    totals[name] += np.bincount(cells, minlength=n_classes ** 2).reshape(n_classes, n_classes)
+                else:
+                    actual = y * self._y_scale + self._y_mean
+                    predicted = np.asarray(predictions, dtype='float64') * self._y_scale + self._y_mean
+                    totals[name] += [len(actual), np.square(actual - predicted).sum(), actual.sum(),
+                                     np.square(actual).sum()]
+
+        rows = []
+        for name, total in totals.items():
+            if n_classes:
+                rows.extend([
+                    (name, 'confusion_matrix', json.dumps(total.tolist()), datetime.now().isoformat()),
+                    (name, 'classification_report', json.dumps(report_from_confusion(total, self.class_names)),
+                     datetime.now().isoformat())
+                ])
+                continue
+            count, squared_error, y_sum, y_squares = total
+            if not count:
+                raise ValueError("The holdout split has no rows")
+            total_variance = y_squares - y_sum ** 2 / count
+            r_squared = 1 - squared_error / total_variance if total_variance > 0 else 0.0
+            rows.extend([
+                (name, 'rmse', json.dumps(float(np.sqrt(squared_error / count))), datetime.now().isoformat()),
+                (name, 'r_squared', json.dumps(float(r_squared)), datetime.now().isoformat())
+            ])
+        return rows
+
+    def run(self):
+        self._scan()
+        print(f"Target '{self.target_column}' -> {self.task_type} (streaming, "
+              f"{self.features.n_features} features, batches of {self.batch_size})")
+        models = self._sgd_models()
+        print(f"Training {', '.join(models)}{' and XGBoost (external memory)' if xgboost is not None else ''}")
+        predictors = self._train_sgd(models)
+        with tempfile.TemporaryDirectory(prefix='xgboost-pages-') as cache_dir:
+            if xgboost is not None:
+                name = 'XGBoost Classifier' if self.task_type == 'classification' else 'XGBoost Regressor'
+                predictors[name] = self._train_xgboost(cache_dir)
+            rows = self._evaluate(predictors)
+        return self._store_rows(rows, len(predictors))
+
 
 class MLTaskAutomation:
-    def __init__(self):
+    def __init__(self, data_path=None, results_path=None, metrics_store=None):
         self.hf_token = ""
         self.model_name = "Qwen/Qwen2.5-Coder-32B-Instruct"
-        self.task = """
-        1. Load data from 'C:/Users/suman/OneDrive/Desktop/AI Agents/temp.csv'
+        self.data_path = data_path or f"{DEFAULT_OUTPUT_DIR}/temp.parquet"
+        self.results_path = results_path or f"{DEFAULT_OUTPUT_DIR}/confusion.csv"
+        self.task = f"""
+        1. Load data from '{self.data_path}' using pandas.read_parquet()
+           (dtypes are preserved: Int64 for nullable integers, category for categorical columns)
 
         2. Perform automated supervised ML modeling:
             a. Check if target column is categorical:
@@ -26,7 +471,7 @@ class MLTaskAutomation:
             a. Calculate RMSE, R-squared
             
         4. Store all evaluation metrics and confusion matrices in 
-            'C:/Users/suman/OneDrive/Desktop/AI Agents/confusion.csv' with columns:
+            '{self.results_path}' with columns:
             - Model Name
             - Metric Type
             - Metric Values (JSON format)
@@ -41,30 +486,99 @@ class MLTaskAutomation:
         6. Print status messages for each step (success or failure)
         """
         self.authorized_imports = [
-            'pandas', 'openpyxl', 'sklearn.model_selection',
+            'pandas', 'pyarrow', 'openpyxl', 'sklearn.model_selection',
             'sklearn.preprocessing', 'sklearn.compose', 'sklearn.impute',
             'sklearn.linear_model', 'sklearn.ensemble', 'sklearn.tree',
             'sklearn.metrics', 'xgboost', 'joblib', 'datetime',
             'json', 'warnings', 'numpy','sklearn.pipeline'
         ]
-        self.initialize_environment()
+        # The built-in engine handles ordinary tabular data; the agent is the fallback
+        self.use_native_engine = True
+        self.native_engine = SupervisedAutoML(self.data_path, self.results_path, metrics_store=metrics_store)
+        # None picks streaming (out-of-core) training when the data would not fit comfortably in memory
+        self.streaming = None
+        self.streaming_threshold_bytes = default_streaming_threshold()
+        # Sampling overrides (temperature, seed) for speculative attempts; None keeps the endpoint defaults
+        self.sampling = None
+        # Engine and agent are built on first use, not at construction
+        self._code_agent = None
 
     def initialize_environment(self):
-        login(token=self.hf_token)
-        self.llm_engine = HfApiEngine(
-            model=self.model_name,
-            token=self.hf_token
+        self.llm_engine = get_registry().get_agent_engine(
+            self.model_name, self.hf_token, self.authorized_imports, sampling=self.sampling
         )
-        self.code_agent = ReactCodeAgent(
+        self._code_agent = ReactCodeAgent(
             llm_engine=self.llm_engine,
             tools=[],
             add_base_tools=True,
             max_iterations=50,
             additional_authorized_imports=self.authorized_imports
         )
+        self.llm_engine.tool_names = sorted(self._code_agent.toolbox.tools)
+        # Per-agent prompt shaping and token metering; the report shows prompt size per iteration
+        self.context_budget = ContextBudget()
+        self.context_budget.attach(self._code_agent)
+        sandbox = get_sandbox_pool()
+        sandbox.attach(self._code_agent, self.authorized_imports)
+        sandbox.prefetch(self.data_path)
+        get_tracer().instrument_agent(self._code_agent)
+
+    @property
+    def code_agent(self):
+        if self._code_agent is None:
+            self.initialize_environment()
+        return self._code_agent
+
+    def _use_streaming(self):
+        if self.streaming is not None:
+            return self.streaming
+        return estimate_memory_bytes(self.data_path) > self.streaming_threshold_bytes
+
+    def _run_native(self):
+        engine = self.native_engine
+        if self._use_streaming():
+            engine = StreamingAutoML(engine.data_path, engine.results_path, engine.target_column,
+                                     engine.test_size, engine.random_state, engine.max_classes,
+                                     engine.metrics_store)
+            engine.run_id = self.native_engine.run_id
+            engine.dataset = self.native_engine.dataset
+        with get_tracer().span('native_automl', 'compute', streaming=isinstance(engine, StreamingAutoML)):
+            return engine.run()
+
+    def fast_path(self):
+        """Output from the built-in engine, or None when the agent is needed"""
+        if not self.use_native_engine:
+            return None
+        try:
+            return self._run_native()
+        except Exception as e:
+            print(f"Built-in AutoML could not handle this dataset ({str(e)}); using the LLM agent")
+            return None
+
+    def execute_task(self, resume=False):
+        # A retry after the agent already ran continues the agent; the native engine already failed
+        if self.use_native_engine and not (resume and self._code_agent is not None):
+            try:
+                return self._run_native()
+            except Exception as e:
+                print(f"Built-in AutoML could not handle this dataset ({str(e)}); using the LLM agent")
+
+        generated_code = run_agent(self.code_agent, self.task, resume)
+        print("Generated Code:\n", generated_code)
+        return generated_code
+
+    async def execute_task_async(self, executor=None, resume=False):
+        """execute_task that awaits the LLM instead of holding a thread while it generates"""
+        if self.use_native_engine and not (resume and self._code_agent is not None):
+            try:
+                return await run_in_executor(self._run_native, executor=executor)
+            except Exception as e:
+                print(f"Built-in AutoML could not handle this dataset ({str(e)}); using the LLM agent")
 
-    def execute_task(self):
-        generated_code = self.code_agent.run(self.task)
+        async_engine = get_registry().get_async_engine(self.model_name, self.hf_token)
+        reset = not (resume and prepare_resume(self.code_agent))
+        generated_code = await run_agent_async(self.code_agent, self.task, async_engine, reset=reset,
+                                               executor=executor)
         print("Generated Code:\n", generated_code)
         return generated_code
 
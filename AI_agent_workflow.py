@@ -1,278 +1,627 @@
 import os
+import threading
 import time
+import uuid
 from datetime import datetime
-import pandas as pd
 import json
-from dash import Dash, dcc, html, Input, Output
-import plotly.express as px
-from AI_Agent import ExcelDataProcessor
-from AI_agent_ml import MLTaskAutomation
+from AI_Agent_Scheduler import Phase, PhaseScheduler
+from AI_Agent_Artifacts import ArtifactWatcher
+from AI_Agent_Manifest import BuildManifest
+from AI_Agent_Storage import DEFAULT_OUTPUT_DIR, import_to_columnar, is_columnar, read_frame, read_schema
+from AI_Agent_Tracing import get_tracer
+from AI_Agent_Cache import get_default_cache
+from AI_Agent_Registry import get_registry
+from AI_Agent_History import RunHistoryStore
+from AI_Agent_ModelMetrics import RESULT_COLUMNS, ModelMetricsStore
+from AI_Agent_Dashboard import get_dashboard_server
+from AI_Agent_Retry import FAILURE_CLASSES, RetryPolicy
+from AI_Agent_Sandbox import get_sandbox_pool
+from AI_Agent_Speculative import SpeculativeRunner
+
+# Coordinator component that runs each phase
+PHASE_COMPONENTS = {
+    'cleaning': 'data_processor',
+    'ml': 'ml_automation',
+    'unsupervised': 'unsupervised_automation',
+    'visualization': 'metrics_visualizer'
+}
+
+PHASE_REPORT_NAMES = {
+    'cleaning': 'data_cleaning',
+    'ml': 'ml_modeling',
+    'unsupervised': 'unsupervised_modeling',
+    'visualization': 'visualization'
+}
 
 class MLWorkflowCoordinator:
-    def __init__(self):
+    def __init__(self, output_dir=DEFAULT_OUTPUT_DIR, source_path=None, history_path=None,
+                 serve_dashboard=True):
         self.metrics = {
             'total_start_time': None,
             'total_duration': None,
-            'cleaning': {
-                'attempts': 0,
-                'failures': 0,
-                'success': False,
-                'durations': [],
-                'file_check_attempts': 0,
-                'duration': None
-            },
-            'ml': {
-                'attempts': 0,
-                'failures': 0,
-                'success': False,
-                'durations': [],
-                'file_check_attempts': 0,
-                'duration': None
-            },
+            'cleaning': self._new_phase_metrics(),
+            'ml': self._new_phase_metrics(),
+            'unsupervised': self._new_phase_metrics(),
+            'visualization': self._new_phase_metrics(),
+            'schedule': {},
             'visualizations': []  
         }
         self.hf_token = ""
-        self.clean_data_path = "C:/Users/suman/OneDrive/Desktop/AI Agents/temp.csv"
-        self.results_path = "C:/Users/suman/OneDrive/Desktop/AI Agents/confusion.csv"
-        self.workflow_file = "C:/Users/suman/OneDrive/Desktop/AI Agents/workflow_metrics.json"
+        # Every artifact of a run lives in output_dir, so several datasets can be processed side by side
+        self.output_dir = output_dir
+        os.makedirs(self.output_dir, exist_ok=True)
+        # Excel/CSV input is only imported once; phases exchange typed Parquet files
+        if source_path is None:
+            self.legacy_source_path = f"{output_dir}/synthetic_data.xlsx"
+            self.source_data_path = f"{output_dir}/synthetic_data.parquet"
+        elif is_columnar(source_path):
+            self.legacy_source_path = None
+            self.source_data_path = source_path
+        else:
+            self.legacy_source_path = source_path
+            stem = os.path.splitext(os.path.basename(source_path))[0]
+            self.source_data_path = f"{output_dir}/{stem}.parquet"
+        self.clean_data_path = f"{output_dir}/temp.parquet"
+        self.results_path = f"{output_dir}/confusion.csv"
+        self.unsupervised_results_path = f"{output_dir}/unsupervised_results.csv"
+        self.workflow_file = f"{output_dir}/workflow_metrics.json"
         
         # Retry configuration
         self.max_cleaning_attempts = 3
         self.max_ml_attempts = 3
-        self.file_check_retries = 5
-        self.file_check_delay = 2
-        self.step_retry_delay = 10
+        self.max_unsupervised_attempts = 3
+        self.max_visualization_attempts = 2
+        self.artifact_timeout = 10
+        # Backoff with jitter for transient failures, fail fast on deterministic ones;
+        # retries resume the agent from its last successful ReAct step
+        self.retry_policy = RetryPolicy()
+        self.resume_on_retry = True
+        self.artifact_watcher = ArtifactWatcher()
+        # Speculative mode: when the fast path (script replay, built-in AutoML) can't produce a
+        # phase's output, race this many differently sampled agents and keep the first valid output
+        self.speculative_attempts = 1
+        self.speculative_phases = ('cleaning', 'ml')
+        self.speculative_token_budget = 300000
+        self.speculative_max_seconds = None
+
+        # Nested spans for phases, ReAct iterations, LLM calls and code execution
+        # The tracer is shared by concurrent coordinators; each run reports only its own span tree
+        self.tracer = get_tracer()
+        self._run_span = None
+        self.trace_file = os.path.join(os.path.dirname(self.workflow_file), "workflow_trace.json")
+        self.chrome_trace_file = os.path.join(os.path.dirname(self.workflow_file), "workflow_trace.chrome.json")
+
+        # Skip phases whose inputs, prompt, imports and model are unchanged since the last success
+        self.incremental = True
+        self.manifest = BuildManifest(
+            os.path.join(os.path.dirname(self.workflow_file), "workflow_manifest.json")
+        )
+
+        # workflow_metrics.json holds the latest run; every run is also appended here for trend queries
+        self.run_id = None
+        self.last_report = None
+        self.history = RunHistoryStore(
+            history_path or os.path.join(os.path.dirname(self.workflow_file), "workflow_history.sqlite")
+        )
+
+        # Normalized per-model metrics of every run, next to the history; confusion.csv is exported from it
+        self.model_metrics = ModelMetricsStore(os.path.join(os.path.dirname(self.history.path), "model_metrics.sqlite"))
+        self.dataset_name = os.path.splitext(os.path.basename(self.source_data_path.rstrip('/\\')))[0]
+
+        # The dashboard is a separate process started once; it polls the history store and live status
+        self.serve_dashboard = serve_dashboard
+        self.live_status_file = os.path.join(os.path.dirname(self.workflow_file), "workflow_live.json")
+        self._live_status_lock = threading.Lock()
+        self.dashboard = get_dashboard_server(self.history.path, self.live_status_file)
+
+        # Independent phases (e.g. supervised and unsupervised modeling) run concurrently
+        self.max_parallel_phases = 2
+        # CPU workers this run may use for model training; None lets each engine size itself
+        self.compute_workers = None
         
-        # Initialize components
-        self.data_processor = ExcelDataProcessor()
-        self.ml_automation = MLTaskAutomation()
+        # Components are created on first use so skipped or cached phases cost nothing
+        self._components = {}
+        self._components_lock = threading.Lock()
+
+    def _component(self, name, factory):
+        with self._components_lock:
+            if name not in self._components:
+                self._components[name] = factory()
+            return self._components[name]
+
+    # Agent components (and transformers) are imported on first use: processes spawned by the
+    # unsupervised sweep re-run this module's top-level imports and must stay light
+
+    @property
+    def data_processor(self):
+        from AI_Agent import ExcelDataProcessor
+        return self._component('data_processor', lambda: ExcelDataProcessor(
+            self.source_data_path, self.clean_data_path))
+
+    def _phase_compute_workers(self):
+        """Share compute_workers between the modeling phases that may run at the same time"""
+        if self.compute_workers is None:
+            return None
+        return max(1, self.compute_workers // max(1, self.max_parallel_phases))
+
+    @property
+    def ml_automation(self):
+        from AI_agent_ml import MLTaskAutomation
+
+        def create():
+            automation = MLTaskAutomation(self.clean_data_path, self.results_path, self.model_metrics)
+            workers = self._phase_compute_workers()
+            if workers is not None:
+                automation.native_engine.n_jobs = workers
+            return automation
+        return self._component('ml_automation', create)
+
+    @property
+    def unsupervised_automation(self):
+        from AI_Agent_ml_unsupervised import UnsupervisedMLAutomation
+
+        def create():
+            automation = UnsupervisedMLAutomation(self.clean_data_path, self.unsupervised_results_path)
+            workers = self._phase_compute_workers()
+            if workers is not None:
+                automation.native_engine.max_workers = workers
+            return automation
+        return self._component('unsupervised_automation', create)
+
+    @property
+    def metrics_visualizer(self):
+        from AI_Agent_Metrics import MetricsVisualizer
+        return self._component('metrics_visualizer', lambda: MetricsVisualizer(
+            self.workflow_file, self.results_path, self.output_dir, workflow_charts=False))
+
+    def _new_phase_metrics(self):
+        return {
+            'attempts': 0,
+            'failures': 0,
+            'success': False,
+            'cached': False,
+            'status': 'pending',
+            'durations': [],
+            'attempt_log': [],
+            'model_name': None,
+            'started_monotonic': None,
+            'retry_outcomes': {
+                failure_class: {'failures': 0, 'retried': 0, 'gave_up': 0, 'backoff_seconds': 0.0}
+                for failure_class in FAILURE_CLASSES
+            },
+            'speculation': [],
+            'file_check_attempts': 0,
+            'artifact_wait_seconds': 0.0,
+            'duration': None,
+            'start_offset': None,
+            'end_offset': None
+        }
+
+    def _build_phase_graph(self):
+        """Declare every phase with the artifacts it consumes and produces"""
+        return [
+            Phase('cleaning', self._run_cleaning_phase,
+                  inputs=[self.source_data_path], outputs=[self.clean_data_path]),
+            Phase('ml', self._run_ml_phase,
+                  inputs=[self.clean_data_path], outputs=[self.results_path]),
+            Phase('unsupervised', self._run_unsupervised_phase,
+                  inputs=[self.clean_data_path], outputs=[self.unsupervised_results_path]),
+            Phase('visualization', self._run_visualization_phase,
+                  inputs=[self.results_path], outputs=[self.metrics_visualizer.renderer.index_path])
+        ]
 
     def run_full_workflow(self):
         self.metrics['total_start_time'] = datetime.now()
-        try:
-            if not self._run_cleaning_phase():
-                return False
-            if not self._run_ml_phase():
+        self.run_id = uuid.uuid4().hex
+        self._write_live_status()
+        if self.serve_dashboard:
+            self._start_dashboard()
+        with self.tracer.span('workflow', 'run', run_id=self.run_id, output_dir=self.output_dir) as run_span:
+            self._run_span = run_span
+            try:
+                return self._run_scheduled_phases()
+            except Exception as e:
+                print(f"\nCritical workflow failure: {str(e)}")
                 return False
-            
-            print("\nWorkflow completed successfully!")
-            return True
-            
-        except Exception as e:
-            print(f"\nCritical workflow failure: {str(e)}")
+            finally:
+                self.metrics['total_duration'] = datetime.now() - self.metrics['total_start_time']
+                self._save_metrics_report()
+                self._write_live_status(final=True)
+                self.tracer.discard(run_span)
+
+    def _run_scheduled_phases(self):
+        if self.legacy_source_path:
+            import_to_columnar(self.legacy_source_path, self.source_data_path)
+        scheduler = PhaseScheduler(self._build_phase_graph(), max_workers=self.max_parallel_phases)
+        results = scheduler.run()
+        for phase_key, result in results.items():
+            phase_metrics = self.metrics[phase_key]
+            phase_metrics['status'] = result['status']
+            phase_metrics['start_offset'] = result['start_offset']
+            phase_metrics['end_offset'] = result['end_offset']
+        self._write_live_status()
+        self.metrics['schedule'] = scheduler.summary()
+
+        if not all(result['status'] == 'success' for result in results.values()):
             return False
-        finally:
-            self.metrics['total_duration'] = datetime.now() - self.metrics['total_start_time']
-            self._save_metrics_report()
-            self._generate_dashboard()
+
+        print("\nWorkflow completed successfully!")
+        return True
 
     def _run_cleaning_phase(self):
-        phase_metrics = self.metrics['cleaning']
-        start_time = datetime.now()
-        
-        for attempt in range(1, self.max_cleaning_attempts + 1):
-            print(f"\nAttempt {attempt}/{self.max_cleaning_attempts}")
-            phase_metrics['attempts'] += 1
-            try:
-                self.data_processor.execute_processing()
-                if self._check_file_exists(self.clean_data_path):
-                    print("Data cleaning successful")
-                    phase_metrics['success'] = True
-                    phase_metrics['durations'].append(datetime.now() - start_time)
-                    phase_metrics['duration'] = datetime.now() - start_time
-                    return True
-                
-                print(f"Cleaning attempt {attempt} failed")
-                phase_metrics['failures'] += 1
-                if attempt < self.max_cleaning_attempts:
-                    self._countdown(self.step_retry_delay)
-                    
-            except Exception as e:
-                print(f"Error during cleaning attempt {attempt}: {str(e)}")
-                phase_metrics['failures'] += 1
-        
-        phase_metrics['duration'] = datetime.now() - start_time
-        return False
+        action = self.data_processor.execute_processing
+        if self._is_speculative('cleaning'):
+            action = self._speculative_action('cleaning', self.data_processor, self._cleaning_variant,
+                                              lambda variant: variant.execute_processing(), self.clean_data_path)
+        return self._run_phase('cleaning', 'Data cleaning', self.data_processor, action,
+                               [self.source_data_path], self.clean_data_path,
+                               self.max_cleaning_attempts)
 
     def _run_ml_phase(self):
-        phase_metrics = self.metrics['ml']
+        self.ml_automation.native_engine.run_id = self.run_id
+        self.ml_automation.native_engine.dataset = self.dataset_name
+        action = self.ml_automation.execute_task
+        if self._is_speculative('ml'):
+            action = self._speculative_action('ml', self.ml_automation, self._ml_variant,
+                                              lambda variant: variant.execute_task(), self.results_path,
+                                              required_columns=RESULT_COLUMNS)
+        succeeded = self._run_phase('ml', 'ML modeling', self.ml_automation, action,
+                                    [self.clean_data_path], self.results_path, self.max_ml_attempts)
+        if succeeded:
+            self._record_model_metrics()
+        return succeeded
+
+    def _is_speculative(self, phase_key):
+        return self.speculative_attempts > 1 and phase_key in self.speculative_phases
+
+    def _cleaning_variant(self, index, sampling, path):
+        from AI_Agent import ExcelDataProcessor
+        variant = ExcelDataProcessor(self.source_data_path, path)
+        variant.replay_enabled = False
+        variant.sampling = sampling
+        return variant
+
+    def _ml_variant(self, index, sampling, path):
+        from AI_agent_ml import MLTaskAutomation
+        variant = MLTaskAutomation(self.clean_data_path, path)
+        variant.use_native_engine = False
+        variant.sampling = sampling
+        return variant
+
+    def _artifact_is_valid(self, path, required_columns=None):
+        """A speculative output counts only if it is readable and has the expected columns"""
+        if not os.path.exists(path) or (os.path.isfile(path) and os.path.getsize(path) == 0):
+            return False
+        try:
+            if is_columnar(path):
+                columns = [name for name, _ in read_schema(path)]
+            else:
+                columns = list(read_frame(path).columns)
+        except Exception as e:
+            print(f"Speculative output {os.path.basename(path)} is unreadable: {str(e)}")
+            return False
+        return bool(columns) and all(column in columns for column in (required_columns or []))
+
+    def _speculative_action(self, phase_key, component, make_variant, run_variant, output_path,
+                            required_columns=None):
+        def action(resume=False):
+            # The fast path is deterministic: after it failed once, retries go straight to the race
+            if not resume and component.fast_path() is not None:
+                return
+            # Fresh seeds (and so cache namespaces) per attempt, so a retry never replays the losing race
+            attempt = self.metrics[phase_key]['attempts'] - 1
+            runner = SpeculativeRunner(self.speculative_attempts, base_seed=attempt * self.speculative_attempts,
+                                       max_tokens=self.speculative_token_budget,
+                                       max_seconds=self.speculative_max_seconds)
+            won = runner.run(make_variant, run_variant, output_path,
+                             lambda path: self._artifact_is_valid(path, required_columns))
+            self.metrics[phase_key]['speculation'].append(runner.report())
+            if not won:
+                raise RuntimeError(f"None of {self.speculative_attempts} speculative attempts produced "
+                                   f"a valid {os.path.basename(output_path)}")
+        return action
+
+    def _record_model_metrics(self):
+        """Agent-written (or reused) confusion.csv files are ingested into the metrics store too"""
+        if self.model_metrics.has_run(self.run_id):
+            return
+        try:
+            self.model_metrics.import_results_file(self.run_id, self.results_path, self.dataset_name)
+        except Exception as e:
+            print(f"Could not store model metrics from {os.path.basename(self.results_path)}: {str(e)}")
+
+    def _run_unsupervised_phase(self):
+        return self._run_phase('unsupervised', 'Unsupervised modeling', self.unsupervised_automation,
+                               self.unsupervised_automation.execute_task,
+                               [self.clean_data_path], self.unsupervised_results_path,
+                               self.max_unsupervised_attempts)
+
+    def _run_visualization_phase(self):
+        # The metric chart PNGs are the outputs checked for reuse: the chart index also holds the
+        # workflow charts, which are redrawn at the end of every run
+        succeeded = self._run_phase('visualization', 'Visualization', self.metrics_visualizer,
+                                    self.metrics_visualizer.execute_visualization,
+                                    [self.results_path], None,
+                                    self.max_visualization_attempts,
+                                    extra_outputs=self.metrics_visualizer.metric_chart_paths())
+        # Charts drawn by the built-in renderer; the agent's files are not tracked
+        self.metrics['visualizations'].extend(self.metrics_visualizer.charts)
+        return succeeded
+
+    def _run_phase(self, phase_key, label, agent, action, inputs, output_path, max_attempts, extra_outputs=()):
+        # Phases run on scheduler threads, so the run span is passed explicitly as parent
+        with self.tracer.span(phase_key, 'phase', parent=self._run_span, label=label):
+            succeeded = self._run_phase_attempts(phase_key, label, agent, action, inputs,
+                                                 output_path, max_attempts, extra_outputs)
+        self.metrics[phase_key]['status'] = 'success' if succeeded else 'failed'
+        self._write_live_status()
+        return succeeded
+
+    def _run_phase_attempts(self, phase_key, label, agent, action, inputs, output_path, max_attempts,
+                            extra_outputs=()):
+        phase_metrics = self.metrics[phase_key]
+        phase_metrics['model_name'] = getattr(agent, 'model_name', None)
+        phase_metrics['status'] = 'running'
+        phase_metrics['started_monotonic'] = time.monotonic()
+        self._write_live_status()
         start_time = datetime.now()
+        # Outputs the manifest checks before reusing the phase; only output_path is waited for
+        outputs = ([output_path] if output_path else []) + list(extra_outputs)
+
+        fingerprint = self.manifest.fingerprint(inputs, agent)
+        if self.incremental and self.manifest.is_up_to_date(phase_key, fingerprint, outputs):
+            print(f"\n{label} inputs and prompt unchanged; reusing previous outputs")
+            phase_metrics['success'] = True
+            phase_metrics['cached'] = True
+            phase_metrics['duration'] = datetime.now() - start_time
+            return True
         
-        for attempt in range(1, self.max_ml_attempts + 1):
-            print(f"\nAttempt {attempt}/{self.max_ml_attempts}")
+        for attempt in range(1, max_attempts + 1):
+            print(f"\n[{label}] Attempt {attempt}/{max_attempts}")
             phase_metrics['attempts'] += 1
+            self._write_live_status()
+            baseline = self.artifact_watcher.snapshot(output_path) if output_path else None
+            attempt_log = {'attempt': attempt, 'seconds': None, 'succeeded': False, 'error': None,
+                           'failure_class': None, 'resumed': attempt > 1 and self.resume_on_retry}
+            phase_metrics['attempt_log'].append(attempt_log)
+            attempt_start = time.monotonic()
+            error = None
+            ready = False
             try:
-                self.ml_automation.execute_task()
-                if self._check_file_exists(self.results_path):
-                    print("ML modeling successful")
-                    phase_metrics['success'] = True
-                    phase_metrics['durations'].append(datetime.now() - start_time)
-                    phase_metrics['duration'] = datetime.now() - start_time
-                    return True
-                
-                print(f"ML attempt {attempt} failed")
-                phase_metrics['failures'] += 1
-                if attempt < self.max_ml_attempts:
-                    self._countdown(self.step_retry_delay)
-                    
+                with self.tracer.span(f"attempt {attempt}", 'attempt'):
+                    try:
+                        action(resume=attempt_log['resumed'])
+                        ready = output_path is None or self._wait_for_artifact(output_path, phase_key, baseline)
+                    finally:
+                        attempt_log['seconds'] = round(time.monotonic() - attempt_start, 3)
             except Exception as e:
-                print(f"Error during ML attempt {attempt}: {str(e)}")
-                phase_metrics['failures'] += 1
-                
-        print(f"\nFailed all {self.max_ml_attempts} ML attempts")
-        phase_metrics['duration'] = datetime.now() - start_time
-        return False
+                error = e
+                print(f"Error during {label.lower()} attempt {attempt}: {str(e)}")
 
-    def _check_file_exists(self, path):
-        check_attempts = 0
-        for i in range(1, self.file_check_retries + 1):
-            check_attempts += 1
-            if os.path.exists(path):
+            attempt_log['succeeded'] = ready
+            engine = getattr(agent, 'llm_engine', None)
+            if ready:
+                if engine is not None:
+                    engine.commit()
+                    engine.read_cache = True
+                print(f"{label} successful")
+                self.manifest.record(phase_key, fingerprint, outputs)
+                phase_metrics['success'] = True
+                phase_metrics['durations'].append(datetime.now() - start_time)
+                phase_metrics['duration'] = datetime.now() - start_time
                 return True
-            print(f"Waiting for {os.path.basename(path)}... ({i}/{self.file_check_retries})")
-            time.sleep(self.file_check_delay)
-        
-        if path == self.clean_data_path:
-            self.metrics['cleaning']['file_check_attempts'] += check_attempts
-        else:
-            self.metrics['ml']['file_check_attempts'] += check_attempts
-        return False
 
-    def _countdown(self, seconds):
-        start = time.time()
-        for remaining in range(seconds, 0, -1):
-            print(f"Retrying in {remaining}...", end="\r")
-            time.sleep(1)
-        print(" " * 30, end="\r")
-        return time.time() - start
+            phase_metrics['failures'] += 1
+            if engine is not None:
+                # Retries must not replay the failed trajectory from the response cache
+                engine.discard()
+                engine.read_cache = False
+            failure_class = self.retry_policy.classify(error, getattr(agent, '_code_agent', None))
+            attempt_log['failure_class'] = failure_class
+            attempt_log['error'] = f"{type(error).__name__}: {str(error)}" if error else 'output not produced'
+            outcome = phase_metrics['retry_outcomes'][failure_class]
+            outcome['failures'] += 1
+            print(f"{label} attempt {attempt} failed ({failure_class.replace('_', ' ')})")
 
-    def _generate_dashboard(self):
-        """Generate a Dash dashboard for workflow_metrics.json"""
-        print("\nGenerating dashboard for workflow_metrics.json...")
-        app = Dash(__name__)
+            if not self.retry_policy.should_retry(failure_class):
+                outcome['gave_up'] += 1
+                print(f"Not retrying {label.lower()}: the failure is deterministic")
+                break
+            if attempt == max_attempts:
+                outcome['gave_up'] += 1
+                break
+            delay = self.retry_policy.delay(failure_class, attempt, error)
+            print(f"Retrying {label.lower()} in {delay}s")
+            outcome['retried'] += 1
+            outcome['backoff_seconds'] = round(outcome['backoff_seconds'] + self.retry_policy.wait(delay), 3)
 
-        try:
-            # Load the JSON file
-            with open(self.workflow_file, 'r') as f:
-                workflow_data = json.load(f)
+        print(f"\n{label} failed after {phase_metrics['attempts']} attempt(s)")
+        phase_metrics['duration'] = datetime.now() - start_time
+        return False
 
-            phases = workflow_data.get('phases', {})
-            if not phases:
-                print("Warning: No 'phases' data found in workflow_metrics.json")
-                return
+    def _wait_for_artifact(self, path, phase_key, baseline):
+        """Continue as soon as this attempt's output lands; stale files from earlier runs don't count"""
+        phase_metrics = self.metrics[phase_key]
+        start = time.monotonic()
+        ready = self.artifact_watcher.wait_for(path, baseline=baseline, timeout=self.artifact_timeout)
+        phase_metrics['artifact_wait_seconds'] += round(time.monotonic() - start, 3)
+        if ready:
+            return True
 
-            phases_df = pd.DataFrame(phases).T
-            phases_df['duration_minutes'] = phases_df['total_duration'].apply(
-                lambda x: pd.to_timedelta(x).total_seconds() / 60 if x else 0
-            )
-
-            # Layout of the dashboard
-            app.layout = html.Div([
-                html.H1("ML Workflow Metrics Dashboard"),
-                
-                # Total Duration Bar Chart
-                dcc.Graph(
-                    id='duration-bar',
-                    figure=px.bar(
-                        phases_df,
-                        x=phases_df.index,
-                        y='duration_minutes',
-                        title='Phase Total Durations',
-                        labels={'duration_minutes': 'Duration (Minutes)', 'index': 'Phase'}
-                    )
-                ),
-                
-                # Status Pie Chart
-                dcc.Graph(
-                    id='status-pie',
-                    figure=px.pie(
-                        phases_df,
-                        names='status',
-                        title='Phase Status Distribution'
-                    )
-                ),
-                
-                # Attempts vs Failed Bar Chart
-                dcc.Graph(
-                    id='attempts-bar',
-                    figure=px.bar(
-                        phases_df,
-                        x=phases_df.index,
-                        y=['total_attempts', 'failed_attempts'],
-                        barmode='stack',  
-                        title='Total and Failed Attempts per Phase', 
-                        labels={'value': 'Number of Attempts', 'index': 'Phase', 'variable': 'Attempt Type'},  # Intuitive labels
-                        color_discrete_map={'total_attempts': '#2ecc71', 'failed_attempts': '#e74c3c'},  # Green for total, Red for failed
-                        text_auto=True  
-                    ).update_traces(
-                        textposition='inside',  
-                        textfont_size=14  
-                    ).update_layout(
-                        legend_title_text='Attempt Type', 
-                        bargap=0.2  
-                    )
-                ),
-                
-                # Metrics Table
-                html.H3("Detailed Metrics"),
-                html.Table([
-                    html.Tr([html.Th(col) for col in phases_df.columns])] + [
-                    html.Tr([html.Td(phases_df.iloc[i][col]) for col in phases_df.columns])
-                    for i in range(len(phases_df))
-                ])
-            ])
-
-            # Store dashboard indicator (URL will be printed when run)
-            self.metrics['visualizations'] = ["Dashboard running at http://127.0.0.1:8050/"]
-            print("Dashboard generated. Access it at http://127.0.0.1:8050/")
-
-            # Run the Dash app
-            app.run_server(debug=True, use_reloader=False)
+        phase_metrics['file_check_attempts'] += 1
+        if os.path.exists(path):
+            print(f"{os.path.basename(path)} was not rewritten by this attempt (stale or incomplete)")
+        else:
+            print(f"{os.path.basename(path)} was not produced within {self.artifact_timeout}s")
+        return False
 
+    def _start_dashboard(self):
+        """Serve the dashboard from a background process; it refreshes itself from the history store"""
+        try:
+            url = self.dashboard.start()
+            self.metrics['visualizations'] = [f"Dashboard running at {url}"]
+            print(f"Dashboard available at {url}")
         except Exception as e:
-            print(f"Failed to generate dashboard: {str(e)}")
+            print(f"Failed to start dashboard: {str(e)}")
             self.metrics['visualizations'] = []
 
+    def _write_live_status(self, final=False):
+        """Snapshot phase progress to workflow_live.json for the dashboard's in-progress view"""
+        now = time.monotonic()
+        phases = {}
+        for phase_key, report_name in PHASE_REPORT_NAMES.items():
+            phase_metrics = self.metrics[phase_key]
+            started = phase_metrics['started_monotonic']
+            if phase_metrics['duration'] is not None:
+                elapsed = phase_metrics['duration'].total_seconds()
+            elif started is not None:
+                elapsed = now - started
+            else:
+                elapsed = None
+            phases[report_name] = {
+                'status': 'cached' if phase_metrics['cached'] else phase_metrics['status'],
+                'attempts': phase_metrics['attempts'],
+                'failures': phase_metrics['failures'],
+                'elapsed_seconds': round(elapsed, 1) if elapsed is not None else None
+            }
+        status = {
+            'run_id': self.run_id,
+            'started_at': str(self.metrics['total_start_time']),
+            'updated_at': str(datetime.now()),
+            'finished': final,
+            'phases': phases
+        }
+        with self._live_status_lock:
+            tmp_path = f"{self.live_status_file}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(status, f, indent=2)
+                os.replace(tmp_path, self.live_status_file)
+            except OSError as e:
+                print(f"Could not write live status: {str(e)}")
+
+    def _print_history_trends(self):
+        latencies = self.history.phase_latency_percentiles()
+        if latencies:
+            print("\nPhase Latency Across Runs (successful runs):")
+            for phase_name, stats in latencies.items():
+                print(f"  {phase_name}: p50 {stats['p50']}s, p90 {stats['p90']}s over {stats['count']} runs")
+        for regression in self.history.detect_regressions():
+            models = ''
+            if regression['recent_models'] != regression['baseline_models']:
+                models = (f" (model {', '.join(regression['baseline_models']) or '?'} -> "
+                          f"{', '.join(regression['recent_models']) or '?'})")
+            print(f"  REGRESSION {regression['phase']}: {regression['baseline_median_seconds']}s -> "
+                  f"{regression['recent_median_seconds']}s ({regression['slowdown']}x){models}")
+
+    def _phase_report(self, phase_key):
+        phase_metrics = self.metrics[phase_key]
+        status = phase_metrics['status']
+        if phase_metrics['cached']:
+            status = 'cached'
+        elif status in ('pending', 'running'):
+            status = 'success' if phase_metrics['success'] else 'failed'
+        component = self._components.get(PHASE_COMPONENTS[phase_key])
+        context_budget = getattr(component, 'context_budget', None)
+        return {
+            'phase_key': phase_key,
+            'status': status,
+            'model_name': phase_metrics['model_name'],
+            'total_attempts': phase_metrics['attempts'],
+            'failed_attempts': phase_metrics['failures'],
+            'time_per_attempt': [str(d) for d in phase_metrics['durations']],
+            'attempts': phase_metrics['attempt_log'],
+            'retry_outcomes': {
+                failure_class: outcome for failure_class, outcome in phase_metrics['retry_outcomes'].items()
+                if outcome['failures']
+            },
+            'total_duration': str(phase_metrics['duration'] or "0:00:00"),
+            'file_check_attempts': phase_metrics['file_check_attempts'],
+            'artifact_wait_seconds': phase_metrics['artifact_wait_seconds'],
+            'start_offset_seconds': phase_metrics['start_offset'],
+            'end_offset_seconds': phase_metrics['end_offset'],
+            'context': context_budget.report() if context_budget is not None else {},
+            'speculation': phase_metrics['speculation']
+        }
+
     def _save_metrics_report(self):
         report = {
+            'run_id': self.run_id,
             'total_duration': str(self.metrics['total_duration']),
             'phases': {
-                'data_cleaning': {
-                    'status': 'success' if self.metrics['cleaning']['success'] else 'failed',
-                    'total_attempts': self.metrics['cleaning']['attempts'],
-                    'failed_attempts': self.metrics['cleaning']['failures'],
-                    'time_per_attempt': [str(d) for d in self.metrics['cleaning']['durations']],
-                    'total_duration': str(self.metrics['cleaning']['duration'] or "0:00:00"),
-                    'file_check_attempts': self.metrics['cleaning']['file_check_attempts']
-                },
-                'ml_modeling': {
-                    'status': 'success' if self.metrics['ml']['success'] else 'failed',
-                    'total_attempts': self.metrics['ml']['attempts'],
-                    'failed_attempts': self.metrics['ml']['failures'],
-                    'time_per_attempt': [str(d) for d in self.metrics['ml']['durations']],
-                    'total_duration': str(self.metrics['ml']['duration'] or "0:00:00"),
-                    'file_check_attempts': self.metrics['ml']['file_check_attempts']
-                }
+                report_name: self._phase_report(phase_key)
+                for phase_key, report_name in PHASE_REPORT_NAMES.items()
             },
+            'schedule': self.metrics['schedule'],
             'visualizations': self.metrics['visualizations'],
+            'time_breakdown': self.tracer.breakdown(self._run_span),
+            'llm_cache': get_default_cache().stats(),
+            'engines': get_registry().stats(),
+            'sandbox': get_sandbox_pool().stats(),
             'timestamp': str(datetime.now())
         }
+        # Workflow charts come from this report: the phases (visualization included) have finished
+        try:
+            self.metrics['visualizations'].extend(self.metrics_visualizer.render_workflow_charts(report))
+        except Exception as e:
+            print(f"Could not draw workflow charts: {str(e)}")
 
         print("\n=== Performance Metrics Report ===")
         print(f"Total workflow duration: {report['total_duration']}")
-        print("\nData Cleaning Phase:")
-        print(f"  Status: {report['phases']['data_cleaning']['status']}")
-        print(f"  Attempts: {report['phases']['data_cleaning']['total_attempts']}")
-        print(f"  Failures: {report['phases']['data_cleaning']['failed_attempts']}")
-        print(f"  File checks: {report['phases']['data_cleaning']['file_check_attempts']}")
-        print(f"  Total duration: {report['phases']['data_cleaning']['total_duration']}")
-
-        print("\nML Modeling Phase:")
-        print(f"  Status: {report['phases']['ml_modeling']['status']}")
-        print(f"  Attempts: {report['phases']['ml_modeling']['total_attempts']}")
-        print(f"  Failures: {report['phases']['ml_modeling']['failed_attempts']}")
-        print(f"  File checks: {report['phases']['ml_modeling']['file_check_attempts']}")
-        print(f"  Total duration: {report['phases']['ml_modeling']['total_duration']}")
+        for report_name, phase_report in report['phases'].items():
+            print(f"\n{report_name.replace('_', ' ').title()} Phase:")
+            print(f"  Status: {phase_report['status']}")
+            print(f"  Attempts: {phase_report['total_attempts']}")
+            print(f"  Failures: {phase_report['failed_attempts']}")
+            print(f"  File checks: {phase_report['file_check_attempts']}")
+            print(f"  Artifact wait: {phase_report['artifact_wait_seconds']}s")
+            for failure_class, outcome in phase_report['retry_outcomes'].items():
+                print(f"  {failure_class.replace('_', ' ').capitalize()} failures: {outcome['failures']} "
+                      f"({outcome['retried']} retried, {outcome['gave_up']} gave up, "
+                      f"{outcome['backoff_seconds']}s backoff)")
+            print(f"  Total duration: {phase_report['total_duration']}")
+            if phase_report['start_offset_seconds'] is not None:
+                print(f"  Ran from +{phase_report['start_offset_seconds']}s to +{phase_report['end_offset_seconds']}s")
+            context = phase_report['context']
+            if context:
+                sizes = [entry['prompt_tokens'] for entry in context['per_iteration']]
+                print(f"  Prompt tokens: ~{context['sent_prompt_tokens']} sent over {context['llm_prompts']} prompts "
+                      f"(max ~{context['max_prompt_tokens']}, {context['saved_fraction']:.0%} saved by context budget)")
+                print(f"  Prompt size per iteration: {sizes}")
+            for race in phase_report['speculation']:
+                outcome = (f"attempt {race['winner']} won in {race['seconds_to_winner']}s"
+                           if race['winner'] is not None else "no winner")
+                cap = f", stopped by {race['cap_hit']} cap" if race['cap_hit'] else ''
+                print(f"  Speculation: {race['attempts']} attempts, {outcome}, "
+                      f"{race['prompt_tokens'] + race['completion_tokens']} tokens, "
+                      f"{race['attempt_seconds']}s of attempt time{cap}")
+
+        if report['schedule']:
+            print("\nSchedule:")
+            print(f"  Critical path: {' -> '.join(report['schedule']['critical_path'])}")
+            print(f"  Critical path duration: {report['schedule']['critical_path_seconds']}s")
+            print(f"  Sum of phase durations: {report['schedule']['serial_seconds']}s")
+            print(f"  Parallel speedup: {report['schedule']['parallel_speedup']}x")
+
+        if report['time_breakdown']:
+            print("\nTime Breakdown:")
+            for phase_key, breakdown in report['time_breakdown'].items():
+                print(f"  {phase_key}: LLM {breakdown['llm_seconds']}s over {breakdown['llm_calls']} calls "
+                      f"({breakdown['prompt_tokens']} prompt / {breakdown['completion_tokens']} completion tokens), "
+                      f"code {breakdown['code_seconds']}s, native {breakdown['compute_seconds']}s, "
+                      f"other {breakdown['other_seconds']}s, {breakdown['iterations']} iterations")
+
+        print("\nLLM Response Cache:")
+        print(f"  Hits: {report['llm_cache']['hits']}")
+        print(f"  Misses: {report['llm_cache']['misses']}")
+        print(f"  Hit rate: {report['llm_cache']['hit_rate']:.0%}")
+        print(f"  Entries: {report['llm_cache']['entries']}")
+        print(f"  Engines initialized: {report['engines']['initialized']}/{report['engines']['engines']}")
+
+        frames = report['sandbox']['frames']
+        print("\nCode Sandbox:")
+        print(f"  Warm modules: {report['sandbox']['warm_modules']} ({report['sandbox']['warm_import_seconds']}s to import)")
+        print(f"  Frame cache: {frames['hits']} hits, {frames['misses']} misses, {frames['frames']} frames resident")
 
         print("\nVisualizations:")
         for viz in report['visualizations']:
@@ -280,23 +629,31 @@ class MLWorkflowCoordinator:
 
         with open(self.workflow_file, 'w') as f:
             json.dump(report, f, indent=2)
+        self.last_report = report
+        self.tracer.export(self.trace_file, self.chrome_trace_file, root=self._run_span)
+        print(f"\nTrace written to {self.trace_file} (Chrome format: {self.chrome_trace_file})")
+
+        try:
+            self.history.record_run(self.run_id or uuid.uuid4().hex, report)
+            self._print_history_trends()
+        except Exception as e:
+            print(f"Could not update run history: {str(e)}")
 
         return report
 
 def main():
-    output_dir = "C:/Users/suman/OneDrive/Desktop/AI Agents"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    output_dir = DEFAULT_OUTPUT_DIR
     
     print("Starting ML Workflow Coordinator...")
-    coordinator = MLWorkflowCoordinator()
+    coordinator = MLWorkflowCoordinator(output_dir)
     
     success = coordinator.run_full_workflow()
     
     print("\nFinal Status:")
     print(f"Workflow {'succeeded' if success else 'failed'}")
-    print(f"Metrics saved to: C:/Users/suman/OneDrive/Desktop/AI Agents/workflow_metrics.json")
-    print("Dashboard running at: http://127.0.0.1:8050/ ")
+    print(f"Metrics saved to: {coordinator.workflow_file}")
+    if coordinator.dashboard.is_running():
+        print(f"Dashboard running at: {coordinator.dashboard.url} (Ctrl+C to stop)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
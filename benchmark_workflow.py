@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak memory is then omitted
+    resource = None
+
+from AI_Agent_Cache import LLMResponseCache
+from AI_Agent_History import duration_seconds
+from AI_Agent_Registry import get_registry
+from AI_Agent_Storage import DEFAULT_OUTPUT_DIR, set_state_root
+from AI_agent_workflow import MLWorkflowCoordinator
+from generate_synthetic_data import write_synthetic_dataset
+
+CLEANING_STEP = """Thought: Load the data, drop duplicate rows, report the purchased counts and save it.
+Code:
+```py
+import pandas as pd
+df = pd.read_parquet('{input_path}')
+df = df.drop_duplicates()
+print(df['purchased'].value_counts(dropna=False))
+df.to_parquet('{output_path}', index=False)
+final_answer('{output_path}')
+```<end_code>"""
+
+VISUALIZATION_STEP = """Thought: Plots are not needed for the benchmark.
+Code:
+```py
+final_answer('skipped')
+```<end_code>"""
+
+
+def peak_memory_mb():
+    """Peak RSS of this process and of finished child processes (sweep workers)"""
+    if resource is None:
+        return None, None
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if os.uname().sysname == 'Darwin' else 1024
+    return (round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+            round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1))
+
+
+def script_missing_steps(engine, coordinator):
+    """Give the replay engine a canned answer for tasks the transcript doesn't cover"""
+    cleaning = coordinator.data_processor
+    if not engine.has_step(cleaning.task, 0):
+        engine.add_step(cleaning.task, 0, CLEANING_STEP.format(
+            input_path=cleaning.input_path, output_path=cleaning.output_path))
+    visualizer = coordinator.metrics_visualizer
+    if not engine.has_step(visualizer.task, 0):
+        engine.add_step(visualizer.task, 0, VISUALIZATION_STEP)
+
+
+def summarize_run(coordinator, rows, wall_seconds, memory_before, memory_after):
+    report = coordinator.last_report or {}
+    breakdown = report.get('time_breakdown', {})
+    phases = {}
+    for report_name, phase in report.get('phases', {}).items():
+        phase_breakdown = breakdown.get(phase.get('phase_key'), {})
+        seconds = duration_seconds(phase.get('total_duration')) or 0.0
+        llm_seconds = phase_breakdown.get('llm_seconds', 0.0)
+        phases[report_name] = {
+            'status': phase['status'],
+            'seconds': round(seconds, 3),
+            'llm_seconds': llm_seconds,
+            'code_seconds': phase_breakdown.get('code_seconds', 0.0),
+            'native_seconds': phase_breakdown.get('compute_seconds', 0.0),
+            'overhead_seconds': round(max(0.0, seconds - llm_seconds), 3),
+            'attempts': phase.get('total_attempts'),
+            'llm_calls': phase_breakdown.get('llm_calls', 0)
+        }
+    llm_seconds = sum(phase['llm_seconds'] for phase in phases.values())
+    return {
+        'rows': rows,
+        'run_id': coordinator.run_id,
+        'wall_seconds': round(wall_seconds, 3),
+        'llm_seconds': round(llm_seconds, 3),
+        'non_llm_seconds': round(max(0.0, wall_seconds - llm_seconds), 3),
+        'parallel_speedup': (report.get('schedule') or {}).get('parallel_speedup'),
+        'peak_rss_mb': memory_after[0],
+        'rss_growth_mb': (round(memory_after[0] - memory_before[0], 1)
+                          if memory_after[0] is not None else None),
+        'peak_child_rss_mb': memory_after[1],
+        'phases': phases
+    }
+
+
+def run_benchmark(sizes, work_dir, backend='replay', transcript=None, latency_scale=0.0,
+                  repeat=1, agents_only=False, seed=42):
+    # Imported here so sweep workers, which re-run this module's imports, don't load transformers
+    from AI_Agent_Engines import TranscriptReplayEngine
+
+    registry = get_registry()
+    replay_engine = None
+    if backend == 'replay':
+        replay_engine = TranscriptReplayEngine(transcript, latency_scale=latency_scale)
+        registry.configure_backend('replay', engine=replay_engine)
+    elif backend == 'local':
+        registry.configure_backend('local')
+
+    os.makedirs(work_dir, exist_ok=True)
+    history_path = os.path.join(work_dir, "benchmark_history.sqlite")
+    results = []
+    previous_state_root = None
+    for rows in sorted(sizes):
+        source_path = os.path.join(work_dir, f"synthetic_{rows}.parquet")
+        if not os.path.exists(source_path):
+            write_synthetic_dataset(source_path, rows, seed=seed)
+
+        for iteration in range(1, repeat + 1):
+            output_dir = os.path.join(work_dir, f"rows_{rows}_run_{iteration}")
+            shutil.rmtree(output_dir, ignore_errors=True)
+            # Fresh response, preprocessing and script caches per run so every run pays the same
+            # (replayed) LLM cost and no run reuses another's features or captured scripts
+            root = set_state_root(output_dir)
+            if previous_state_root is None:
+                previous_state_root = root
+            registry.response_cache = LLMResponseCache()
+
+            coordinator = MLWorkflowCoordinator(output_dir=output_dir, source_path=source_path,
+                                                history_path=history_path, serve_dashboard=False)
+            coordinator.incremental = False
+            coordinator.data_processor.replay_enabled = False
+            if agents_only:
+                coordinator.ml_automation.use_native_engine = False
+                coordinator.unsupervised_automation.use_native_engine = False
+            if replay_engine is not None:
+                replay_engine.set_path_map({DEFAULT_OUTPUT_DIR: output_dir})
+                script_missing_steps(replay_engine, coordinator)
+
+            print(f"\n=== Benchmark: {rows} rows, run {iteration}/{repeat} ===")
+            memory_before = peak_memory_mb()
+            start = time.perf_counter()
+            coordinator.run_full_workflow()
+            wall_seconds = time.perf_counter() - start
+            results.append(summarize_run(coordinator, rows, wall_seconds, memory_before, peak_memory_mb()))
+
+    registry.response_cache = None
+    if previous_state_root is not None:
+        set_state_root(previous_state_root)
+    return {
+        'backend': backend,
+        'transcript': transcript,
+        'latency_scale': latency_scale,
+        'agents_only': agents_only,
+        'timestamp': str(datetime.now()),
+        'replay': ({'hits': replay_engine.hits, 'misses': replay_engine.misses}
+                   if replay_engine is not None else None),
+        'runs': results
+    }
+
+
+def print_results(benchmark):
+    print("\n=== Benchmark Results ===")
+    print(f"{'rows':>10} {'wall s':>9} {'llm s':>8} {'non-llm s':>10} {'peak MB':>9}  phases")
+    for run in benchmark['runs']:
+        phases = ", ".join(
+            f"{name} {phase['seconds']}s ({phase['status']}, overhead {phase['overhead_seconds']}s)"
+            for name, phase in run['phases'].items()
+        )
+        print(f"{run['rows']:>10} {run['wall_seconds']:>9} {run['llm_seconds']:>8} "
+              f"{run['non_llm_seconds']:>10} {str(run['peak_rss_mb']):>9}  {phases}")
+    if benchmark['replay']:
+        print(f"\nTranscript hits: {benchmark['replay']['hits']}, misses: {benchmark['replay']['misses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the workflow coordinator offline")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument("--backend", choices=['replay', 'local', 'hf_api'], default='replay')
+    parser.add_argument("--transcript", default=None,
+                        help="JSONL recorded with AI_AGENT_RECORD_TRANSCRIPT; canned steps fill the gaps")
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="Replay recorded LLM latency scaled by this factor (0 = instant)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--agents-only", action='store_true',
+                        help="Disable the built-in AutoML and sweep so the agents do the modeling")
+    parser.add_argument("--work-dir", default="benchmark_runs")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    benchmark = run_benchmark(args.sizes, args.work_dir, args.backend, args.transcript,
+                              args.latency_scale, args.repeat, args.agents_only)
+    print_results(benchmark)
+    with open(args.output, 'w') as f:
+        json.dump(benchmark, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
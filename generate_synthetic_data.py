@@ -1,57 +1,144 @@
+import argparse
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
+from AI_Agent_Storage import write_frame
 
-def generate_synthetic_data(n_samples=1000):
-    """Create synthetic dataset with realistic distributions using nullable types"""
-    np.random.seed(42)
-    
-    # Initialize data with proper nullable types
-    data = {
-        'age': pd.Series(dtype='Int64'),  # Using pandas nullable integer type
-        'income': np.random.lognormal(mean=4.5, sigma=0.3, size=n_samples).round(2),
-        'education_level': np.random.choice(
-            ['High School', 'Bachelor', 'Master', 'PhD'],
-            size=n_samples,
-            p=[0.3, 0.4, 0.2, 0.1]
-        ),
-        'purchased': np.random.choice([0, 1], size=n_samples, p=[0.7, 0.3])
-    }
-    
-    # Generate age data with proper null handling
-    age_values = np.random.normal(40, 15, n_samples).astype(int)
-    
-    # Introduce missing values using pandas.NA for integer nulls
-    mask = np.random.rand(n_samples) < 0.1
-    age_values = age_values.astype(object)  # Convert to object to hold NA
-    age_values[mask] = pd.NA
-    
-    data['age'] = pd.array(age_values, dtype=pd.Int64Dtype())
-    
-    # Create DataFrame with explicit dtype specification
-    df = pd.DataFrame(data).sample(frac=1).reset_index(drop=True)
-    
-    # Convert to proper nullable types
-    df = df.astype({
-        'age': 'Int64',
-        'income': 'float64',
-        'education_level': 'category',
-        'purchased': 'int64'
+# Column name -> distribution; order here is the column order of the output
+DEFAULT_SCHEMA = {
+    'age': {'kind': 'normal_int', 'mean': 40, 'std': 15, 'null_rate': 0.1},
+    'income': {'kind': 'lognormal', 'mean': 4.5, 'sigma': 0.3, 'decimals': 2},
+    'education_level': {
+        'kind': 'categorical',
+        'values': ['High School', 'Bachelor', 'Master', 'PhD'],
+        'p': [0.3, 0.4, 0.2, 0.1]
+    },
+    'purchased': {'kind': 'choice', 'values': [0, 1], 'p': [0.7, 0.3]}
+}
+
+
+def _generate_column(rng, spec, n_rows):
+    kind = spec['kind']
+    null_rate = spec.get('null_rate', 0.0)
+    mask = rng.random(n_rows) < null_rate if null_rate else None
+
+    if kind == 'normal_int':
+        values = rng.normal(spec['mean'], spec['std'], n_rows).astype('int64')
+        if mask is None:
+            mask = np.zeros(n_rows, dtype=bool)
+        # Nullable Int64 built straight from values + mask, no object round-trip
+        return pd.arrays.IntegerArray(values, mask)
+    if kind == 'normal':
+        values = rng.normal(spec['mean'], spec['std'], n_rows).round(spec.get('decimals', 6))
+    elif kind == 'lognormal':
+        values = rng.lognormal(spec['mean'], spec['sigma'], n_rows).round(spec.get('decimals', 6))
+    elif kind == 'uniform':
+        values = rng.uniform(spec['low'], spec['high'], n_rows).round(spec.get('decimals', 6))
+    elif kind == 'categorical':
+        codes = rng.choice(len(spec['values']), size=n_rows, p=spec.get('p'))
+        if mask is not None:
+            codes[mask] = -1
+        return pd.Categorical.from_codes(codes, categories=spec['values'])
+    elif kind == 'choice':
+        values = rng.choice(np.asarray(spec['values']), size=n_rows, p=spec.get('p'))
+        if mask is not None and np.issubdtype(values.dtype, np.integer):
+            return pd.arrays.IntegerArray(values.astype('int64'), mask)
+        if mask is not None:
+            values = values.astype(object)
+            values[mask] = None
+        return values
+    else:
+        raise ValueError(f"Unknown column kind: {kind}")
+
+    if mask is not None:
+        values[mask] = np.nan
+    return values
+
+
+def generate_chunk(n_rows, seed, schema=None):
+    """Generate one chunk; the same seed always yields the same rows"""
+    schema = schema or DEFAULT_SCHEMA
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        column: _generate_column(rng, spec, n_rows) for column, spec in schema.items()
     })
-    
-    return df
-
-# Generate and validate data
-try:
-    df = generate_synthetic_data()
-    print("Data generated successfully with dtypes:")
-    print(df.dtypes)
-    print("\nSample data with null values:")
-    print(df.head(10))
-    
-    # Save to Excel
-    excel_filename = "synthetic_data.xlsx"
-    df.to_excel(excel_filename, index=False)
-    print(f"\nData saved to {excel_filename}")
-    
-except Exception as e:
-    print(f"Error generating data: {str(e)}")
\ No newline at end of file
+
+
+def generate_synthetic_data(n_samples=1000, seed=42, schema=None):
+    """Create synthetic dataset with realistic distributions using nullable types"""
+    return generate_chunk(n_samples, np.random.SeedSequence(seed), schema)
+
+
+def _write_chunk(args):
+    path, n_rows, seed, schema = args
+    write_frame(generate_chunk(n_rows, seed, schema), path)
+    return path
+
+
+def write_synthetic_dataset(output_path, n_samples, chunk_size=1_000_000, n_jobs=None,
+                            seed=42, schema=None):
+    """Generate n_samples rows in parallel chunks written as a partitioned Parquet dataset
+
+    Each chunk gets its own child of SeedSequence(seed), so the output does not
+    depend on how many workers produced it.
+    """
+    if n_samples <= chunk_size:
+        write_frame(generate_synthetic_data(n_samples, seed, schema), output_path)
+        return [output_path]
+
+    n_chunks = -(-n_samples // chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    tmp_dir = f"{output_path}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    jobs = []
+    for index in range(n_chunks):
+        n_rows = min(chunk_size, n_samples - index * chunk_size)
+        jobs.append((os.path.join(tmp_dir, f"part-{index:05d}.parquet"), n_rows, seeds[index], schema))
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        for i, _ in enumerate(executor.map(_write_chunk, jobs), start=1):
+            print(f"Wrote chunk {i}/{n_chunks}")
+
+    # Swap the finished dataset in atomically so readers never see a partial one
+    if os.path.isdir(output_path):
+        shutil.rmtree(output_path)
+    elif os.path.exists(output_path):
+        os.remove(output_path)
+    os.replace(tmp_dir, output_path)
+    return [os.path.join(output_path, os.path.basename(job[0])) for job in jobs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic purchase dataset")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="synthetic_data.parquet")
+    args = parser.parse_args()
+
+    # Generate and validate data
+    try:
+        # Save as typed Parquet; use AI_Agent_Storage.export_frame for an Excel/CSV copy
+        if args.rows <= args.chunk_size:
+            df = generate_synthetic_data(args.rows, args.seed)
+            print("Data generated successfully with dtypes:")
+            print(df.dtypes)
+            print("\nSample data with null values:")
+            print(df.head(10))
+            write_frame(df, args.output)
+        else:
+            write_synthetic_dataset(args.output, args.rows, args.chunk_size, args.workers, args.seed)
+        print(f"\nData saved to {args.output}")
+
+    except Exception as e:
+        print(f"Error generating data: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()